@@ -0,0 +1,669 @@
+"""
+Local deterministic PrestaShop stand-in.
+
+A small stdlib HTTP server (no Docker, no MySQL) that serves fixture pages
+for the storefront categories, product pages, cart, checkout, customer
+account and the back office screens targeted by the `dom_extractor` scripts
+in dataset/tasks.json. Shop state is held in memory and starts from the same
+fixture every time, so evaluator, settle detection and runner changes can be
+exercised and benchmarked in seconds.
+
+POST /__snapshot__ and POST /__reset__ expose the state snapshot/restore
+hooks used by environments/reset.py.
+
+Usage:
+    python -m environments.fake_prestashop.server --port 8011
+    # then run the tester with environments/fake_prestashop/env_config.json
+"""
+
+import argparse
+import copy
+import html
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+ADMIN_PREFIX = "/admin-dev"
+PAGE_SIZE = 12
+
+FIXTURE = {
+    'categories': [
+        {'id': 3, 'slug': 'clothes', 'name': 'Clothes', 'parent': None},
+        {'id': 4, 'slug': 'men', 'name': 'Men', 'parent': 3},
+        {'id': 5, 'slug': 'women', 'name': 'Women', 'parent': 3},
+        {'id': 6, 'slug': 'accessories', 'name': 'Accessories', 'parent': None},
+        {'id': 7, 'slug': 'stationery', 'name': 'Stationery', 'parent': 6},
+        {'id': 8, 'slug': 'home-accessories', 'name': 'Home Accessories', 'parent': 6},
+        {'id': 9, 'slug': 'art', 'name': 'Art', 'parent': None},
+    ],
+    'products': [
+        {'id': 1, 'slug': 'hummingbird-printed-t-shirt', 'name': 'Hummingbird printed t-shirt', 'category': 4, 'price': 23.90, 'quantity': 300, 'active': True},
+        {'id': 2, 'slug': 'hummingbird-printed-sweater', 'name': 'Hummingbird printed sweater', 'category': 5, 'price': 35.90, 'quantity': 300, 'active': True},
+        {'id': 6, 'slug': 'mug-the-best-is-yet-to-come', 'name': 'Mug The best is yet to come', 'category': 8, 'price': 11.90, 'quantity': 300, 'active': True},
+        {'id': 12, 'slug': 'the-best-is-yet-to-come-framed-poster', 'name': 'The best is yet to come\' Framed poster', 'category': 9, 'price': 29.00, 'quantity': 900, 'active': True},
+        {'id': 13, 'slug': 'hummingbird-cushion', 'name': 'Hummingbird cushion', 'category': 8, 'price': 18.90, 'quantity': 300, 'active': True},
+        {'id': 16, 'slug': 'mountain-fox-notebook', 'name': 'Mountain fox notebook', 'category': 7, 'price': 14.90, 'quantity': 300, 'active': True},
+        {'id': 17, 'slug': 'brown-bear-notebook', 'name': 'Brown bear notebook', 'category': 7, 'price': 12.90, 'quantity': 0, 'active': True},
+        {'id': 18, 'slug': 'hummingbird-notebook', 'name': 'Hummingbird notebook', 'category': 7, 'price': 12.90, 'quantity': 300, 'active': True},
+        {'id': 19, 'slug': 'customizable-mug', 'name': 'Customizable mug', 'category': 8, 'price': 13.90, 'quantity': 300, 'active': True},
+    ],
+    'customers': [
+        {'id': 2, 'firstname': 'John', 'lastname': 'DOE', 'email': 'user123@gmail.com', 'active': True},
+    ],
+    'addresses': [
+        {'id': 1, 'alias': 'My Address', 'address1': '16, Main street', 'city': 'Miami', 'state': 'Florida', 'postcode': '33133'},
+    ],
+    'orders': [
+        {'id': 1, 'reference': 'XKBKNABJK', 'customer': 'John DOE', 'status': 'Awaiting bank wire payment',
+         'lines': [{'product': 1, 'qty': 1}], 'credit_slips': 0},
+        {'id': 2, 'reference': 'OHSATSERP', 'customer': 'John DOE', 'status': 'Delivered',
+         'lines': [{'product': 2, 'qty': 2}], 'credit_slips': 0},
+    ],
+    'cart_rules': [
+        {'id': 1, 'name': 'Product customization', 'code': '20OFF', 'reduction_percent': '20', 'minimum_amount': '0'},
+    ],
+    'cms': [
+        {'id': 4, 'slug': 'about-us', 'title': 'About us'},
+    ],
+    'cart': [],
+    'cart_discounts': [],
+    'wishlist': [],
+    'newsletter': [],
+    'reviews': [],
+}
+
+NOTICES = {
+    'newsletter_ok': "You have successfully subscribed to this newsletter.",
+    'newsletter_already': "This email address is already subscribed to the newsletter.",
+    'review_ok': "Your review has been submitted and will be available once approved by a moderator.",
+    'wishlist_ok': "Product added to wishlist.",
+    'address_ok': "Address successfully added.",
+    'promo_invalid': "The voucher code is invalid.",
+    'order_created': "The order has been successfully created.",
+    'status_ok': "Successful update.",
+    'refund_ok': "A credit slip has been generated successfully.",
+    'saved': "Successful update.",
+}
+
+
+class ShopState:
+    """In-memory shop data, restorable to the fixture at any time."""
+
+    def __init__(self, fixture: dict = None):
+        self.fixture = copy.deepcopy(fixture or FIXTURE)
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.data = copy.deepcopy(self.fixture)
+
+    def take_snapshot(self):
+        """Make the current data the state that reset() restores."""
+        with self.lock:
+            self.fixture = copy.deepcopy(self.data)
+
+    def next_id(self, collection: str) -> int:
+        return max((item['id'] for item in self.data[collection]), default=0) + 1
+
+    def find(self, collection: str, **conditions):
+        for item in self.data[collection]:
+            if all(str(item.get(k)) == str(v) for k, v in conditions.items()):
+                return item
+        return None
+
+    def category_ids(self, category_id: int) -> set:
+        ids = {category_id}
+        for category in self.data['categories']:
+            if category['parent'] == category_id:
+                ids |= self.category_ids(category['id'])
+        return ids
+
+    def cart_total(self) -> float:
+        total = sum(self.find('products', id=line['product'])['price'] * line['qty'] for line in self.data['cart'])
+        for code in self.data['cart_discounts']:
+            rule = self.find('cart_rules', code=code)
+            if rule:
+                total -= total * float(rule['reduction_percent'] or 0) / 100
+        return round(total, 2)
+
+
+def _e(value) -> str:
+    return html.escape(str(value))
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _layout(title: str, body: str, notice: str = None, admin: bool = False) -> str:
+    if admin:
+        nav = (f'<nav class="admin-nav"><a href="{ADMIN_PREFIX}/index.php?controller=AdminOrders">Orders</a> '
+               f'<a href="{ADMIN_PREFIX}/index.php?controller=AdminProducts">Catalog &gt; Products</a> '
+               f'<a href="{ADMIN_PREFIX}/index.php?controller=AdminCartRules">Catalog &gt; Discounts</a> '
+               f'<a href="{ADMIN_PREFIX}/index.php?controller=AdminCustomers">Customers</a> '
+               f'<a href="{ADMIN_PREFIX}/index.php?controller=AdminCmsContent">Pages</a></nav>')
+    else:
+        nav = ('<header id="header"><a href="/">my store</a> '
+               '<a href="/en/3-clothes">CLOTHES</a> <a href="/en/6-accessories">ACCESSORIES</a> <a href="/en/9-art">ART</a> '
+               '<form action="/en/search" method="get"><input name="s" placeholder="Search our catalog"></form> '
+               '<a href="/en/login">Sign in</a> <a href="/en/my-account">My account</a> <a href="/en/cart">Cart</a></header>')
+    alert = f'<div class="alert alert-success">{_e(notice)}</div>' if notice else ''
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{_e(title)}</title></head>'
+            f'<body>{nav}<main>{alert}{body}</main></body></html>')
+
+
+def _not_found() -> str:
+    return _layout("404", '<h1>The page you are looking for was not found.</h1>')
+
+
+class ShopRequestHandler(BaseHTTPRequestHandler):
+    state: ShopState = None  # set by make_handler
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output quiet
+
+    # --- plumbing -----------------------------------------------------------
+    def _send(self, status: int, body: str):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _redirect(self, location: str):
+        self.send_response(303)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _form(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8') if length else ''
+        return {k: v[-1] for k, v in parse_qs(raw, keep_blank_values=True).items()}
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with self.state.lock:
+            status, body = self.route_get(url.path.rstrip('/') or '/', query)
+        self._send(status, body)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        form = self._form()
+        with self.state.lock:
+            location = self.route_post(url.path.rstrip('/') or '/', query, form)
+        if location is None:
+            self._send(404, _not_found())
+        else:
+            self._redirect(location)
+
+    # --- GET routes -----------------------------------------------------------
+    def route_get(self, path: str, query: dict):
+        notice = NOTICES.get(query.get('notice'))
+        if path.startswith(ADMIN_PREFIX):
+            return self.admin_get(query, notice)
+        if path in ('/', '/en'):
+            return 200, self.home(notice)
+        if path == '/en/search':
+            products = [p for p in self.state.data['products']
+                        if p['active'] and query.get('s', '').lower() in p['name'].lower()]
+            return 200, self.listing(f"Search results", products, query, path, notice)
+        if path == '/en/cart':
+            return 200, self.cart(notice)
+        if path == '/en/order':
+            return 200, self.checkout()
+        if path == '/en/order-confirmation':
+            order = self.state.find('orders', id=query.get('id_order'))
+            if not order:
+                return 404, _not_found()
+            return 200, _layout("Order confirmation",
+                                f'<h3 class="h1 card-title">Your order is confirmed</h3>'
+                                f'<p class="order-reference">Order reference: {_e(order["reference"])}</p>')
+        if path in ('/en/login', '/en/my-account'):
+            return 200, self.account(path)
+        if path == '/en/addresses':
+            return 200, self.addresses(notice)
+        if path == '/en/address':
+            return 200, _layout("New address", self._address_form())
+        if path == '/en/order-history':
+            rows = "".join(f'<tr><td><a href="/en/order-detail?id_order={o["id"]}">{_e(o["reference"])}</a></td>'
+                           f'<td>{_e(o["status"])}</td></tr>' for o in reversed(self.state.data['orders']))
+            return 200, _layout("Order history", f'<h1>Order history</h1><table>{rows}</table>')
+        if path == '/en/order-detail':
+            order = self.state.find('orders', id=query.get('id_order'))
+            if not order:
+                return 404, _not_found()
+            return 200, _layout("Order details",
+                                f'<h1>Order details</h1><p class="order-reference">Order Reference {_e(order["reference"])}</p>'
+                                f'<p>{_e(order["status"])}</p>')
+        if path == '/module/blockwishlist/lists':
+            items = "".join(f'<li><p class="wishlist-list-item-title">{_e(self.state.find("products", id=pid)["name"])}</p></li>'
+                            for pid in self.state.data['wishlist'])
+            return 200, _layout("My wishlists", f'<h1>My wishlists</h1><ul>{items}</ul>', notice)
+        m = re.fullmatch(r'/en/content/(\d+)-[\w-]+', path)
+        if m:
+            page = self.state.find('cms', id=m.group(1))
+            if not page:
+                return 404, _not_found()
+            return 200, _layout(page['title'], f'<h1>{_e(page["title"])}</h1><p>Fixture CMS content.</p>')
+        m = re.fullmatch(r'/en/(\d+)-([\w-]+)', path)
+        if m:
+            category = self.state.find('categories', id=m.group(1))
+            if not category:
+                return 404, _not_found()
+            ids = self.state.category_ids(category['id'])
+            products = [p for p in self.state.data['products'] if p['active'] and p['category'] in ids]
+            return 200, self.listing(category['name'], products, query, path, notice, category)
+        m = re.fullmatch(r'/en/([\w-]+)/(?:(\d+)-)?([\w-]+)\.html', path)
+        if m:
+            product = (self.state.find('products', id=m.group(2)) if m.group(2)
+                       else self.state.find('products', slug=m.group(3)))
+            if not product or not product['active']:
+                return 404, _not_found()
+            return 200, self.product(product, notice)
+        return 404, _not_found()
+
+    def home(self, notice):
+        popular = "".join(self._miniature(p) for p in self.state.data['products'][:4] if p['active'])
+        return _layout("my store",
+                       f'<h1>my store</h1><section><h2>Popular Products</h2>{popular}</section>'
+                       '<form action="/newsletter" method="post"><label>Get our latest news</label>'
+                       '<input type="email" name="email"><button type="submit">Subscribe</button></form>',
+                       notice)
+
+    def _miniature(self, product) -> str:
+        category = self.state.find('categories', id=product['category'])
+        href = f"/en/{category['slug']}/{product['id']}-{product['slug']}.html"
+        return (f'<article class="product-miniature" data-id-product="{product["id"]}">'
+                f'<h2 class="product-title"><a href="{href}">{_e(product["name"])}</a></h2>'
+                f'<span class="price">{_money(product["price"])}</span></article>')
+
+    def listing(self, title, products, query, path, notice, category=None):
+        in_stock = 'in stock' in query.get('q', '').lower()
+        if in_stock:
+            products = [p for p in products if p['quantity'] > 0]
+        order = query.get('order', '')
+        if order == 'product.price.asc':
+            products = sorted(products, key=lambda p: p['price'])
+        elif order == 'product.price.desc':
+            products = sorted(products, key=lambda p: -p['price'])
+        page = max(int(query.get('page', 1) or 1), 1)
+        shown = products[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+        base = {k: v for k, v in query.items() if k not in ('q', 'page', 'notice')}
+        facet_query = urlencode({**base, **({} if in_stock else {'q': 'Availability-In stock'})})
+        facet = (f'<a class="facet-label{" active" if in_stock else ""}" href="{path}?{facet_query}">In stock</a>')
+        sort_links = " ".join(
+            f'<a href="{path}?{urlencode({**query, "order": key})}">{label}</a>'
+            for key, label in (('product.price.asc', 'Price, low to high'), ('product.price.desc', 'Price, high to low'))
+        )
+        subcategories = ""
+        if category:
+            subcategories = "".join(f'<a href="/en/{c["id"]}-{c["slug"]}">{_e(c["name"].upper())}</a> '
+                                    for c in self.state.data['categories'] if c['parent'] == category['id'])
+        pages = (len(products) + PAGE_SIZE - 1) // PAGE_SIZE
+        pagination = " ".join(f'<a href="{path}?{urlencode({**query, "page": n})}">{n}</a>' for n in range(1, pages + 1))
+        return _layout(title,
+                       f'<h1>{_e(title)}</h1><div class="subcategories">{subcategories}</div>'
+                       f'<aside id="search_filters">Availability: {facet}</aside>'
+                       f'<div class="sort-by">Sort by: {sort_links}</div>'
+                       f'<div id="js-product-list">{"".join(self._miniature(p) for p in shown)}</div>'
+                       f'<nav class="pagination">{pagination}</nav>',
+                       notice)
+
+    def product(self, product, notice):
+        availability = "In stock" if product['quantity'] > 0 else "Out-of-Stock"
+        return _layout(product['name'],
+                       f'<h1>{_e(product["name"])}</h1>'
+                       f'<div class="product-prices"><span class="current-price product-price">{_money(product["price"])}</span></div>'
+                       '<select name="group[1]"><option>S</option><option selected>M</option><option>L</option></select>'
+                       '<select name="group[2]"><option>White</option><option>Black</option></select>'
+                       f'<form action="/en/cart" method="post"><input type="hidden" name="id_product" value="{product["id"]}">'
+                       '<input name="qty" value="1"><button type="submit">Add to cart</button></form>'
+                       f'<form action="/module/blockwishlist/action" method="post"><input type="hidden" name="id_product" value="{product["id"]}">'
+                       '<button type="submit">Add to wishlist</button></form>'
+                       f'<span id="product-availability" class="product-availability">{availability}</span>'
+                       f'<form action="/module/productcomments/PostComment" method="post"><input type="hidden" name="id_product" value="{product["id"]}">'
+                       '<input name="comment_title"><input name="criterion" value="5"><textarea name="comment_content"></textarea>'
+                       '<button type="submit">Send</button></form>',
+                       notice)
+
+    def cart(self, notice):
+        lines = "".join(
+            f'<li class="cart-item">{_e(self.state.find("products", id=l["product"])["name"])} x {l["qty"]}</li>'
+            for l in self.state.data['cart']
+        )
+        promos = "".join(f'<li><span class="promo-name">{_e(code)} (discount applied)</span></li>'
+                         for code in self.state.data['cart_discounts'])
+        return _layout("Cart",
+                       f'<h1>Shopping Cart</h1><ul class="cart-items">{lines}</ul><ul class="promo-applied">{promos}</ul>'
+                       '<form action="/en/cart" method="post"><input name="discount_name" placeholder="Promo code">'
+                       '<button type="submit">Add</button></form>'
+                       f'<div class="cart-total"><span class="label">Total</span> <span class="value">{_money(self.state.cart_total())}</span></div>'
+                       '<a href="/en/order">Proceed to checkout</a>',
+                       notice)
+
+    def checkout(self):
+        if not self.state.data['cart']:
+            return _layout("Checkout", '<h1>Your cart is empty</h1><a href="/">Continue shopping</a>')
+        return _layout("Checkout",
+                       '<section class="checkout-step -complete"><h1>1 Personal Information</h1></section>'
+                       '<section class="checkout-step -complete"><h1>2 Addresses</h1></section>'
+                       '<section class="checkout-step -complete"><h1>3 Shipping Method</h1></section>'
+                       '<section id="checkout-payment-step" class="checkout-step -current"><h1>4 Payment</h1>'
+                       '<form action="/en/order" method="post"><div class="payment-options">'
+                       '<label><input type="radio" name="payment" value="Check" checked> Pay by Check</label>'
+                       '<label><input type="radio" name="payment" value="Bank wire"> Pay by bank wire</label></div>'
+                       '<input type="checkbox" name="conditions_to_approve" checked>'
+                       '<button type="submit">Place order</button></form></section>')
+
+    def account(self, path):
+        if path == '/en/login':
+            return _layout("Log in", '<h1>Log in to your account</h1><form action="/en/login" method="post">'
+                                     '<input name="email"><input type="password" name="password"><button>Sign in</button></form>')
+        return _layout("Your account", '<h1>Your account</h1><a href="/en/addresses">Addresses</a> '
+                                       '<a href="/en/order-history">Order history and details</a> '
+                                       '<a href="/module/blockwishlist/lists">My wishlists</a>')
+
+    def _address_form(self):
+        return ('<form action="/en/address" method="post"><input name="alias"><input name="address1">'
+                '<input name="city"><input name="state"><input name="postcode"><button type="submit">Save</button></form>')
+
+    def addresses(self, notice):
+        blocks = "".join(f'<article class="address"><h4>{_e(a["alias"])}</h4><address>{_e(a["address1"])}<br>'
+                         f'{_e(a["city"])}, {_e(a["state"])} {_e(a["postcode"])}</address></article>'
+                         for a in self.state.data['addresses'])
+        return _layout("Your addresses", f'<h1>Your addresses</h1>{blocks}<a href="/en/address">Create new address</a>', notice)
+
+    # --- back office ----------------------------------------------------------
+    def admin_get(self, query, notice):
+        controller = query.get('controller', 'AdminDashboard')
+        data = self.state.data
+        a = f"{ADMIN_PREFIX}/index.php"
+
+        if controller == 'AdminOrders':
+            if query.get('addorder'):
+                return 200, _layout("Orders > Add new", f'<form action="{a}?controller=AdminOrders&action=create" method="post">'
+                                    '<input name="customer"><input name="product"><input name="qty" value="1">'
+                                    '<input name="payment"><button type="submit">Create the order</button></form>', admin=True)
+            order = self.state.find('orders', id=query.get('id_order'))
+            if order:
+                return 200, _layout(f"Order {order['reference']}",
+                                    f'<h1>Order #{order["id"]} {_e(order["reference"])}</h1>'
+                                    f'<div class="customer-info"><span class="customer-name">{_e(order["customer"])}</span></div>'
+                                    f'<span class="order_state_label">{_e(order["status"])}</span>'
+                                    f'<form action="{a}?controller=AdminOrders&id_order={order["id"]}&action=status" method="post">'
+                                    '<select name="status"><option>Awaiting bank wire payment</option><option>Payment accepted</option>'
+                                    '<option>Delivered</option></select><button type="submit">Update status</button></form>'
+                                    f'<form action="{a}?controller=AdminOrders&id_order={order["id"]}&action=refund" method="post">'
+                                    '<select name="refund_type"><option>standard</option><option>partial</option></select>'
+                                    '<button type="submit">Refund</button></form>'
+                                    f'<p>Credit slips: {order["credit_slips"]}</p>',
+                                    notice, admin=True)
+            rows = "".join(f'<tr><td><a href="{a}?controller=AdminOrders&id_order={o["id"]}&vieworder=1">{_e(o["reference"])}</a></td>'
+                           f'<td>{_e(o["customer"])}</td><td>{_e(o["status"])}</td></tr>' for o in data['orders'])
+            return 200, _layout("Orders", f'<h1>Orders</h1><a href="{a}?controller=AdminOrders&addorder=1">Add new order</a>'
+                                          f'<table>{rows}</table>', notice, admin=True)
+
+        if controller == 'AdminCartRules':
+            rule = self.state.find('cart_rules', id=query.get('id_cart_rule')) or {}
+            if rule or query.get('addcart_rule'):
+                return 200, _layout("Cart rules", f'<form action="{a}?controller=AdminCartRules&action=save" method="post">'
+                                    f'<input type="hidden" name="id_cart_rule" value="{_e(rule.get("id", ""))}">'
+                                    f'<input name="name" value="{_e(rule.get("name", ""))}">'
+                                    f'<input name="code" value="{_e(rule.get("code", ""))}">'
+                                    f'<input name="reduction_percent" value="{_e(rule.get("reduction_percent", ""))}">'
+                                    f'<input name="minimum_amount" value="{_e(rule.get("minimum_amount", ""))}">'
+                                    '<button type="submit">Save</button></form>', notice, admin=True)
+            rows = "".join(f'<tr><td><a href="{a}?controller=AdminCartRules&id_cart_rule={r["id"]}&updatecart_rule=1">'
+                           f'{_e(r["name"])}</a></td><td>{_e(r["code"])}</td></tr>' for r in data['cart_rules'])
+            return 200, _layout("Cart rules", f'<a href="{a}?controller=AdminCartRules&addcart_rule=1">Add new cart rule</a>'
+                                              f'<table>{rows}</table>', notice, admin=True)
+
+        if controller == 'AdminProducts':
+            product = self.state.find('products', id=query.get('id_product')) or {}
+            if product or query.get('addproduct'):
+                checked = ' checked' if product.get('active', True) else ''
+                return 200, _layout("Products", f'<form action="{a}?controller=AdminProducts&action=save" method="post">'
+                                    f'<input type="hidden" name="id_product" value="{_e(product.get("id", ""))}">'
+                                    f'<input name="name" value="{_e(product.get("name", ""))}">'
+                                    f'<input name="price" value="{_e(product.get("price", ""))}">'
+                                    f'<input name="qty_0" value="{_e(product.get("quantity", 0))}">'
+                                    f'<input type="checkbox" name="active" value="1"{checked}>'
+                                    '<button type="submit">Save</button></form>', notice, admin=True)
+            rows = "".join(f'<tr><td><a href="{a}?controller=AdminProducts&id_product={p["id"]}&updateproduct=1">{_e(p["name"])}</a></td>'
+                           f'<td>{p["quantity"]}</td><td>{"Enabled" if p["active"] else "Disabled"}</td></tr>'
+                           for p in data['products'])
+            return 200, _layout("Products", f'<a href="{a}?controller=AdminProducts&addproduct=1">New product</a>'
+                                            f'<table>{rows}</table>', notice, admin=True)
+
+        if controller == 'AdminCustomers':
+            customer = self.state.find('customers', id=query.get('id_customer')) or {}
+            if customer or query.get('addcustomer'):
+                return 200, _layout("Customers", f'<form action="{a}?controller=AdminCustomers&action=save" method="post">'
+                                    f'<input type="hidden" name="id_customer" value="{_e(customer.get("id", ""))}">'
+                                    f'<input name="firstname" value="{_e(customer.get("firstname", ""))}">'
+                                    f'<input name="lastname" value="{_e(customer.get("lastname", ""))}">'
+                                    f'<input name="email" value="{_e(customer.get("email", ""))}">'
+                                    '<button type="submit">Save</button></form>', notice, admin=True)
+            rows = "".join(f'<tr><td><a href="{a}?controller=AdminCustomers&id_customer={c["id"]}&updatecustomer=1">'
+                           f'{_e(c["email"])}</a></td></tr>' for c in data['customers'])
+            return 200, _layout("Customers", f'<a href="{a}?controller=AdminCustomers&addcustomer=1">Add new customer</a>'
+                                             f'<table>{rows}</table>', notice, admin=True)
+
+        if controller == 'AdminCmsContent':
+            page = self.state.find('cms', id=query.get('id_cms'))
+            if page:
+                return 200, _layout("Pages", f'<form action="{a}?controller=AdminCmsContent&action=save" method="post">'
+                                    f'<input type="hidden" name="id_cms" value="{page["id"]}">'
+                                    f'<input name="title" value="{_e(page["title"])}"><button type="submit">Save</button></form>',
+                                    notice, admin=True)
+            rows = "".join(f'<tr><td><a href="{a}?controller=AdminCmsContent&id_cms={p["id"]}&updatecms=1">{_e(p["title"])}</a></td></tr>'
+                           for p in data['cms'])
+            return 200, _layout("Pages", f'<table>{rows}</table>', notice, admin=True)
+
+        return 200, _layout("Dashboard", '<h1>Dashboard</h1>', notice, admin=True)
+
+    # --- POST routes ------------------------------------------------------------
+    def route_post(self, path: str, query: dict, form: dict):
+        data = self.state.data
+        if path == '/__reset__':
+            self.state.reset()
+            return "/"
+        if path == '/__snapshot__':
+            self.state.take_snapshot()
+            return "/"
+        if path.startswith(ADMIN_PREFIX):
+            return self.admin_post(query, form)
+        if path == '/newsletter':
+            email = form.get('email', '').strip().lower()
+            if email in data['newsletter']:
+                return "/?notice=newsletter_already"
+            data['newsletter'].append(email)
+            return "/?notice=newsletter_ok"
+        if path == '/en/cart':
+            if form.get('discount_name'):
+                code = form['discount_name'].strip().upper()
+                if not self.state.find('cart_rules', code=code):
+                    return "/en/cart?notice=promo_invalid"
+                if code not in data['cart_discounts']:
+                    data['cart_discounts'].append(code)
+                return "/en/cart"
+            product = self.state.find('products', id=form.get('id_product'))
+            if not product:
+                return None
+            line = next((l for l in data['cart'] if l['product'] == product['id']), None)
+            qty = max(int(form.get('qty') or 1), 1)
+            if line:
+                line['qty'] += qty
+            else:
+                data['cart'].append({'product': product['id'], 'qty': qty})
+            return "/en/cart"
+        if path == '/en/order':
+            if not data['cart']:
+                return "/en/order"
+            order = {'id': self.state.next_id('orders'), 'reference': f"FAKE{self.state.next_id('orders'):05d}",
+                     'customer': 'John DOE', 'status': f"Awaiting {form.get('payment', 'Check').lower()} payment",
+                     'lines': data['cart'], 'credit_slips': 0}
+            data['orders'].append(order)
+            data['cart'] = []
+            data['cart_discounts'] = []
+            return f"/en/order-confirmation?id_order={order['id']}"
+        if path == '/en/login':
+            return "/en/my-account"
+        if path == '/en/address':
+            data['addresses'].append({'id': self.state.next_id('addresses'), **{
+                k: form.get(k, '') for k in ('alias', 'address1', 'city', 'state', 'postcode')}})
+            return "/en/addresses?notice=address_ok"
+        if path == '/module/blockwishlist/action':
+            product = self.state.find('products', id=form.get('id_product'))
+            if not product:
+                return None
+            if product['id'] not in data['wishlist']:
+                data['wishlist'].append(product['id'])
+            category = self.state.find('categories', id=product['category'])
+            return f"/en/{category['slug']}/{product['id']}-{product['slug']}.html?notice=wishlist_ok"
+        if path == '/module/productcomments/PostComment':
+            product = self.state.find('products', id=form.get('id_product'))
+            if not product:
+                return None
+            data['reviews'].append({'product': product['id'], 'title': form.get('comment_title', ''),
+                                    'grade': form.get('criterion', '')})
+            category = self.state.find('categories', id=product['category'])
+            return f"/en/{category['slug']}/{product['id']}-{product['slug']}.html?notice=review_ok"
+        return None
+
+    def admin_post(self, query: dict, form: dict):
+        controller = query.get('controller')
+        action = query.get('action')
+        data = self.state.data
+        a = f"{ADMIN_PREFIX}/index.php"
+
+        if controller == 'AdminOrders':
+            if action == 'create':
+                product = next((p for p in data['products'] if p['name'].lower() == form.get('product', '').lower()), None)
+                order = {'id': self.state.next_id('orders'), 'reference': f"FAKE{self.state.next_id('orders'):05d}",
+                         'customer': form.get('customer', ''), 'status': f"Awaiting {form.get('payment', 'bank wire').lower()} payment",
+                         'lines': [{'product': product['id'] if product else None, 'qty': int(form.get('qty') or 1)}],
+                         'credit_slips': 0}
+                data['orders'].append(order)
+                return f"{a}?controller=AdminOrders&id_order={order['id']}&vieworder=1&notice=order_created"
+            order = self.state.find('orders', id=query.get('id_order'))
+            if not order:
+                return None
+            if action == 'status':
+                order['status'] = form.get('status', order['status'])
+                return f"{a}?controller=AdminOrders&id_order={order['id']}&vieworder=1&notice=status_ok"
+            if action == 'refund':
+                order['credit_slips'] += 1
+                return f"{a}?controller=AdminOrders&id_order={order['id']}&vieworder=1&notice=refund_ok"
+
+        if controller == 'AdminCartRules' and action == 'save':
+            rule = self.state.find('cart_rules', id=form.get('id_cart_rule'))
+            if not rule:
+                rule = {'id': self.state.next_id('cart_rules')}
+                data['cart_rules'].append(rule)
+            rule.update({k: form.get(k, '') for k in ('name', 'code', 'reduction_percent', 'minimum_amount')})
+            return f"{a}?controller=AdminCartRules&id_cart_rule={rule['id']}&updatecart_rule=1&notice=saved"
+
+        if controller == 'AdminProducts' and action == 'save':
+            product = self.state.find('products', id=form.get('id_product'))
+            if not product:
+                name = form.get('name', '')
+                product = {'id': self.state.next_id('products'), 'category': 8,
+                           'slug': re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')}
+                data['products'].append(product)
+            product.update({
+                'name': form.get('name', product.get('name', '')),
+                'price': float(form.get('price') or 0),
+                'quantity': int(form.get('qty_0') or 0),
+                'active': form.get('active') == '1',
+            })
+            return f"{a}?controller=AdminProducts&id_product={product['id']}&updateproduct=1&notice=saved"
+
+        if controller == 'AdminCustomers' and action == 'save':
+            customer = self.state.find('customers', id=form.get('id_customer'))
+            if not customer:
+                customer = {'id': self.state.next_id('customers'), 'active': True}
+                data['customers'].append(customer)
+            customer.update({k: form.get(k, '') for k in ('firstname', 'lastname', 'email')})
+            return f"{a}?controller=AdminCustomers&id_customer={customer['id']}&updatecustomer=1&notice=saved"
+
+        if controller == 'AdminCmsContent' and action == 'save':
+            page = self.state.find('cms', id=form.get('id_cms'))
+            if not page:
+                return None
+            page['title'] = form.get('title', page['title'])
+            return f"{a}?controller=AdminCmsContent&id_cms={page['id']}&updatecms=1&notice=saved"
+
+        return None
+
+
+def make_handler(state: ShopState):
+    return type('BoundShopRequestHandler', (ShopRequestHandler,), {'state': state})
+
+
+class FakePrestaShop:
+    """Run the stand-in shop on a background thread (for tests and benchmarks)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, state: ShopState = None):
+        self.state = state or ShopState()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env_config(self) -> dict:
+        """Placeholder mapping in the same shape as env_config.json."""
+        return {
+            "__PRESTASHOP__": {"url": self.url, "username": "user123@gmail.com", "password": "fake"},
+            "__PRESTASHOP_ADMIN__": {"url": f"{self.url}{ADMIN_PREFIX}", "username": "demo@prestashop.com", "password": "fake"},
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-prestashop", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local deterministic PrestaShop stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8011)
+    args = parser.parse_args()
+
+    shop = FakePrestaShop(args.host, args.port)
+    print(f"Fake PrestaShop serving on {shop.url} (admin: {shop.url}{ADMIN_PREFIX})")
+    try:
+        shop.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shop.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Environment pool: several shop instances (or customer accounts) leased to tasks.
+
+env_config.json describes one environment as {placeholder: {url, username,
+password}}. For parallel operation tasks it may instead list shards:
+
+    {"shards": [
+        {"__PRESTASHOP__": {"url": "http://localhost:8001", ...},
+         "__PRESTASHOP_ADMIN__": {"url": "http://localhost:8001/admin-dev", ...},
+         "reset": {"backend": "mysql", "container": "prestashop_mysql_1"}},
+        {"__PRESTASHOP__": {"url": "http://localhost:8002", ...}, ...}
+    ]}
+
+and a placeholder may carry "accounts": [{username, password}, ...] to
+expand into one shard per customer account on the same instance. A shard's
+optional "reset" block gives it its own reset backend (environments/reset.py);
+the global backend applies only when the pool has a single shard.
+
+Placeholders (`__PRESTASHOP__`, and `__PRESTASHOP__.username` /
+`.password` in any task string) are resolved once per shard when the tasks
+are loaded (resolve_tasks); the runner then picks the resolved copy of a task
+for the shard it holds. lease() gives a running task exclusive use of a
+shard across threads and processes (an flock on a per-shard lock file, so a
+crashed worker's lease is released by the OS). Account shards share one
+instance, and a reset restores the whole instance: a lease that resets holds
+its instance exclusively, other leases hold it shared.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from environments.reset import ResetBackend, get_reset_backend
+
+try:
+    import fcntl
+except ImportError:  # Windows: leases are exclusive within this process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_FIELDS = ('username', 'password')
+
+
+def load_shards(env_config: dict) -> list:
+    """List of {placeholder: conf} shards (plus optional 'reset') from an env_config mapping."""
+    entries = env_config.get('shards') if 'shards' in env_config else [env_config]
+    shards = []
+    for entry in entries:
+        placeholders = {k: v for k, v in entry.items() if k != 'reset'}
+        expanded = [placeholders]
+        for placeholder, conf in placeholders.items():
+            accounts = conf.get('accounts')
+            if not accounts:
+                continue
+            expanded = [
+                dict(shard, **{placeholder: dict({k: v for k, v in conf.items() if k != 'accounts'}, **account)})
+                for shard in expanded for account in accounts
+            ]
+        for shard in expanded:
+            if 'reset' in entry:
+                shard['reset'] = entry['reset']
+            shards.append(shard)
+    return shards
+
+
+class Shard:
+    def __init__(self, index: int, env: dict):
+        self.index = index
+        self.reset_config = env.get('reset')
+        self.env = {k: v for k, v in env.items() if k != 'reset'}
+        self.reset = get_reset_backend(self.reset_config) if self.reset_config else None
+        identity = {p: (c.get('url'), c.get('username')) for p, c in self.env.items()}
+        self.key = hashlib.sha1(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        urls = sorted({c.get('url', '') for c in self.env.values()})
+        self.instance_key = hashlib.sha1(json.dumps(urls).encode('utf-8')).hexdigest()[:12]
+        # Longest placeholder first so __PRESTASHOP_ADMIN__ is not split by a shorter prefix
+        names = sorted(self.env, key=len, reverse=True)
+        self._pattern = re.compile(
+            '(' + '|'.join(map(re.escape, names)) + r')(?:\.(' + '|'.join(CREDENTIAL_FIELDS) + '))?'
+        ) if names else None
+
+    @property
+    def name(self) -> str:
+        url = next(iter(self.env.values()), {}).get('url', '')
+        return f"shard {self.index} ({url})"
+
+    def resolve(self, value):
+        """Substitute this shard's placeholders in a string, or in every string of a dict/list."""
+        if isinstance(value, str):
+            if self._pattern is None or '__' not in value:
+                return value
+            return self._pattern.sub(lambda m: str(self.env[m.group(1)].get(m.group(2) or 'url', '')), value)
+        if isinstance(value, dict):
+            return {k: self.resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(v) for v in value]
+        return value
+
+
+class ShardLease:
+    def __init__(self, pool, shard: Shard, owner, exclusive: bool = False, lock_files=()):
+        self.pool = pool
+        self.shard = shard
+        self.owner = owner
+        self.exclusive = exclusive  # holds the whole instance (the task resets it)
+        self._lock_files = lock_files
+
+    def release(self):
+        if self.shard is None:
+            return
+        self.pool._release(self)
+        self.shard = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class EnvironmentPool:
+    def __init__(self, shards: list, lock_dir: str = None, poll_interval: float = 0.5, reset: ResetBackend = None):
+        self.shards = [Shard(i, env) for i, env in enumerate(shards)]
+        if not self.shards:
+            raise ValueError("Environment pool needs at least one shard")
+        self.poll_interval = poll_interval
+        self.default_reset = reset or ResetBackend()
+        self.lock_dir = None
+        # Always lock: another process may run the same env_config, whatever the shard count
+        if fcntl is None:
+            logger.warning("[EnvPool] fcntl unavailable, shard leases are exclusive within this process only")
+        else:
+            self.lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), 'prestashop-env-leases')
+            os.makedirs(self.lock_dir, exist_ok=True)
+        self._held = set()
+        self._instances = {}  # instance_key -> number of shared leases, or -1 when held exclusively
+        self._cond = threading.Condition()
+        self._next_shared = 0
+        self._resolved = {}
+
+    def resolve_tasks(self, tasks: list):
+        """Resolve every task's placeholders once per shard."""
+        for shard in self.shards:
+            self._resolved[shard.index] = {t['task_id']: shard.resolve(t) for t in tasks}
+        logger.info(f"[EnvPool] {len(tasks)} tasks resolved for {len(self.shards)} shard(s)")
+
+    def task_for(self, shard: Shard, task: dict) -> dict:
+        resolved = self._resolved.get(shard.index, {}).get(task['task_id'])
+        return resolved if resolved is not None else shard.resolve(task)
+
+    def shared(self) -> Shard:
+        """A shard for a read-only task (round robin, no lease)."""
+        with self._cond:
+            shard = self.shards[self._next_shared % len(self.shards)]
+            self._next_shared += 1
+            return shard
+
+    def reset_backend(self, shard: Shard) -> ResetBackend:
+        """The shard's own reset backend; the global one only resets a single-shard pool."""
+        if shard.reset is not None:
+            return shard.reset
+        if len(self.shards) == 1 or self.default_reset.name == 'none':
+            return self.default_reset
+        raise ValueError(f"{shard.name} has no reset block; the global {self.default_reset.name} reset "
+                         f"backend only applies to a single shard")
+
+    def _resets(self, shard: Shard) -> bool:
+        try:
+            return self.reset_backend(shard).name != 'none'
+        except ValueError:
+            return False
+
+    def lease(self, owner, timeout: float = None, reset: bool = False) -> ShardLease:
+        """Block until a shard is free and hold it exclusively; TimeoutError after `timeout` seconds.
+
+        With reset=True the shard's whole instance is held exclusively if its backend restores state.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        waited = False
+        while True:
+            with self._cond:
+                for shard in self.shards:
+                    exclusive = reset and self._resets(shard)
+                    lock_files = self._try_lock(shard, exclusive)
+                    if lock_files is None:
+                        continue
+                    logger.info(f"[EnvPool] {owner} leased {shard.name}" + (" (whole instance)" if exclusive else ""))
+                    return ShardLease(self, shard, owner, exclusive, lock_files)
+                if not waited:
+                    logger.info(f"[EnvPool] {owner} waiting for a free shard")
+                    waited = True
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No free environment shard for {owner} within {timeout}s")
+                # Other processes release by unlocking files, so poll rather than wait indefinitely
+                self._cond.wait(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+
+    def _try_lock(self, shard: Shard, exclusive: bool):
+        """Hold the shard, and its instance shared or exclusively; the open lock files, or None if taken."""
+        instance_use = self._instances.get(shard.instance_key, 0)
+        if shard.index in self._held or instance_use < 0 or (exclusive and instance_use > 0):
+            return None
+        lock_files = []
+        if self.lock_dir is not None:
+            for name, mode in ((f"shard-{shard.key}", fcntl.LOCK_EX),
+                               (f"instance-{shard.instance_key}", fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)):
+                f = open(os.path.join(self.lock_dir, f"{name}.lock"), 'a+')
+                try:
+                    fcntl.flock(f, mode | fcntl.LOCK_NB)
+                except OSError:
+                    f.close()
+                    self._unlock(lock_files)
+                    return None
+                lock_files.append(f)
+        self._held.add(shard.index)
+        self._instances[shard.instance_key] = -1 if exclusive else instance_use + 1
+        return lock_files
+
+    @staticmethod
+    def _unlock(lock_files):
+        for f in lock_files:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def _release(self, lease: ShardLease):
+        with self._cond:
+            self._unlock(lease._lock_files)
+            self._held.discard(lease.shard.index)
+            key = lease.shard.instance_key
+            self._instances[key] = 0 if lease.exclusive else max(self._instances.get(key, 0) - 1, 0)
+            self._cond.notify_all()
+        logger.info(f"[EnvPool] {lease.owner} released {lease.shard.name}")
+
+    def snapshot(self):
+        """Snapshot every reset backend in use (the global one only for a single shard)."""
+        backends = []
+        for shard in self.shards:
+            backend = shard.reset or (self.default_reset if len(self.shards) == 1 else None)
+            if backend is not None and backend not in backends:
+                backends.append(backend)
+                backend.snapshot()
@@ -0,0 +1,210 @@
+"""
+Environment reset between state-mutating tasks.
+
+A reset backend takes one snapshot of the shop before the suite starts and
+restores it before every task that mutates state, so operation tasks can
+run back-to-back without recreating the docker-compose stack.
+
+Backends:
+    none   - do nothing (current behaviour)
+    fake   - the in-process stand-in from environments/fake_prestashop
+             (in-memory state copy, or POST /__reset__ when only a URL is known)
+    mysql  - copies the mutable PrestaShop tables into shadow tables inside the
+             MySQL container and copies them back on restore, together with
+             their AUTO_INCREMENT counters; one `docker exec` round trip per
+             restore, well under a second for the demo catalog
+"""
+
+import logging
+import subprocess
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# Task types that only read the shop and never need a reset
+READ_ONLY_TASK_TYPES = ('lookup',)
+
+# Tables touched by the operation tasks in dataset/tasks.json (without prefix); a trailing
+# % matches a family (image, image_lang, image_shop, ...). Creating a product also writes
+# images, prices, combinations and the search/layered-navigation indexes.
+MUTABLE_TABLES = (
+    'accessory', 'address', 'cart', 'cart_cart_rule', 'cart_product', 'cart_rule', 'cart_rule_lang',
+    'category_product', 'category_shop', 'cms', 'cms_lang', 'cms_shop', 'connections', 'customer',
+    'customer_group', 'customer_message', 'customer_thread', 'emailsubscription', 'feature_product',
+    'guest', 'image%', 'layered_%', 'message', 'order_cart_rule', 'order_carrier', 'order_detail',
+    'order_history', 'order_invoice', 'order_payment', 'order_slip', 'order_slip_detail', 'orders',
+    'product', 'product_attachment', 'product_attribute%', 'product_carrier', 'product_comment',
+    'product_comment_grade', 'product_lang', 'product_shop', 'product_supplier', 'product_tag',
+    'search_index', 'search_word', 'specific_price', 'specific_price_priority', 'stock_available',
+    'wishlist', 'wishlist_product',
+)
+
+SNAPSHOT_PREFIX = 'snap_'
+# Snapshot AUTO_INCREMENT counters, so restored tables hand out the same ids again
+AUTO_INCREMENT_TABLE = 'snap__auto_increment'
+
+
+class ResetBackend:
+    """Snapshot/restore hooks used by the runner around each task."""
+
+    name = 'none'
+
+    def snapshot(self):
+        pass
+
+    def restore(self):
+        pass
+
+    def needs_reset(self, task: dict) -> bool:
+        return task.get('task_type') not in READ_ONLY_TASK_TYPES
+
+    def reset_for_task(self, task: dict) -> float:
+        """Restore the snapshot if the task mutates state; returns seconds spent."""
+        if not self.needs_reset(task):
+            return 0.0
+        start = time.time()
+        self.restore()
+        elapsed = time.time() - start
+        logger.info(f"[Reset] {self.name} reset before task {task.get('task_id')} took {elapsed * 1000:.0f} ms")
+        return elapsed
+
+
+class FakeShopReset(ResetBackend):
+    """Reset the local stand-in shop, in-process or over HTTP."""
+
+    name = 'fake'
+
+    def __init__(self, state=None, url: str = None):
+        if state is None and url is None:
+            raise ValueError("FakeShopReset needs a ShopState or the shop URL")
+        self.state = state
+        self.url = url.rstrip('/') if url else None
+
+    def _post(self, path: str):
+        request = urllib.request.Request(f"{self.url}{path}", data=b"", method='POST')
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+
+    def snapshot(self):
+        if self.state is not None:
+            self.state.take_snapshot()
+        else:
+            self._post('/__snapshot__')
+
+    def restore(self):
+        if self.state is not None:
+            self.state.reset()
+        else:
+            self._post('/__reset__')
+
+
+class MySQLSnapshotReset(ResetBackend):
+    """Shadow-table snapshot/restore for the docker-compose MySQL container."""
+
+    name = 'mysql'
+
+    def __init__(self, container: str = 'prestashop_mysql', database: str = 'prestashop',
+                 user: str = 'root', password: str = 'prestashop', prefix: str = 'ps_',
+                 tables: tuple = MUTABLE_TABLES):
+        self.container = container
+        self.database = database
+        self.user = user
+        self.password = password
+        self.prefix = prefix
+        self.tables = tables
+        self._existing = None
+        self._auto_increment = None  # {table: next id} at snapshot time
+
+    def _mysql(self, sql: str) -> str:
+        cmd = ['docker', 'exec', '-i', self.container, 'mysql', '-N', '-B',
+               f'-u{self.user}', f'-p{self.password}', self.database]
+        proc = subprocess.run(cmd, input=sql, capture_output=True, text=True, timeout=60)
+        if proc.returncode != 0:
+            raise RuntimeError(f"mysql failed: {proc.stderr.strip()}")
+        return proc.stdout
+
+    def _existing_tables(self) -> list:
+        if self._existing is None:
+            exact = [t for t in self.tables if '%' not in t]
+            conditions = [f"table_name IN ({', '.join(repr(self.prefix + t) for t in exact)})"] if exact else []
+            conditions += [f"table_name LIKE '{self.prefix}{t}'" for t in self.tables if '%' in t]
+            out = self._mysql(
+                "SELECT table_name FROM information_schema.tables "
+                f"WHERE table_schema = DATABASE() AND ({' OR '.join(conditions)});"
+            )
+            self._existing = sorted(line.strip() for line in out.splitlines() if line.strip())
+        return self._existing
+
+    def _read_auto_increment(self) -> dict:
+        names = ", ".join(f"'{t}'" for t in self._existing_tables())
+        query = ("SELECT table_name, AUTO_INCREMENT FROM information_schema.tables "
+                 f"WHERE table_schema = DATABASE() AND AUTO_INCREMENT IS NOT NULL AND table_name IN ({names});")
+        try:
+            # MySQL 8 caches AUTO_INCREMENT in information_schema unless the expiry is 0
+            out = self._mysql("SET SESSION information_schema_stats_expiry = 0;\n" + query)
+        except RuntimeError:
+            out = self._mysql(query)  # MySQL 5.7 / MariaDB: always current
+        return {table: int(value) for table, value in (line.split('\t') for line in out.splitlines() if line.strip())}
+
+    def _saved_auto_increment(self) -> dict:
+        """Counters stored by whichever process took the snapshot."""
+        if self._auto_increment is None:
+            out = self._mysql(f"SELECT table_name, value FROM `{AUTO_INCREMENT_TABLE}`;")
+            self._auto_increment = {table: int(value) for table, value in
+                                    (line.split('\t') for line in out.splitlines() if line.strip())}
+        return self._auto_increment
+
+    def snapshot(self):
+        self._auto_increment = self._read_auto_increment()
+        statements = ["SET FOREIGN_KEY_CHECKS = 0;"]
+        for table in self._existing_tables():
+            snap = f"{SNAPSHOT_PREFIX}{table}"
+            statements += [
+                f"DROP TABLE IF EXISTS `{snap}`;",
+                f"CREATE TABLE `{snap}` LIKE `{table}`;",
+                f"INSERT INTO `{snap}` SELECT * FROM `{table}`;",
+            ]
+        statements += [
+            f"DROP TABLE IF EXISTS `{AUTO_INCREMENT_TABLE}`;",
+            f"CREATE TABLE `{AUTO_INCREMENT_TABLE}` (table_name VARCHAR(128) PRIMARY KEY, value BIGINT);",
+        ]
+        if self._auto_increment:
+            values = ", ".join(f"('{table}', {value})" for table, value in sorted(self._auto_increment.items()))
+            statements.append(f"INSERT INTO `{AUTO_INCREMENT_TABLE}` VALUES {values};")
+        statements.append("SET FOREIGN_KEY_CHECKS = 1;")
+        self._mysql("\n".join(statements))
+        logger.info(f"[Reset] MySQL snapshot taken of {len(self._existing_tables())} tables")
+
+    def restore(self):
+        statements = ["SET FOREIGN_KEY_CHECKS = 0;", "START TRANSACTION;"]
+        for table in self._existing_tables():
+            statements += [
+                f"DELETE FROM `{table}`;",
+                f"INSERT INTO `{table}` SELECT * FROM `{SNAPSHOT_PREFIX}{table}`;",
+            ]
+        statements.append("COMMIT;")
+        # ALTER TABLE commits implicitly, so the counters are reset after the data
+        statements += [f"ALTER TABLE `{table}` AUTO_INCREMENT = {value};"
+                       for table, value in sorted(self._saved_auto_increment().items())]
+        statements.append("SET FOREIGN_KEY_CHECKS = 1;")
+        self._mysql("\n".join(statements))
+
+
+def get_reset_backend(config: dict = None, shop_state=None) -> ResetBackend:
+    """Build a reset backend from RESET_CONFIG (see result/config.py)."""
+    config = config or {}
+    backend = config.get('backend', 'none')
+    if backend == 'fake':
+        return FakeShopReset(state=shop_state, url=config.get('url'))
+    if backend == 'mysql':
+        return MySQLSnapshotReset(
+            container=config.get('container', 'prestashop_mysql'),
+            database=config.get('database', 'prestashop'),
+            user=config.get('user', 'root'),
+            password=config.get('password', 'prestashop'),
+            prefix=config.get('prefix', 'ps_'),
+        )
+    if backend != 'none':
+        logger.warning(f"[Reset] Unknown reset backend: {backend}, using none")
+    return ResetBackend()
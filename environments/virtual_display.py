@@ -0,0 +1,152 @@
+"""
+Virtual X displays for running the pyautogui mode without a real screen.
+
+pyautogui talks to whatever X server `DISPLAY` points at when it is imported,
+so parallelism comes from processes: every worker process gets its own Xvfb
+display, sized to the grounding resolution, and its own browser window on it.
+
+    VirtualDisplay   - one Xvfb server (:N), started/stopped around a worker
+    DisplayBrowser   - a Chromium window on that display, opened at a task's
+                       start URL and closed after the task (fresh profile)
+    spawn_display_workers - start N worker processes, one display each
+
+Requires the `Xvfb` binary and a Chromium/Chrome executable on PATH (Linux).
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+BROWSER_CANDIDATES = ('chromium', 'chromium-browser', 'google-chrome', 'google-chrome-stable', 'chrome')
+
+
+def find_browser(preferred: str = None) -> str:
+    for name in ((preferred,) if preferred else ()) + BROWSER_CANDIDATES:
+        path = shutil.which(name) if name else None
+        if path:
+            return path
+    raise FileNotFoundError("No Chromium/Chrome executable found on PATH")
+
+
+class VirtualDisplay:
+    def __init__(self, number: int, size: tuple = (1920, 1080), depth: int = 24):
+        self.number = number
+        self.size = size
+        self.depth = depth
+        self.process = None
+
+    @property
+    def name(self) -> str:
+        return f":{self.number}"
+
+    def start(self, timeout: float = 10):
+        if not shutil.which('Xvfb'):
+            raise FileNotFoundError("Xvfb is not installed")
+        width, height = self.size
+        self.process = subprocess.Popen(
+            ['Xvfb', self.name, '-screen', '0', f"{width}x{height}x{self.depth}", '-nolisten', 'tcp', '-ac'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        socket_path = f"/tmp/.X11-unix/X{self.number}"
+        deadline = time.time() + timeout
+        while not os.path.exists(socket_path):
+            if self.process.poll() is not None or time.time() > deadline:
+                self.stop()
+                raise RuntimeError(f"Xvfb {self.name} failed to start")
+            time.sleep(0.05)
+        logger.info(f"[Display] Xvfb {self.name} started ({width}x{height})")
+        return self
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class DisplayBrowser:
+    """Browser window filling the current DISPLAY, restarted for every task."""
+
+    def __init__(self, size: tuple = (1920, 1080), executable: str = None, settle: float = 2.0):
+        self.size = size
+        self.executable = find_browser(executable)
+        self.settle = settle
+        self.process = None
+        self.profile_dir = None
+
+    def open(self, url: str):
+        self.close()
+        self.profile_dir = tempfile.mkdtemp(prefix='agent-browser-')
+        width, height = self.size
+        self.process = subprocess.Popen(
+            [self.executable, f"--user-data-dir={self.profile_dir}", '--no-first-run', '--no-default-browser-check',
+             '--disable-infobars', '--disable-session-crashed-bubble', '--disable-dev-shm-usage',
+             '--window-position=0,0', f"--window-size={width},{height}", '--new-window', url],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=dict(os.environ),
+        )
+        time.sleep(self.settle)
+        logger.info(f"[Display] Browser opened on {os.environ.get('DISPLAY')} at {url}")
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+def spawn_display_workers(count: int, argv: list = None, env: dict = None, first_display: int = 99,
+                          size: tuple = (1920, 1080)):
+    """Start `count` copies of this program, each on its own Xvfb display.
+
+    Returns [(VirtualDisplay, Popen)]; see stop_display_workers.
+    """
+    argv = argv or [sys.executable] + sys.argv
+    workers = []
+    try:
+        for i in range(count):
+            display = VirtualDisplay(first_display + i, size).start()
+            worker_env = dict(os.environ, **(env or {}))
+            worker_env['DISPLAY'] = display.name
+            try:
+                process = subprocess.Popen(argv, env=worker_env)
+            except Exception:
+                display.stop()
+                raise
+            logger.info(f"[Display] Worker {i + 1}/{count} (pid {process.pid}) on {display.name}")
+            workers.append((display, process))
+    except Exception:
+        for display, process in workers:
+            process.terminate()
+            display.stop()
+        raise
+    return workers
+
+
+def stop_display_workers(workers, timeout: float = 30):
+    for display, process in workers:
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.terminate()
+        display.stop()
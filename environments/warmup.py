@@ -0,0 +1,152 @@
+"""
+Pre-run readiness and warm-up of the shop environments.
+
+The compose healthchecks only prove that `/` answers. Before a suite starts
+this module
+
+1. waits until every service is fully ready: storefront and back office
+   render a complete page (closing </html>, no PHP fatal error, installer
+   or PrestaShop exception page), and the maildev API returns its JSON
+   mail list;
+2. warms every URL the task suite references (start URLs, dom_match URLs,
+   and any product/category URL mentioned in a task) in parallel over
+   keep-alive connections, for `passes` rounds, so PHP opcache and the
+   Smarty template caches are hot when the first task runs;
+3. returns per-service readiness times and cold/warm latency per URL, which
+   the runner logs and adds to the report.
+
+Back-office URLs are fetched without a session, which warms the admin
+bootstrap and its login page but not the screens behind it.
+"""
+
+import logging
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from evaluate.dom_query import HTTPClient
+
+logger = logging.getLogger(__name__)
+
+ERROR_MARKERS = ('fatal error', 'parse error', '/install/index.php', 'prestashopexception')
+URL_PATTERN = re.compile(r'https?://[^\s"\'<>()]+')
+
+
+def page_ready(response) -> bool:
+    text = response.text.lower()
+    return response.status == 200 and '</html>' in text and not any(marker in text for marker in ERROR_MARKERS)
+
+
+def maildev_ready(response) -> bool:
+    return response.status == 200 and response.text.lstrip().startswith('[')
+
+
+def readiness_checks(env: dict, maildev_url: str = None) -> list:
+    """[(name, url, predicate)] for every placeholder of a shard, plus maildev if configured."""
+    checks = [(placeholder.strip('_').lower(), conf['url'], page_ready) for placeholder, conf in env.items()
+              if conf.get('url')]
+    if maildev_url:
+        checks.append(('maildev', maildev_url, maildev_ready))
+    return checks
+
+
+def referenced_urls(tasks: list) -> list:
+    """Every absolute URL in the (resolved) tasks, start URLs first, without duplicates."""
+    urls = [t['start_url'] for t in tasks if str(t.get('start_url', '')).startswith('http')]
+
+    def collect(value):
+        if isinstance(value, str):
+            urls.extend(URL_PATTERN.findall(value))
+        elif isinstance(value, dict):
+            for item in value.values():
+                collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    for task in tasks:
+        collect(task)
+    return list(dict.fromkeys(url.rstrip('.,;') for url in urls))
+
+
+def wait_until_ready(client: HTTPClient, checks: list, timeout: float = 300, interval: float = 2.0) -> dict:
+    """Poll every check until it passes; {name: seconds until ready}. TimeoutError lists the laggards."""
+    start = time.time()
+    pending = {name: (url, predicate) for name, url, predicate in checks}
+    ready = {}
+    last_problem = {}
+    while pending:
+        for name, (url, predicate) in list(pending.items()):
+            try:
+                response = client.get(url)
+                if predicate(response):
+                    ready[name] = round(time.time() - start, 2)
+                    del pending[name]
+                    logger.info(f"[Warmup] {name} ready after {ready[name]:.1f}s ({url})")
+                    continue
+                last_problem[name] = f"HTTP {response.status}"
+            except Exception as e:
+                last_problem[name] = str(e)
+        if not pending:
+            break
+        if time.time() - start > timeout:
+            details = ", ".join(f"{name} ({last_problem.get(name, 'not ready')})" for name in pending)
+            raise TimeoutError(f"Environment not ready after {timeout:.0f}s: {details}")
+        time.sleep(interval)
+    return ready
+
+
+def warm_urls(client: HTTPClient, urls: list, passes: int = 2, max_workers: int = 16) -> dict:
+    """Fetch every URL `passes` times; {url: {'status': ..., 'seconds': [per pass]}}."""
+    timings = {url: {'status': None, 'seconds': []} for url in urls}
+
+    def fetch(url):
+        start = time.time()
+        try:
+            status = client.get(url).status
+        except Exception as e:
+            status = f"error: {e}"
+        return url, status, time.time() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for _ in range(passes):
+            for url, status, seconds in executor.map(fetch, urls):
+                timings[url]['status'] = status
+                timings[url]['seconds'].append(round(seconds, 3))
+    return timings
+
+
+def summarize(timings: dict) -> dict:
+    def stats(values):
+        return {'median': round(statistics.median(values), 3), 'max': round(max(values), 3)} if values else {}
+
+    first = [t['seconds'][0] for t in timings.values() if t['seconds']]
+    last = [t['seconds'][-1] for t in timings.values() if len(t['seconds']) > 1]
+    failed = [url for url, t in timings.items() if t['status'] != 200]
+    return {'urls': len(timings), 'cold': stats(first), 'warm': stats(last), 'failed': failed}
+
+
+def warm_up(environments: list, maildev_url: str = None, ready_timeout: float = 300, passes: int = 2,
+            max_workers: int = 16) -> dict:
+    """Readiness + warm-up for [(name, env, resolved tasks)]; returns the report per environment."""
+    report = {}
+    client = HTTPClient(max_connections_per_host=max_workers, timeout=30, headers={'User-Agent': 'env-warmup'})
+    try:
+        for name, env, tasks in environments:
+            start = time.time()
+            ready = wait_until_ready(client, readiness_checks(env, maildev_url), timeout=ready_timeout)
+            maildev_url = None  # one maildev serves every shard
+            timings = warm_urls(client, referenced_urls(tasks), passes=passes, max_workers=max_workers)
+            summary = summarize(timings)
+            summary.update(ready=ready, seconds=round(time.time() - start, 2), timings=timings)
+            report[name] = summary
+            logger.info(f"[Warmup] {name}: {summary['urls']} URLs warmed in {summary['seconds']:.1f}s; "
+                        f"cold median {summary['cold'].get('median', 0):.2f}s / max {summary['cold'].get('max', 0):.2f}s, "
+                        f"warm median {summary['warm'].get('median', 0):.2f}s / max {summary['warm'].get('max', 0):.2f}s"
+                        + (f"; {len(summary['failed'])} failed" if summary['failed'] else ""))
+            for url in summary['failed']:
+                logger.warning(f"[Warmup] {url}: {timings[url]['status']}")
+    finally:
+        client.close()
+    return report
@@ -0,0 +1,201 @@
+# actions.py
+"""
+Translate agent-generated pyautogui code into a small action IR and run it
+natively on a Playwright page.
+
+Agent-S emits code such as
+    import pyautogui; pyautogui.click(453, 171, clicks=1, button='left');
+    import pyautogui; import time; pyautogui.moveTo(1000, 560); time.sleep(0.5); pyautogui.vscroll(-5)
+Every statement is parsed with `ast` into an `Action(name, args, kwargs)`;
+if all of them are literal calls we know, the actions are executed through
+page.mouse / page.keyboard in the caller's event loop, so steps do not depend
+on window focus and work headless. Anything else falls back to `exec` of a
+cached code object.
+"""
+
+import ast
+import asyncio
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+Action = namedtuple('Action', ['name', 'args', 'kwargs'])
+
+# Pixels per pyautogui scroll "click"
+SCROLL_STEP_PX = 100
+
+SUPPORTED_CALLS = {
+    'pyautogui.click', 'pyautogui.doubleClick', 'pyautogui.tripleClick', 'pyautogui.rightClick',
+    'pyautogui.moveTo', 'pyautogui.dragTo', 'pyautogui.mouseDown', 'pyautogui.mouseUp',
+    'pyautogui.scroll', 'pyautogui.vscroll', 'pyautogui.hscroll',
+    'pyautogui.write', 'pyautogui.typewrite', 'pyautogui.press', 'pyautogui.hotkey',
+    'pyautogui.keyDown', 'pyautogui.keyUp',
+    'time.sleep', 'pyperclip.copy',
+}
+
+KEY_NAMES = {
+    'enter': 'Enter', 'return': 'Enter', 'tab': 'Tab', 'space': 'Space', 'backspace': 'Backspace',
+    'esc': 'Escape', 'escape': 'Escape', 'delete': 'Delete', 'del': 'Delete', 'insert': 'Insert',
+    'up': 'ArrowUp', 'down': 'ArrowDown', 'left': 'ArrowLeft', 'right': 'ArrowRight',
+    'pageup': 'PageUp', 'pgup': 'PageUp', 'pagedown': 'PageDown', 'pgdn': 'PageDown',
+    'home': 'Home', 'end': 'End',
+    'ctrl': 'Control', 'ctrlleft': 'Control', 'ctrlright': 'Control', 'control': 'Control',
+    'alt': 'Alt', 'altleft': 'Alt', 'altright': 'Alt', 'option': 'Alt',
+    'shift': 'Shift', 'shiftleft': 'Shift', 'shiftright': 'Shift',
+    'cmd': 'Meta', 'command': 'Meta', 'win': 'Meta', 'winleft': 'Meta', 'winright': 'Meta', 'super': 'Meta',
+}
+
+
+def key_name(key: str) -> str:
+    """Map a pyautogui key name to a Playwright key name."""
+    lowered = str(key).lower()
+    if lowered in KEY_NAMES:
+        return KEY_NAMES[lowered]
+    if len(lowered) > 1 and lowered[0] == 'f' and lowered[1:].isdigit():
+        return lowered.upper()
+    return str(key)
+
+
+def _call_name(func) -> str:
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+        return f"{func.value.id}.{func.attr}"
+    return None
+
+
+@lru_cache(maxsize=1024)
+def parse_actions(code: str):
+    """Parse agent code into a tuple of Actions, or None if it cannot be translated."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    actions = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)):
+            return None
+        name = _call_name(node.value.func)
+        if name not in SUPPORTED_CALLS:
+            return None
+        try:
+            args = tuple(ast.literal_eval(a) for a in node.value.args)
+            kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in node.value.keywords if kw.arg}
+        except ValueError:
+            return None
+        actions.append(Action(name.split('.', 1)[1] if name.startswith('pyautogui.') else name, args, kwargs))
+    return tuple(actions)
+
+
+@lru_cache(maxsize=1024)
+def compile_action(code: str):
+    """Compile untranslatable agent code once and reuse the code object."""
+    return compile(code, '<agent-action>', 'exec')
+
+
+def run_compiled(code: str, env: dict = None):
+    """exec() fallback using the compiled-code cache."""
+    exec(compile_action(code), env if env is not None else {})
+
+
+class PlaywrightActionExecutor:
+    """Execute Actions on one Playwright page.
+
+    `scale` maps agent (screen) coordinates to page (viewport) coordinates.
+    """
+
+    def __init__(self, page, scale=(1.0, 1.0)):
+        self.page = page
+        self.scale_x, self.scale_y = scale
+        self.position = (0, 0)
+        self.clipboard = None
+
+    def _xy(self, args, kwargs):
+        x = kwargs.get('x', args[0] if len(args) > 0 else None)
+        y = kwargs.get('y', args[1] if len(args) > 1 else None)
+        if isinstance(x, (tuple, list)):
+            x, y = x
+        if x is None or y is None:
+            return self.position
+        self.position = (x * self.scale_x, y * self.scale_y)
+        return self.position
+
+    async def run_code(self, code: str, env: dict = None) -> bool:
+        """Run agent code natively if possible. Returns True if translated."""
+        actions = parse_actions(code)
+        if actions is None:
+            logger.debug("[actions] Untranslatable code, using exec fallback: %s", code)
+            run_compiled(code, env)
+            return False
+        for action in actions:
+            await self.execute(action)
+        return True
+
+    async def execute(self, action: Action):
+        mouse, keyboard = self.page.mouse, self.page.keyboard
+        name, args, kwargs = action
+
+        if name in ('click', 'doubleClick', 'tripleClick', 'rightClick'):
+            x, y = self._xy(args, kwargs)
+            clicks = {'doubleClick': 2, 'tripleClick': 3}.get(name, kwargs.get('clicks', 1))
+            button = 'right' if name == 'rightClick' else kwargs.get('button', 'left')
+            await mouse.click(x, y, button=button, click_count=clicks)
+        elif name == 'moveTo':
+            x, y = self._xy(args, kwargs)
+            await mouse.move(x, y)
+        elif name == 'dragTo':
+            start = self.position
+            x, y = self._xy(args, kwargs)
+            await mouse.move(*start)
+            await mouse.down(button=kwargs.get('button', 'left'))
+            await mouse.move(x, y, steps=10)
+            await mouse.up(button=kwargs.get('button', 'left'))
+        elif name == 'mouseDown':
+            if args or 'x' in kwargs:
+                await mouse.move(*self._xy(args, kwargs))
+            await mouse.down(button=kwargs.get('button', 'left'))
+        elif name == 'mouseUp':
+            if args or 'x' in kwargs:
+                await mouse.move(*self._xy(args, kwargs))
+            await mouse.up(button=kwargs.get('button', 'left'))
+        elif name in ('scroll', 'vscroll', 'hscroll'):
+            clicks = kwargs.get('clicks', args[0] if args else 0)
+            if len(args) > 1 or 'x' in kwargs:
+                await mouse.move(*self._xy(args[1:], kwargs))
+            if name == 'hscroll':
+                await mouse.wheel(clicks * SCROLL_STEP_PX, 0)
+            else:
+                # pyautogui: positive scrolls up; Playwright: positive delta scrolls down
+                await mouse.wheel(0, -clicks * SCROLL_STEP_PX)
+        elif name in ('write', 'typewrite'):
+            message = kwargs.get('message', args[0] if args else '')
+            if isinstance(message, (list, tuple)):
+                for key in message:
+                    await keyboard.press(key_name(key))
+            else:
+                await keyboard.type(message, delay=kwargs.get('interval', 0) * 1000)
+        elif name == 'press':
+            keys = kwargs.get('keys', args[0] if args else [])
+            keys = keys if isinstance(keys, (list, tuple)) else [keys]
+            for _ in range(kwargs.get('presses', 1)):
+                for key in keys:
+                    await keyboard.press(key_name(key))
+        elif name == 'hotkey':
+            keys = [key_name(k) for k in args]
+            if self.clipboard is not None and [k.lower() for k in keys] in (['control', 'v'], ['meta', 'v']):
+                await keyboard.insert_text(self.clipboard)
+            else:
+                await keyboard.press("+".join(keys))
+        elif name == 'keyDown':
+            await keyboard.down(key_name(kwargs.get('key', args[0])))
+        elif name == 'keyUp':
+            await keyboard.up(key_name(kwargs.get('key', args[0])))
+        elif name == 'time.sleep':
+            await asyncio.sleep(kwargs.get('secs', args[0] if args else 0))
+        elif name == 'pyperclip.copy':
+            self.clipboard = kwargs.get('text', args[0] if args else '')
+        else:
+            raise ValueError(f"Unsupported action: {name}")
@@ -0,0 +1,117 @@
+# answer_extraction.py
+"""
+Extract a short answer string from the agent's final info dict.
+
+Rules are tried in order and the name of the rule that fired is returned
+with the answer, so string_match inputs stay short and the evaluation is
+deterministic:
+
+1. `structured` - an explicit answer field in the info dict
+2. `done_arg`   - the literal passed to agent.done(...) in plan_code, as the
+                  first argument or as return_value=...
+3. one of the named groups of ANSWER_PATTERN, matched over the final plan
+   text only (the last match wins, since the conclusion comes last)
+4. `fallback`   - the "(Next Action)" section of the plan, truncated
+"""
+
+import ast
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MAX_ANSWER_CHARS = 200
+
+STRUCTURED_KEYS = ('answer', 'final_answer', 'return_value', 'agent_answer')
+
+# One alternation, one pass; the named group that matched is the rule name.
+ANSWER_PATTERN = re.compile(r"""
+    the\ (?:first\ |cheapest\ |most\ expensive\ )?(?:product|item)\ (?:is|displayed(?:\ is)?)[:\s]*["']?(?P<product_is>[^"'.\n]+)
+  | name\ of\ the\ (?:first\ |cheapest\ )?product(?:\ is)?[:\s]*["']?(?P<product_name>[^"'.\n]+)
+  | answer\ is[:\s]*["']?(?P<answer_is>[^"'.\n]+)
+  | result\ is[:\s]*["']?(?P<result_is>[^"'.\n]+)
+  | total\ (?:number\ of\ )?products(?:\ is)?[:\s]*(?P<total_products>\d+)
+""", re.IGNORECASE | re.VERBOSE)
+
+_DONE_START = re.compile(r'agent\.done\(')
+_CODE_SECTION = re.compile(r'\(Grounded Action\)|```')
+_NEXT_ACTION = re.compile(r'\(Next Action\)\s*(?P<text>.*)', re.DOTALL)
+
+
+def _cap(text: str) -> str:
+    text = " ".join(str(text).split())
+    return text[:MAX_ANSWER_CHARS]
+
+
+def final_plan_text(agent_info) -> str:
+    """The reasoning part of the last plan, without the grounded-action code."""
+    if isinstance(agent_info, dict):
+        plan = agent_info.get('plan') or ""
+    else:
+        plan = str(agent_info or "")
+    return _CODE_SECTION.split(plan, 1)[0]
+
+
+def _done_calls(code: str):
+    """agent.done(...) Call nodes in code; scans call by call when the whole code does not parse."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        for match in _DONE_START.finditer(code):
+            close = match.end()
+            while (close := code.find(')', close)) != -1:
+                close += 1
+                try:
+                    yield ast.parse(code[match.start():close], mode='eval').body
+                    break
+                except SyntaxError:
+                    continue
+        return
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'done' \
+                and isinstance(node.func.value, ast.Name) and node.func.value.id == 'agent':
+            yield node
+
+
+def done_argument(code: str):
+    """The return value passed to agent.done(...): first positional argument or return_value=..., else None."""
+    for call in _done_calls(code):
+        if not isinstance(call, ast.Call):
+            continue
+        node = call.args[0] if call.args else next(
+            (k.value for k in call.keywords if k.arg == 'return_value'), None)
+        if node is None:
+            continue
+        try:
+            value = ast.literal_eval(node)
+        except ValueError:
+            continue
+        if value is not None:
+            return value if isinstance(value, str) else str(value)
+    return None
+
+
+def extract_answer(agent_info) -> tuple:
+    """Return (answer, rule) for the agent's final info dict."""
+    if not agent_info:
+        return "", None
+
+    if isinstance(agent_info, dict):
+        for key in STRUCTURED_KEYS:
+            value = agent_info.get(key)
+            if value not in (None, ""):
+                return _cap(value), 'structured'
+
+        value = done_argument(agent_info.get('plan_code') or "")
+        if value not in (None, ""):
+            return _cap(value), 'done_arg'
+
+    text = final_plan_text(agent_info)
+    last = None
+    for last in ANSWER_PATTERN.finditer(text):
+        pass
+    if last is not None:
+        return _cap(last.group(last.lastgroup).strip()), last.lastgroup
+
+    match = _NEXT_ACTION.search(text)
+    return _cap(match.group('text') if match else text), 'fallback'
@@ -0,0 +1,152 @@
+# deadlines.py
+"""
+Wall-clock deadlines for a task and for each of its phases.
+
+A Deadline holds the task budget (`task_seconds`) and per-phase limits
+(navigation, predict, action, settle, evaluation). Every guarded call gets
+min(phase limit, time left for the task):
+
+- `await deadline.run(phase, coro)` wraps asyncio.wait_for, so a hung
+  page.goto / networkidle wait is cancelled and the caller's `finally`
+  tears the browser down;
+- `deadline.call(phase, fn, ...)` and `await deadline.run_call(phase, fn, ...)`
+  run a blocking call (an LLM request) on a daemon thread of its own and stop
+  waiting for it when the budget runs out. The call itself cannot be
+  interrupted and finishes in the background; its result is discarded. The
+  thread is not the event loop's default executor, which asyncio.run() joins
+  at shutdown, so a hung call cannot hold the task past its deadline.
+
+All of them raise TaskTimeout(phase), which the runner records as a 'timeout'
+outcome rather than an ordinary error. For an abandoned call,
+TaskTimeout.pending is the thread still running it, so the caller can wait
+for it before reusing any state the call touches (the Agent-S agent).
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('navigation', 'predict', 'action', 'settle', 'evaluation')
+
+
+class TaskTimeout(Exception):
+    def __init__(self, phase: str, seconds: float, task_deadline: bool = False, pending: threading.Thread = None):
+        self.phase = phase
+        self.seconds = seconds
+        self.task_deadline = task_deadline
+        self.pending = pending  # thread still running an abandoned call, if any
+        limit = "task deadline" if task_deadline else "phase limit"
+        super().__init__(f"{phase} timed out ({limit} {seconds:g}s)")
+
+
+class Deadline:
+    def __init__(self, task_seconds: float = None, phase_seconds: dict = None):
+        self.task_seconds = task_seconds
+        self.phase_seconds = {p: s for p, s in (phase_seconds or {}).items() if p in PHASES and s}
+        self.start = time.monotonic()
+
+    def remaining(self):
+        if not self.task_seconds:
+            return None
+        return max(self.task_seconds - (time.monotonic() - self.start), 0.0)
+
+    def budget(self, phase: str):
+        """Seconds the phase may take (None = unlimited) and whether the task deadline is the binding limit."""
+        phase_limit = self.phase_seconds.get(phase)
+        remaining = self.remaining()
+        if remaining is not None and (phase_limit is None or remaining <= phase_limit):
+            return remaining, True
+        return phase_limit, False
+
+    def _timeout(self, phase: str, task_bound: bool, pending: threading.Thread = None) -> TaskTimeout:
+        seconds = self.task_seconds if task_bound else self.phase_seconds[phase]
+        logger.warning(f"[Deadline] {phase} timed out after {seconds:g}s"
+                       f"{' (task deadline)' if task_bound else ''}")
+        return TaskTimeout(phase, seconds, task_bound, pending)
+
+    def check(self, phase: str = 'task'):
+        """Raise TaskTimeout if the task budget is already spent."""
+        if self.remaining() == 0.0:
+            raise self._timeout(phase, True)
+
+    async def run(self, phase: str, awaitable):
+        budget, task_bound = self.budget(phase)
+        if budget is None:
+            return await awaitable
+        if budget <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise self._timeout(phase, task_bound)
+        try:
+            return await asyncio.wait_for(awaitable, budget)
+        except asyncio.TimeoutError:
+            raise self._timeout(phase, task_bound) from None
+
+    @staticmethod
+    def _start(phase: str, fn, args, kwargs, on_done) -> threading.Thread:
+        """Run fn in a copy of the caller's context on a daemon thread; on_done gets {'value' or 'error': ...}."""
+        context = contextvars.copy_context()
+
+        def target():
+            outcome = {}
+            try:
+                outcome['value'] = context.run(fn, *args, **kwargs)
+            except BaseException as e:
+                outcome['error'] = e
+            on_done(outcome)
+
+        thread = threading.Thread(target=target, name=f"deadline-{phase}", daemon=True)
+        thread.start()
+        return thread
+
+    def call(self, phase: str, fn, *args, **kwargs):
+        budget, task_bound = self.budget(phase)
+        if budget is None:
+            return fn(*args, **kwargs)
+        if budget <= 0:
+            raise self._timeout(phase, task_bound)
+        outcome = {}
+        finished = threading.Event()
+
+        def on_done(result):
+            outcome.update(result)
+            finished.set()
+
+        thread = self._start(phase, fn, args, kwargs, on_done)
+        if not finished.wait(budget):
+            raise self._timeout(phase, task_bound, thread)
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['value']
+
+    async def run_call(self, phase: str, fn, *args, **kwargs):
+        """call() for coroutines: awaits fn's thread without blocking the event loop."""
+        budget, task_bound = self.budget(phase)
+        if budget is not None and budget <= 0:
+            raise self._timeout(phase, task_bound)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(outcome):
+            if future.done():
+                return
+            if 'error' in outcome:
+                future.set_exception(outcome['error'])
+            else:
+                future.set_result(outcome['value'])
+
+        def on_done(outcome):
+            try:
+                loop.call_soon_threadsafe(settle, outcome)
+            except RuntimeError:
+                pass  # loop already closed: the caller gave up on this call
+
+        thread = self._start(phase, fn, args, kwargs, on_done)
+        try:
+            return await asyncio.wait_for(future, budget)
+        except asyncio.TimeoutError:
+            raise self._timeout(phase, task_bound, thread) from None
@@ -0,0 +1,461 @@
+# dom_query.py
+"""
+Declarative DOM checks that run in a browser or on fetched HTML.
+
+Instead of a JS `dom_extractor`, a dom_match block may declare a query:
+
+    "dom_match": {
+        "url": "__PRESTASHOP__/en/content/4-about-us",
+        "dom_query": {"selector": "h1", "check": "text"},
+        "match_type": "exact",
+        "match_value": "About Our PrestaShop Store"
+    }
+
+`dom_query` fields:
+
+- selector:  CSS selector
+- check:     'text' (default) -> text/attribute of the first match (None if none)
+             'count'          -> number of matches
+             'exists'         -> whether anything matches
+- attribute: read this attribute instead of the element text ('value' reads
+             the live input value in a browser)
+- all:       with check='text', join the texts of every match with newlines,
+             so `contains` means "some element contains"
+
+The extracted value goes through the usual match_type/match_value logic.
+`query_to_js` turns the query into an extractor for Playwright/Selenium;
+`run_query` evaluates it on HTML fetched with `HTTPClient`, a keep-alive
+connection pool that carries session cookies (a separate jar per host). Server-rendered checks then
+need no browser at all. Set "render": "client" on the dom_match block for
+pages whose content is built by JavaScript. A non-2xx response fails the
+check unless the block declares the expected "status" (a code or a list).
+
+lxml + cssselect are used when installed; otherwise a small html.parser
+tree with a selector subset (tag, #id, .class, [attr], [attr=v], [attr*=v],
+[attr^=v], [attr$=v], descendant and child combinators, selector lists).
+"""
+
+import gzip
+import http.client
+import json
+import logging
+import queue
+import re
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from http.cookies import SimpleCookie
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import lxml.html
+    import cssselect  # noqa: F401  (required by lxml's cssselect())
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+CHECKS = ('text', 'count', 'exists')
+
+
+# --- query -> browser extractor ---------------------------------------------
+
+def query_to_js(query: dict) -> str:
+    """JS expression equivalent to run_query(query, html) on the live DOM."""
+    selector = json.dumps(query['selector'])
+    check = query.get('check', 'text')
+    if check == 'count':
+        return f"document.querySelectorAll({selector}).length"
+    if check == 'exists':
+        return f"document.querySelector({selector}) !== null"
+    attribute = query.get('attribute')
+    if attribute == 'value':
+        read = "(el.value ?? el.getAttribute('value'))"
+    elif attribute:
+        read = f"el.getAttribute({json.dumps(attribute)})"
+    else:
+        read = "el.innerText.replace(/\\s+/g, ' ').trim()"
+    if query.get('all'):
+        return f"[...document.querySelectorAll({selector})].map(el => {read}).join('\\n')"
+    return f"(() => {{ const el = document.querySelector({selector}); return el ? {read} : null; }})()"
+
+
+# --- minimal DOM for the stdlib fallback ------------------------------------
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+SKIP_TEXT_TAGS = {'script', 'style', 'template', 'noscript', 'head'}
+# Open elements implicitly closed by a new start tag (optional end tags)
+IMPLICIT_CLOSE = {
+    'li': {'li'}, 'option': {'option'}, 'dt': {'dt', 'dd'}, 'dd': {'dt', 'dd'},
+    'tr': {'tr', 'td', 'th'}, 'td': {'td', 'th'}, 'th': {'td', 'th'},
+}
+CLOSES_P = {'address', 'article', 'aside', 'div', 'dl', 'fieldset', 'footer', 'form', 'h1', 'h2', 'h3',
+            'h4', 'h5', 'h6', 'header', 'hr', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'}
+
+
+class Node:
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+
+    def classes(self):
+        return self.attrs.get('class', '').split()
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.iter()
+
+    def text(self):
+        parts = []
+        for child in self.children:
+            if isinstance(child, Node):
+                if child.tag not in SKIP_TEXT_TAGS:
+                    parts.append(child.text())
+            else:
+                parts.append(child)
+        return " ".join(parts)
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('#document')
+        self.stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        top = self.stack[-1].tag
+        if top in IMPLICIT_CLOSE.get(tag, ()) or (top == 'p' and tag in CLOSES_P):
+            self.stack.pop()
+        node = Node(tag, {k: (v or '') for k, v in attrs}, self.stack[-1])
+        self.stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1].children.append(Node(tag, {k: (v or '') for k, v in attrs}, self.stack[-1]))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element; stray end tags are ignored
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].children.append(data)
+
+
+_COMPOUND_RE = re.compile(
+    r'(?P<tag>[a-zA-Z][\w-]*|\*)|#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$~|]?=)\s*(?P<val>"[^"]*"|\'[^\']*\'|[^\]\s]+)\s*)?\]'
+)
+
+
+def _parse_compound(text: str):
+    tests, pos = [], 0
+    while pos < len(text):
+        m = _COMPOUND_RE.match(text, pos)
+        if not m:
+            raise ValueError(f"Unsupported selector syntax: {text!r}")
+        if m.group('tag') and m.group('tag') != '*':
+            tests.append(('tag', m.group('tag').lower(), None))
+        elif m.group('id'):
+            tests.append(('id', m.group('id'), None))
+        elif m.group('cls'):
+            tests.append(('class', m.group('cls'), None))
+        elif m.group('attr'):
+            val = m.group('val')
+            if val and val[0] in '"\'':
+                val = val[1:-1]
+            tests.append(('attr', m.group('attr').lower(), (m.group('op'), val)))
+        pos = m.end()
+    return tests
+
+
+def _split_selector_list(selector: str) -> list:
+    """Split a selector list on top-level commas (not inside quotes, [...] or (...))."""
+    parts, start, depth, quote = [], 0, 0, None
+    for i, char in enumerate(selector):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth = max(depth - 1, 0)
+        elif char == ',' and depth == 0:
+            parts.append(selector[start:i])
+            start = i + 1
+    parts.append(selector[start:])
+    return parts
+
+
+def _parse_selector(selector: str):
+    """'a b > c, d' -> [[(None, tests_a), (' ', tests_b), ('>', tests_c)], [(None, tests_d)]]"""
+    groups = []
+    for part in _split_selector_list(selector):
+        tokens = re.findall(r'\[[^\]]*\]|>|[^\s>\[]+(?:\[[^\]]*\][^\s>\[]*)*|\s+', part.strip())
+        steps, combinator = [], None
+        for token in tokens:
+            if token.isspace():
+                combinator = combinator or ' '
+            elif token == '>':
+                combinator = '>'
+            else:
+                if token.startswith('[') and steps and combinator is None:
+                    steps[-1][1].extend(_parse_compound(token))
+                    continue
+                steps.append((combinator if steps else None, _parse_compound(token)))
+                combinator = None
+        groups.append(steps)
+    return groups
+
+
+def _matches_compound(node: Node, tests) -> bool:
+    for kind, name, extra in tests:
+        if kind == 'tag' and node.tag != name:
+            return False
+        if kind == 'id' and node.attrs.get('id') != name:
+            return False
+        if kind == 'class' and name not in node.classes():
+            return False
+        if kind == 'attr':
+            if name not in node.attrs:
+                return False
+            op, val = extra
+            actual = node.attrs[name]
+            if op == '=' and actual != val:
+                return False
+            if op == '*=' and val not in actual:
+                return False
+            if op == '^=' and not actual.startswith(val):
+                return False
+            if op == '$=' and not actual.endswith(val):
+                return False
+            if op == '~=' and val not in actual.split():
+                return False
+            if op == '|=' and not (actual == val or actual.startswith(val + '-')):
+                return False
+    return True
+
+
+def _matches_steps(node: Node, steps) -> bool:
+    combinator, tests = steps[-1]
+    if not _matches_compound(node, tests):
+        return False
+    if len(steps) == 1:
+        return True
+    parent = node.parent
+    if combinator == '>':
+        return parent is not None and parent.tag != '#document' and _matches_steps(parent, steps[:-1])
+    while parent is not None and parent.tag != '#document':
+        if _matches_steps(parent, steps[:-1]):
+            return True
+        parent = parent.parent
+    return False
+
+
+class _FallbackDocument:
+    def __init__(self, html: str):
+        builder = _TreeBuilder()
+        builder.feed(html)
+        builder.close()
+        self.root = builder.root
+
+    def select(self, selector: str):
+        groups = _parse_selector(selector)
+        return [node for node in self.root.iter() if any(_matches_steps(node, steps) for steps in groups)]
+
+    @staticmethod
+    def text(node):
+        return node.text()
+
+    @staticmethod
+    def attribute(node, name):
+        return node.attrs.get(name)
+
+
+class _LxmlDocument:
+    def __init__(self, html: str):
+        self.root = lxml.html.document_fromstring(html)
+
+    def select(self, selector: str):
+        return self.root.cssselect(selector)
+
+    @staticmethod
+    def text(node):
+        return " ".join(node.xpath(
+            './/text()[not(ancestor::script or ancestor::style or ancestor::template or ancestor::noscript)]'
+        ))
+
+    @staticmethod
+    def attribute(node, name):
+        return node.get(name)
+
+
+def parse_html(html: str):
+    return _LxmlDocument(html) if lxml is not None else _FallbackDocument(html)
+
+
+def run_query(query: dict, html_or_document):
+    """Evaluate a dom_query on an HTML string (or a parse_html() document)."""
+    document = parse_html(html_or_document) if isinstance(html_or_document, str) else html_or_document
+    check = query.get('check', 'text')
+    if check not in CHECKS:
+        raise ValueError(f"Unknown dom_query check: {check}")
+    nodes = document.select(query['selector'])
+    if check == 'count':
+        return len(nodes)
+    if check == 'exists':
+        return len(nodes) > 0
+    attribute = query.get('attribute')
+
+    def read(node):
+        if attribute:
+            return document.attribute(node, attribute)
+        return " ".join(document.text(node).split())
+
+    if query.get('all'):
+        return "\n".join(str(read(node)) for node in nodes)
+    return read(nodes[0]) if nodes else None
+
+
+# --- pooled keep-alive HTTP client ------------------------------------------
+
+Response = namedtuple('Response', ['status', 'url', 'text'])
+
+
+class HTTPClient:
+    """Thread-safe keep-alive HTTP(S) client with per-host connection pools and cookie jars.
+
+    `cookies` maps a cookie name to its value (sent to every host), or a host
+    name to a {name: value} dict for that host only. Cookies set by a
+    response are kept for the host that set them.
+    """
+
+    def __init__(self, max_connections_per_host: int = 8, timeout: float = 10.0, cookies: dict = None,
+                 headers: dict = None, max_redirects: int = 5):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        cookies = cookies or {}
+        self.default_cookies = {k: v for k, v in cookies.items() if not isinstance(v, dict)}
+        self.cookies = {host: dict(v) for host, v in cookies.items() if isinstance(v, dict)}  # host -> jar
+        self.headers = {'User-Agent': 'WebAppEval-dom-check', 'Accept': 'text/html,*/*',
+                        'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'}
+        self.headers.update(headers or {})
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = queue.LifoQueue(self.max_connections_per_host)
+                for _ in range(self.max_connections_per_host):
+                    pool.put(None)  # lazily connected slot
+            return pool
+
+    def _connect(self, scheme, host, port):
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout)
+
+    def _request_once(self, url: str):
+        parts = urlsplit(url)
+        scheme, host = parts.scheme or 'http', parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(self.headers)
+        with self._lock:
+            cookies = {**self.default_cookies, **self.cookies.get(host, {})}
+        if cookies:
+            headers['Cookie'] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+        pool = self._pool((scheme, host, port))
+        conn = pool.get()
+        try:
+            for attempt in range(2):
+                if conn is None:
+                    conn = self._connect(scheme, host, port)
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    body = response.read()
+                    break
+                except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError):
+                    # Server closed an idle keep-alive connection; retry once on a fresh one
+                    conn.close()
+                    conn = None
+                    if attempt:
+                        raise
+            if response.will_close:
+                conn.close()
+                conn = None
+        except Exception:
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            pool.put(conn)
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            jar = SimpleCookie()
+            jar.load(header)
+            with self._lock:
+                host_jar = self.cookies.setdefault(host, {})
+                for name, morsel in jar.items():
+                    host_jar[name] = morsel.value
+
+        encoding = (response.headers.get('Content-Encoding') or '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        charset = response.headers.get_content_charset() or 'utf-8'
+        return response.status, response.headers.get('Location'), body.decode(charset, errors='replace')
+
+    def get(self, url: str) -> Response:
+        """GET following redirects. Non-2xx responses are returned, not raised."""
+        for _ in range(self.max_redirects + 1):
+            status, location, text = self._request_once(url)
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return Response(status, url, text)
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def fetch_many(self, urls, max_workers: int = 32) -> dict:
+        """Fetch distinct URLs concurrently over the pooled connections: {url: Response or exception}."""
+        unique = list(dict.fromkeys(urls))
+
+        def fetch(url):
+            try:
+                return self.get(url)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(unique, executor.map(fetch, unique)))
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            while not pool.empty():
+                conn = pool.get_nowait()
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,98 @@
+# eval_context.py
+"""
+Lightweight Playwright contexts for evaluation-only page loads.
+
+A dom_match check on a navigated URL only needs the DOM, so evaluation pages:
+
+- abort image, media and font requests and known analytics/tracking hosts,
+- disable CSS animations and transitions (and request reduced motion),
+- wait for `domcontentloaded` instead of `networkidle`,
+- poll the extractor until it matches or `timeout_ms` expires, instead of a
+  fixed sleep before a single read.
+
+A dom_match block can override the defaults:
+
+    "dom_match": {"url": "...", "dom_extractor": "...",
+                  "wait_until": "networkidle", "timeout_ms": 10000,
+                  "allow_resources": ["image"]}
+"""
+
+import asyncio
+import logging
+import time
+from urllib.parse import urlparse
+
+from evaluate.handlers import dom_match_logic, extractor_js
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+
+BLOCKED_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'facebook.net', 'facebook.com', 'hotjar.com', 'segment.io', 'matomo.cloud', 'clarity.ms',
+)
+
+DISABLE_ANIMATIONS_CSS = (
+    "*, *::before, *::after { animation: none !important; transition: none !important; "
+    "caret-color: transparent !important; scroll-behavior: auto !important; }"
+)
+
+DEFAULT_WAIT_UNTIL = 'domcontentloaded'
+DEFAULT_TIMEOUT_MS = 5000
+POLL_INTERVAL = 0.25
+
+
+def _blocked_host(url: str) -> bool:
+    host = urlparse(url).hostname or ''
+    return any(host == h or host.endswith('.' + h) for h in BLOCKED_HOSTS)
+
+
+async def new_eval_page(browser, viewport: dict = None, allow_resources=()):
+    """New context + page that only fetches what DOM checks need. Returns (context, page)."""
+    blocked_types = tuple(t for t in BLOCKED_RESOURCE_TYPES if t not in allow_resources)
+    context = await browser.new_context(viewport=viewport, reduced_motion='reduce',
+                                        service_workers='block')
+
+    async def route_request(route):
+        request = route.request
+        if request.resource_type in blocked_types or _blocked_host(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route('**/*', route_request)
+    await context.add_init_script(
+        "document.addEventListener('DOMContentLoaded', () => {"
+        " const style = document.createElement('style');"
+        f" style.textContent = {DISABLE_ANIMATIONS_CSS!r};"
+        " document.head.appendChild(style); });"
+    )
+    page = await context.new_page()
+    return context, page
+
+
+async def load_for_eval(page, url: str, conf: dict = None):
+    """Navigate for evaluation, waiting only as long as the check declares."""
+    wait_until = (conf or {}).get('wait_until', DEFAULT_WAIT_UNTIL)
+    start = time.time()
+    await page.goto(url, wait_until=wait_until)
+    logger.debug("[eval_context] Loaded %s (%s) in %.2fs", url, wait_until, time.time() - start)
+
+
+async def poll_dom_match(page, conf: dict, timeout_ms: int = None) -> bool:
+    """Run the DOM extractor until it matches or the timeout expires."""
+    timeout_ms = conf.get('timeout_ms', DEFAULT_TIMEOUT_MS) if timeout_ms is None else timeout_ms
+    deadline = time.time() + timeout_ms / 1000.0
+    value = None
+    while True:
+        try:
+            value = await page.evaluate(extractor_js(conf))
+        except Exception as e:  # page still navigating / script not ready yet
+            logger.debug("[eval_context] Extractor error, retrying: %s", e)
+            value = None
+        if value is not None and dom_match_logic(value, conf):
+            return True
+        if time.time() >= deadline:
+            return dom_match_logic(value, conf)
+        await asyncio.sleep(POLL_INTERVAL)
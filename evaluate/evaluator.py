@@ -1,9 +1,12 @@
 import ast
 import json
+import logging
 from selenium.webdriver.remote.webdriver import WebDriver
 from playwright.async_api import Page
 from evaluate.handlers import *
 
+logger = logging.getLogger(__name__)
+
 
 class Evaluator:
     def __init__(self, tasks):
@@ -13,51 +16,51 @@ class Evaluator:
     def evaluate_with_selenium(self, task_id, agent_result=None, browser: WebDriver=None):
         task = next((task for task in self.tasks if task['task_id'] == task_id), None)
         if not task:
-            print(f"Task ID {task_id} not found.")
+            logger.warning("Task ID %s not found.", task_id)
             return False
         # Simulate evaluation logic
-        print(f"---------Evaluating task: {task['task_id']}------")
+        logger.info("---------Evaluating task: %s------", task['task_id'])
         eval_block = task['eval']
         result = False
         for eval_type in eval_block['eval_type']:
             if eval_type == 'dom_match':
                 if isinstance(browser, WebDriver):
-                    print(f"Evaluating {eval_type} with Selenium...")
+                    logger.debug("Evaluating %s with Selenium...", eval_type)
                     if not dom_match_selenium(target_conf=eval_block[eval_type], browser=browser):
                         return False
                 else:
-                    print("Browser is not a valid Selenium WebDriver instance.")
+                    logger.warning("Browser is not a valid Selenium WebDriver instance.")
                     return False
             elif eval_type == 'url_match':
                 if isinstance(browser, WebDriver):
-                    print(f"Evaluating {eval_type} with Selenium...")
+                    logger.debug("Evaluating %s with Selenium...", eval_type)
                     if not url_match_selenium(target_conf=eval_block[eval_type], browser=browser):
                         return False
                 else:
-                    print("Browser is not a valid Selenium WebDriver instance.")
+                    logger.warning("Browser is not a valid Selenium WebDriver instance.")
                     return False
             elif eval_type == 'string_match':     
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not string_match(target_conf=eval_block[eval_type], agent_result=agent_result, task=task['task_description']):
                     return False
                 result = True
             elif eval_type == 'regex_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not regex_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
             elif eval_type == 'multiset_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not multiset_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
             elif eval_type == 'list_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not list_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
             else:
-                print(f"Unknown eval type: {eval_type}")
+                logger.warning("Unknown eval type: %s", eval_type)
                 return False  # Nếu eval_type không hợp lệ, trả về False
                 
         return result
@@ -66,61 +69,94 @@ class Evaluator:
     async def evaluate_with_playwright(self, task_id, agent_result=None, browser: Page=None):
         task = next((task for task in self.tasks if task['task_id'] == task_id), None)
         if not task:
-            print(f"Task ID {task_id} not found.")
+            logger.warning("Task ID %s not found.", task_id)
             return False
         # Simulate evaluation logic
-        print(f"---------Evaluating task: {task['task_id']}------")
+        logger.info("---------Evaluating task: %s------", task['task_id'])
         eval_block = task['eval']
         result = False
         for eval_type in eval_block['eval_type']:
             if eval_type == 'dom_match':
-                print(f"Evaluating {eval_type} with Playwright...")
+                logger.debug("Evaluating %s with Playwright...", eval_type)
                 if not await dom_match_playwright(target_conf=eval_block[eval_type], browser=browser):
                     return False
                 result = True
                 # Handle DOM matching with Playwright
             elif eval_type == 'url_match':
-                print(f"Evaluating {eval_type} with Playwright...")
+                logger.debug("Evaluating %s with Playwright...", eval_type)
                 if not await url_match_playwright(target_conf=eval_block[eval_type], browser=browser):
                     return False
                 result = True
                 # Handle URL matching with Playwright       
             elif eval_type == 'string_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not string_match(target_conf=eval_block[eval_type], agent_result=agent_result, task=task['task_description']):
                     return False
                 result = True   
             elif eval_type == 'regex_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not regex_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
 
             elif eval_type == 'multiset_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not multiset_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
             elif eval_type == 'list_match':
-                print(f"Evaluating {eval_type}...")
+                logger.debug("Evaluating %s...", eval_type)
                 if not list_match(target_conf=eval_block[eval_type], agent_result=agent_result):
                     return False
                 result = True
             else:
-                print(f"Unknown eval type: {eval_type}")
+                logger.warning("Unknown eval type: %s", eval_type)
                 return False  # Nếu eval_type không hợp lệ, trả về False
                 
         return result
 
+    def evaluate_with_http(self, task_id, agent_result=None, client=None, url_resolver=None):
+        """Browserless evaluation: dom_match blocks with a dom_query are checked on HTML
+        fetched through `client` (evaluate.dom_query.HTTPClient)."""
+        task = next((task for task in self.tasks if task['task_id'] == task_id), None)
+        if not task:
+            logger.warning("Task ID %s not found.", task_id)
+            return False
+        logger.info("---------Evaluating task (HTTP): %s------", task['task_id'])
+        eval_block = task['eval']
+        result = False
+        for eval_type in eval_block['eval_type']:
+            if eval_type == 'dom_match':
+                target_conf = eval_block[eval_type]
+                if not dom_match_http_capable(target_conf):
+                    logger.warning("dom_match of task %s needs a browser.", task_id)
+                    return False
+                url = url_resolver(target_conf['url']) if url_resolver else target_conf['url']
+                if not dom_match_http(target_conf=target_conf, client=client, url=url):
+                    return False
+                result = True
+            elif eval_type == 'string_match':
+                if not string_match(target_conf=eval_block[eval_type], agent_result=agent_result, task=task['task_description']):
+                    return False
+                result = True
+            elif eval_type == 'regex_match':
+                if not regex_match(target_conf=eval_block[eval_type], agent_result=agent_result):
+                    return False
+                result = True
+            else:
+                logger.warning("Eval type %s is not supported over HTTP.", eval_type)
+                return False
+        return result
+
     def eval_type_check(self):
         for task in self.tasks:
             eval_block = task['eval']
             for eval_type in eval_block['eval_type']:
-                print(f"Checking eval type: {eval_type} in task {task['task_id']}")
+                logger.debug("Checking eval type: %s in task %s", eval_type, task['task_id'])
                 if eval_type not in ['string_match', 'regex_match', 'url_match', 'dom_match']:
-                    print(f"Invalid eval type: {eval_type} in task {task['task_id']}")
+                    logger.warning("Invalid eval type: %s in task %s", eval_type, task['task_id'])
                     return False
-        print("All eval types are valid.")
+        logger.info("All eval types are valid.")
 
 
 
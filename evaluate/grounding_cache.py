@@ -0,0 +1,157 @@
+# grounding_cache.py
+"""
+Cache for grounding model results (element description -> coordinates).
+
+Entries are keyed by the normalized element description. Each entry stores
+the coordinates returned by the grounding model and a perceptual hash (dHash)
+of the screenshot region around them. On lookup, a candidate is only served
+if the same region of the *current* screenshot still hashes within
+`max_distance` bits, i.e. the element is visibly still at that spot (the
+PrestaShop header menu, the login link, ...). Eviction is LRU; the cache can
+be persisted to a JSON file so it is shared across tasks and runs.
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def normalize_description(description: str) -> str:
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', str(description).lower())).strip()
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: 64-bit fingerprint robust to small rendering changes."""
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class GroundingCache:
+    def __init__(self, max_entries: int = 512, region_size: tuple = (160, 64), max_distance: int = 6,
+                 candidates_per_description: int = 4, grounding_size: tuple = None, path: str = None):
+        self.max_entries = max_entries
+        self.region_size = region_size
+        self.max_distance = max_distance
+        self.candidates_per_description = candidates_per_description
+        self.grounding_size = grounding_size
+        self.path = path
+        self.entries = OrderedDict()  # description -> [{'coords': [x, y], 'region_hash': int}, ...]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last_image = (None, None)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # --- image helpers ------------------------------------------------------
+    def _image(self, screenshot) -> Image.Image:
+        if isinstance(screenshot, Image.Image):
+            return screenshot
+        key, image = self._last_image
+        if key is not screenshot:
+            image = Image.open(io.BytesIO(screenshot))
+            image.load()
+            self._last_image = (screenshot, image)
+        return image
+
+    def _region_hash(self, image: Image.Image, coords) -> int:
+        x, y = coords[0], coords[1]
+        if self.grounding_size:
+            x = x * image.width / self.grounding_size[0]
+            y = y * image.height / self.grounding_size[1]
+        half_w, half_h = self.region_size[0] // 2, self.region_size[1] // 2
+        box = (
+            max(int(x) - half_w, 0), max(int(y) - half_h, 0),
+            min(int(x) + half_w, image.width), min(int(y) + half_h, image.height),
+        )
+        return dhash(image.crop(box))
+
+    # --- cache API ----------------------------------------------------------
+    def lookup(self, description: str, screenshot):
+        key = normalize_description(description)
+        with self._lock:
+            candidates = self.entries.get(key)
+            if candidates:
+                image = self._image(screenshot)
+                for candidate in candidates:
+                    if hamming(self._region_hash(image, candidate['coords']), candidate['region_hash']) <= self.max_distance:
+                        self.entries.move_to_end(key)
+                        self.hits += 1
+                        return list(candidate['coords'])
+            self.misses += 1
+            return None
+
+    def store(self, description: str, screenshot, coords):
+        key = normalize_description(description)
+        with self._lock:
+            image = self._image(screenshot)
+            candidate = {'coords': [int(coords[0]), int(coords[1])], 'region_hash': self._region_hash(image, coords)}
+            candidates = self.entries.pop(key, [])
+            candidates = [candidate] + [c for c in candidates if c['coords'] != candidate['coords']]
+            self.entries[key] = candidates[:self.candidates_per_description]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def wrap(self, grounding_agent):
+        """Route grounding_agent.generate_coords through the cache."""
+        generate_coords = grounding_agent.generate_coords
+
+        def cached_generate_coords(ref_expr, obs, *args, **kwargs):
+            screenshot = obs.get('screenshot') if isinstance(obs, dict) else None
+            if screenshot is None:
+                return generate_coords(ref_expr, obs, *args, **kwargs)
+            coords = self.lookup(ref_expr, screenshot)
+            if coords is not None:
+                logger.info(f"[GroundingCache] Hit for '{ref_expr}': {coords}")
+                return coords
+            coords = generate_coords(ref_expr, obs, *args, **kwargs)
+            self.store(ref_expr, screenshot, coords)
+            return coords
+
+        grounding_agent.generate_coords = cached_generate_coords
+        return grounding_agent
+
+    # --- persistence --------------------------------------------------------
+    def load(self, path: str):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = OrderedDict((k, v) for k, v in data.get('entries', []))
+            logger.info(f"[GroundingCache] Loaded {len(self.entries)} entries from {path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"[GroundingCache] Ignoring unreadable cache {path}: {e}")
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            data = {'entries': list(self.entries.items())}
+        # Display workers save the same cache file; replace it atomically so a reader never sees half of it
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logger.info(f"[GroundingCache] Saved {len(data['entries'])} entries to {path} "
+                    f"(hits: {self.hits}, misses: {self.misses})")
@@ -1,7 +1,9 @@
 # handlers.py
 
+import logging
 import re
 from evaluate.matchers import *
+from evaluate.dom_query import query_to_js, run_query
 from collections import Counter
 import asyncio
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -10,6 +12,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+logger = logging.getLogger(__name__)
+
 def string_match(target_conf, agent_result, task=None):
     match_type = target_conf['match_type']
     match_value = target_conf['match_value']
@@ -24,7 +28,7 @@ def string_match(target_conf, agent_result, task=None):
         return semantic(task, agent_result, match_value)
     
     else:
-        print(f"Unknown match_type: {match_type}")
+        logger.warning("Unknown match_type: %s", match_type)
         return False
 
 
@@ -39,7 +43,7 @@ def url_match(target_conf, agent_result):
     elif match_type == 'contains':
         return check_contains(agent_result, match_value)
     else:
-        print(f"Unknown match_type: {match_type}")
+        logger.warning("Unknown match_type: %s", match_type)
         return False
 
 def url_match_selenium(target_conf, browser: WebDriver=None):    
@@ -52,7 +56,7 @@ def url_match_selenium(target_conf, browser: WebDriver=None):
     elif match_type == 'contains':
         return check_contains(current_url, match_value)
     else:
-        print(f"Unknown match_type: {match_type}")
+        logger.warning("Unknown match_type: %s", match_type)
         return False
 
 async def url_match_playwright(target_conf, browser: Page=None):    
@@ -65,14 +69,14 @@ async def url_match_playwright(target_conf, browser: Page=None):
     elif match_type == 'contains':
         return check_contains(current_url, match_value)
     else:
-        print(f"Unknown match_type: {match_type}")
+        logger.warning("Unknown match_type: %s", match_type)
         return False
 
 
 
 def dom_match_logic(agent_result, target_conf):
     if agent_result is None:
-        print("[dom_match] No value returned from JS script.")
+        logger.info("[dom_match] No value returned from JS script.")
         return False
     match_type = target_conf['match_type']
     match_value = target_conf['match_value']
@@ -81,22 +85,54 @@ def dom_match_logic(agent_result, target_conf):
 
     elif match_type == 'contains':
         temp = check_contains(agent_result, match_value)
-        print(f"[dom_match] Contains check: {temp}")
+        logger.debug("[dom_match] Contains check: %s", temp)
         return temp
     else:
-        print(f"Unknown match_type: {match_type}")
+        logger.warning("Unknown match_type: %s", match_type)
+        return False
+
+def extractor_js(target_conf):
+    """JS extractor for a dom_match block (explicit dom_extractor or declarative dom_query)."""
+    if target_conf.get('dom_extractor'):
+        return target_conf['dom_extractor']
+    return query_to_js(target_conf['dom_query'])
+
+def dom_match_http_capable(target_conf):
+    """True if the block can be checked on server-rendered HTML (no browser)."""
+    url = (target_conf.get('url') or '').strip().lower()
+    return ('dom_query' in target_conf and target_conf.get('render', 'server') == 'server'
+            and url not in ('', 'current', 'last'))
+
+def expected_status(target_conf, status):
+    """True if status is what the block expects: its "status" (a code or list of codes), else any 2xx."""
+    expected = target_conf.get('status')
+    if expected is None:
+        return 200 <= status < 300
+    if isinstance(expected, (list, tuple)):
+        return status in expected
+    return status == expected
+
+def dom_match_http(target_conf, client, url=None):
+    """Fetch the page with a pooled HTTP client and run the dom_query on its HTML."""
+    url = url or target_conf['url']
+    response = client.get(url)
+    logger.debug("[dom_match] HTTP %s %s (%d bytes)", response.status, response.url, len(response.text))
+    if not expected_status(target_conf, response.status):
+        logger.warning("[dom_match] Unexpected HTTP status %s for %s", response.status, response.url)
         return False
+    agent_result = run_query(target_conf['dom_query'], response.text)
+    return dom_match_logic(agent_result, target_conf)
 
 def dom_match_selenium(target_conf, browser: WebDriver, agent_result=None):
     url = target_conf['url'].strip().lower()
-    js_script = target_conf['dom_extractor']
+    js_script = extractor_js(target_conf)
     if url in ('', 'current', 'last', None):
-        print("[dom_match] Using current page context.")
+        logger.debug("[dom_match] Using current page context.")
     else:
-        print(f"[dom_match] Expected agent to visit URL: {url}")
+        logger.debug("[dom_match] Expected agent to visit URL: %s", url)
         browser.get(url)
 
-    print(f"[dom_match] Executing JS script: {js_script}")
+    logger.debug("[dom_match] Executing JS script: %s", js_script)
     # Chờ cho phần tử tồn tại trong DOM
     agent_result = WebDriverWait(browser, 10).until(
         lambda d: d.execute_script(f"return {js_script}")
@@ -105,11 +141,11 @@ def dom_match_selenium(target_conf, browser: WebDriver, agent_result=None):
 
 async def dom_match_playwright(target_conf, browser: Page):
     url = target_conf['url'].strip().lower()
-    js_script = target_conf['dom_extractor']
+    js_script = extractor_js(target_conf)
     if url in ('', 'current', 'last', None):
-        print("[dom_match] Using current page context.")
+        logger.debug("[dom_match] Using current page context.")
     else:
-        print(f"[dom_match] Expected agent to visit URL: {url}")
+        logger.debug("[dom_match] Expected agent to visit URL: %s", url)
         await browser.goto(url)
         
     await browser.wait_for_timeout(5000)
@@ -128,9 +164,9 @@ async def dom_match_playwright(target_conf, browser: Page):
 
 def regex_match(target_conf, agent_result):
     # Expect agent_result is dict: { "email": "...", "password": "..." }
-    print(f"[regex_match]:\nAgent Value: {agent_result}.\nMatch Conf: {target_conf}")
+    logger.debug("[regex_match]:\nAgent Value: %s.\nMatch Conf: %s", agent_result, target_conf)
     if not isinstance(agent_result, dict):
-        print("Invalid agent result for regex_match: must be dict")
+        logger.warning("Invalid agent result for regex_match: must be dict")
         return False
 
     for key, conf in target_conf.items():
@@ -139,28 +175,28 @@ def regex_match(target_conf, agent_result):
 
         val = agent_result.get(key)
         if required and val is None:
-            print(f"Missing required field: {key}")
+            logger.debug("[regex_match] Missing required field: %s", key)
             return False
         if val and not re.match(pattern, val):
-            print(f"Regex failed for {key}: value {val} does not match {pattern}")
+            logger.debug("[regex_match] Regex failed for %s: value %s does not match %s", key, val, pattern)
             return False
     return True
 
 
 def multiset_match(target_conf, agent_result):
     expected = target_conf['match_value']
-    print(f"[multiset_match] Expected: {expected}, Agent Value: {agent_result}")
+    logger.debug("[multiset_match] Expected: %s, Agent Value: %s", expected, agent_result)
     if not isinstance(agent_result, list):
-        print("[multiset_match] agent_result must be list-like.")
+        logger.warning("[multiset_match] agent_result must be list-like.")
         return False
     return Counter(expected) == Counter(agent_result)
 
 
 def list_match(target_conf, agent_result):
     expected = target_conf['match_value']
-    print(f"[list_match] Expected: {expected}, Agent Value: {agent_result}")
+    logger.debug("[list_match] Expected: %s, Agent Value: %s", expected, agent_result)
     if not isinstance(agent_result, list):
-        print("[list_match] agent_result must be list.")
+        logger.warning("[list_match] agent_result must be list.")
         return False
     return expected == agent_result
 
@@ -0,0 +1,310 @@
+# log_index.py
+"""
+Structured run events and a SQLite index over them.
+
+`EventLog` writes one JSON object per line (test_events_*.jsonl) next to the
+free-form text log, with the fields task_id, step, phase, duration, action and
+outcome. `parse_text_log` recovers the same events from historic
+test_log_*.txt files, and `index_run` loads either source into a SQLite
+database so questions such as "all steps > 20 s in dom_match tasks" become a
+single query instead of a grep session.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.request import pathname2url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX = "log_index.sqlite"
+SOURCE_PREFIXES = ('test_events_', 'test_log_')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    source TEXT,
+    source_size INTEGER,
+    indexed_at TEXT,
+    source_mtime REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id TEXT,
+    task_id TEXT,
+    eval_types TEXT,
+    outcome TEXT,
+    steps_used INTEGER,
+    PRIMARY KEY (run_id, task_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id TEXT,
+    task_id TEXT,
+    step INTEGER,
+    phase TEXT,
+    ts REAL,
+    duration REAL,
+    action TEXT,
+    outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_phase_duration ON events (phase, duration);
+CREATE INDEX IF NOT EXISTS idx_events_task ON events (run_id, task_id);
+"""
+
+# Example: all steps slower than 20 s in dom_match tasks
+SLOW_STEPS_SQL = """
+SELECT e.run_id, e.task_id, e.step, e.duration, e.action
+FROM events e JOIN tasks t ON e.run_id = t.run_id AND e.task_id = t.task_id
+WHERE e.phase = 'step' AND e.duration > ? AND t.eval_types LIKE ?
+ORDER BY e.duration DESC
+"""
+
+
+class EventLog:
+    """Append-only JSONL writer for structured run events."""
+
+    def __init__(self, path: str, run_id: str = None):
+        self.path = path
+        self.run_id = run_id or os.path.splitext(os.path.basename(path))[0]
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, phase: str, task_id=None, step=None, duration=None, action=None, outcome=None, **extra):
+        event = {
+            'ts': time.time(),
+            'run_id': self.run_id,
+            'task_id': task_id,
+            'step': step,
+            'phase': phase,
+            'duration': round(duration, 3) if duration is not None else None,
+            'action': action,
+            'outcome': outcome,
+        }
+        event.update(extra)
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_jsonl(path: str):
+    """Yield events from a test_events_*.jsonl file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+_LINE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (.*)$')
+_TASK_START_RE = re.compile(r'^Running task (\S+?):')
+_STEP_RE = re.compile(r'^Step (\d+)/(\d+)')
+_EXEC_RE = re.compile(r'^Executing: (.*)')
+_AGENT_END_RE = re.compile(r'^Agent (?:reported task as|completed task|failed the task)')
+_EVAL_RE = re.compile(r'^\[WebAppEval\] (?:string_match|DOM/URL) evaluation: (PASS|FAIL)')
+_TASK_END_RE = re.compile(r'^Task (\S+?): \S+ (PASS|FAIL)')
+
+
+def parse_text_log(path: str):
+    """Recover structured events from a free-form test_log_*.txt file.
+
+    Step duration is measured from one "Step n/m" line to the next step
+    boundary (next step, agent end, or next task), which matches the
+    wall time spent on that step by the runner.
+    """
+    run_id = os.path.splitext(os.path.basename(path))[0]
+    task_id = None
+    open_step = None  # (step, start_ts, action)
+
+    def close_step(now):
+        if open_step is None:
+            return None
+        step, start, action = open_step
+        return {
+            'ts': start, 'run_id': run_id, 'task_id': task_id, 'step': step,
+            'phase': 'step', 'duration': round(now - start, 3), 'action': action, 'outcome': None,
+        }
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            m = _LINE_RE.match(raw.rstrip('\n'))
+            if not m:
+                continue  # continuation of a multi-line message
+            ts = datetime.strptime(m.group(1), '%Y-%m-%d %H:%M:%S,%f').timestamp()
+            level, message = m.group(2), m.group(3)
+
+            if (m2 := _TASK_START_RE.match(message)):
+                if (event := close_step(ts)):
+                    yield event
+                open_step = None
+                task_id = m2.group(1)
+                yield {'ts': ts, 'run_id': run_id, 'task_id': task_id, 'step': None,
+                       'phase': 'task_start', 'duration': None, 'action': None, 'outcome': None}
+            elif (m2 := _STEP_RE.match(message)):
+                if (event := close_step(ts)):
+                    yield event
+                open_step = (int(m2.group(1)), ts, None)
+            elif (m2 := _EXEC_RE.match(message)) and open_step:
+                open_step = (open_step[0], open_step[1], m2.group(1))
+            elif _AGENT_END_RE.match(message):
+                if (event := close_step(ts)):
+                    event['outcome'] = message
+                    yield event
+                open_step = None
+            elif (m2 := _EVAL_RE.match(message)):
+                yield {'ts': ts, 'run_id': run_id, 'task_id': task_id, 'step': None,
+                       'phase': 'eval', 'duration': None, 'action': None, 'outcome': m2.group(1)}
+            elif (m2 := _TASK_END_RE.match(message)):
+                if (event := close_step(ts)):
+                    yield event
+                open_step = None
+                yield {'ts': ts, 'run_id': run_id, 'task_id': m2.group(1), 'step': None,
+                       'phase': 'task_end', 'duration': None, 'action': None, 'outcome': m2.group(2)}
+            elif level == 'ERROR' and open_step:
+                yield {'ts': ts, 'run_id': run_id, 'task_id': task_id, 'step': open_step[0],
+                       'phase': 'error', 'duration': None, 'action': None, 'outcome': message}
+
+
+def connect(db_path: str = DEFAULT_INDEX, read_only: bool = False) -> sqlite3.Connection:
+    """Open (and create) the index; read_only opens an existing index with SQLite's mode=ro."""
+    if read_only:
+        return sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    if 'source_mtime' not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+        conn.execute("ALTER TABLE runs ADD COLUMN source_mtime REAL")  # index created before the column
+    return conn
+
+
+def run_id_of(path: str) -> str:
+    """Run stamp shared by a run's test_events_*.jsonl and test_log_*.txt."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    for prefix in SOURCE_PREFIXES:
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def select_sources(paths: list) -> list:
+    """One source per run: the structured JSONL when a run has both, otherwise its text log."""
+    chosen = {}
+    for path in sorted(paths):
+        run_id = run_id_of(path)
+        if run_id not in chosen or (path.endswith('.jsonl') and not chosen[run_id].endswith('.jsonl')):
+            chosen[run_id] = path
+    return [chosen[run_id] for run_id in sorted(chosen)]
+
+
+def index_run(conn: sqlite3.Connection, path: str, tasks: list = None, force: bool = False) -> bool:
+    """Index one run (JSONL events or text log). Returns False if already up to date."""
+    run_id = run_id_of(path)
+    source = os.path.abspath(path)
+    stat = os.stat(path)
+    size, mtime = stat.st_size, stat.st_mtime
+    row = conn.execute("SELECT source, source_size, source_mtime FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row and tuple(row) == (source, size, mtime) and not force:
+        return False
+
+    events = list(read_jsonl(path) if path.endswith('.jsonl') else parse_text_log(path))
+    eval_types_by_task = {
+        str(t['task_id']): ",".join(t.get('eval', {}).get('eval_type', [])) for t in (tasks or [])
+    }
+
+    task_rows = {}
+    for event in events:
+        task_id = event.get('task_id')
+        if task_id is None:
+            continue
+        task_id = str(task_id)
+        entry = task_rows.setdefault(task_id, {
+            'eval_types': event.get('eval_types') or eval_types_by_task.get(task_id, ''),
+            'outcome': None, 'steps_used': 0,
+        })
+        if isinstance(entry['eval_types'], list):
+            entry['eval_types'] = ",".join(entry['eval_types'])
+        if event['phase'] == 'step' and event.get('step'):
+            entry['steps_used'] = max(entry['steps_used'], int(event['step']))
+        elif event['phase'] == 'task_end':
+            entry['outcome'] = event.get('outcome')
+
+    # Rows under the file-name run ids of earlier versions would count the run twice
+    stale_ids = [run_id] + [prefix + run_id for prefix in SOURCE_PREFIXES]
+    placeholders = ", ".join("?" * len(stale_ids))
+    with conn:
+        for table in ('events', 'tasks', 'runs'):
+            conn.execute(f"DELETE FROM {table} WHERE run_id IN ({placeholders})", stale_ids)
+        conn.executemany(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, str(e['task_id']) if e.get('task_id') is not None else None, e.get('step'),
+              e.get('phase'), e.get('ts'), e.get('duration'), e.get('action'), e.get('outcome'))
+             for e in events]
+        )
+        conn.executemany(
+            "INSERT INTO tasks VALUES (?, ?, ?, ?, ?)",
+            [(run_id, tid, r['eval_types'], r['outcome'], r['steps_used']) for tid, r in task_rows.items()]
+        )
+        conn.execute(
+            "INSERT INTO runs (run_id, source, source_size, indexed_at, source_mtime) VALUES (?, ?, ?, ?, ?)",
+            (run_id, source, size, datetime.now().isoformat(), mtime)
+        )
+    return True
+
+
+def slow_steps(conn: sqlite3.Connection, min_duration: float = 20, eval_type: str = 'dom_match') -> list:
+    return conn.execute(SLOW_STEPS_SQL, (min_duration, f"%{eval_type}%")).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index structured/text run logs into SQLite and query them')
+    parser.add_argument('--db', default=DEFAULT_INDEX, help='SQLite index path')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_index = sub.add_parser('index', help='Index test_events_*.jsonl / test_log_*.txt files')
+    p_index.add_argument('patterns', nargs='*', default=['result/**/test_events_*.jsonl', 'result/**/test_log_*.txt'])
+    p_index.add_argument('--tasks', default='dataset/tasks.json', help='Tasks file (for eval types of text logs)')
+    p_index.add_argument('--force', action='store_true', help='Re-index runs even if unchanged')
+
+    p_slow = sub.add_parser('slow', help='List slow steps')
+    p_slow.add_argument('--min_duration', type=float, default=20)
+    p_slow.add_argument('--eval_type', default='dom_match')
+
+    p_sql = sub.add_parser('sql', help='Run an arbitrary query on a read-only connection to the index')
+    p_sql.add_argument('query')
+
+    args = parser.parse_args()
+
+    if args.command == 'index':
+        conn = connect(args.db)
+        tasks = []
+        if args.tasks and os.path.exists(args.tasks):
+            with open(args.tasks, 'r', encoding='utf-8') as f:
+                tasks = json.load(f)
+        paths = select_sources({p for pattern in args.patterns for p in glob.glob(pattern, recursive=True)})
+        indexed = sum(1 for p in paths if index_run(conn, p, tasks, force=args.force))
+        print(f"Indexed {indexed} run(s), {len(paths) - indexed} unchanged")
+        return
+
+    try:
+        conn = connect(args.db, read_only=True)
+        if args.command == 'slow':
+            rows = slow_steps(conn, args.min_duration, args.eval_type)
+        else:
+            rows = conn.execute(args.query).fetchall()
+    except sqlite3.OperationalError as e:
+        parser.error(f"query on {args.db} failed: {e}")
+    for row in rows:
+        print(" | ".join("" if v is None else str(v) for v in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# log_utils.py
+"""
+Non-blocking logging setup shared by the runners.
+
+All records go through a `QueueHandler`; a single `QueueListener` thread owns
+the console and file handlers, so the agent loop and rescoring loops never
+block on terminal or disk writes. Debug output in `evaluate/` uses lazy
+%-style arguments and is dropped before formatting unless DEBUG is enabled.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+def setup_logging(log_filename: str = None, level=logging.INFO, fmt: str = DEFAULT_FORMAT, evaluate_level=None):
+    """Route root logging through a queue to console (and optional file) handlers.
+
+    `evaluate_level` sets the level of the `evaluate` package loggers
+    (e.g. logging.DEBUG to see matcher inputs and LLM prompts).
+    Returns the started QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.StreamHandler()]  # Console output
+    if log_filename:
+        handlers.append(logging.FileHandler(log_filename, mode='a', encoding='utf-8'))  # File output (append)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+    if evaluate_level is not None:
+        logging.getLogger('evaluate').setLevel(evaluate_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush pending records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
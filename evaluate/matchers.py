@@ -1,19 +1,25 @@
 import difflib
+import logging
 from dotenv import load_dotenv
 import os
 import google.generativeai as genai
 import unicodedata
+
+from evaluate.usage import record_response
+
+logger = logging.getLogger(__name__)
+
 def exact(value, target):
     value = normalize(value)
     target = normalize(target)
-    print(f"[exact] target: {target}, value: {value}")
+    logger.debug("[exact] target: %s, value: %s", target, value)
     return value == target
 
 def contains(value, target):
     """
     Check if the target is contained within the values.
     """
-    print(f"[contains] Comparing: {repr(target)} vs {repr(value)}")
+    logger.debug("[contains] Comparing: %r vs %r", target, value)
     if not value or not target:
         return False
     value = normalize(value)
@@ -38,12 +44,13 @@ def semantic(task_description, value, target, method="llm"):
             Are they semantically equivalent in the task context? 
             Reply only YES or NO.
         """
-        print(f"[semantic] LLM prompt: {prompt}")
+        logger.debug("[semantic] LLM prompt: %s", prompt)
         model = genai.GenerativeModel('gemini-2.0-flash')
         response = model.generate_content(prompt)
+        record_response('semantic', 'gemini-2.0-flash', response, prompt)
         if response.text.strip().upper() in ["YES", "NO"]:
             # Trả về True nếu trả lời là YES, False nếu NO
-            print(f"[semantic] LLM response: {response.text.strip()}")
+            logger.debug("[semantic] LLM response: %s", response.text.strip())
         return response.text.strip().upper() == "YES"
     elif method == "fuzzy":
         ratio = difflib.SequenceMatcher(None, value, target).ratio()
@@ -72,20 +79,20 @@ def check_contains(agent_value, match_value):
     - If match_value is a string: return contains(agent_value, match_value)
     - If match_value is a list: check all items
     """
-    print(f"[check_contains] agent_value: {agent_value}, match_value: {match_value}")
+    logger.debug("[check_contains] agent_value: %s, match_value: %s", agent_value, match_value)
     if isinstance(match_value, str):
         return contains(agent_value, match_value)
     elif isinstance(match_value, list):
         if not match_value:
-            print("match_value list is empty")
+            logger.warning("[check_contains] match_value list is empty")
             return False
         for item in match_value:
             if not contains(agent_value, item):
-                print(f"Contains check failed for item: {item}")
+                logger.debug("[check_contains] Contains check failed for item: %s", item)
                 return False
         return True
     else:
-        print(f"Unsupported match_value type: {type(match_value)}")
+        logger.warning("[check_contains] Unsupported match_value type: %s", type(match_value))
         return False
     
 
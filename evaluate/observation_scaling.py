@@ -0,0 +1,117 @@
+# observation_scaling.py
+"""
+Smaller observations for the planner, full resolution only for grounding.
+
+Agent-S sends the same screenshot to the reasoning model (which only names
+elements, e.g. agent.click("the Sign in link")) and to the grounding model
+(which turns that description into pixel coordinates). ScaledObservationAgent
+wraps an AgentS3 agent so that
+
+- the planner gets a downscaled, optionally cropped PNG (`planner_scale`,
+  `planner_crop` as (left, top, right, bottom) fractions of the screen);
+  the planner never emits coordinates, so nothing needs remapping;
+- the grounding agent is handed the full-resolution screenshot instead, and
+  is only sent a smaller image if `grounding_scale` < 1, in which case the
+  returned coordinates are scaled back to grounding/screen space.
+
+Per predict() call it reports bytes sent and time spent to `on_stats`, so
+the size/latency trade-off can be tuned against the success rate.
+"""
+
+import io
+import logging
+import time
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def scale_screenshot(screenshot: bytes, scale: float = 1.0, crop: tuple = None) -> bytes:
+    """Downscale (and crop) a PNG screenshot; returns the original bytes if nothing changes."""
+    if scale >= 1.0 and not crop:
+        return screenshot
+    image = Image.open(io.BytesIO(screenshot))
+    if crop:
+        left, top, right, bottom = crop
+        image = image.crop((int(left * image.width), int(top * image.height),
+                            int(right * image.width), int(bottom * image.height)))
+    if scale < 1.0:
+        image = image.resize((max(int(image.width * scale), 1), max(int(image.height * scale), 1)), Image.LANCZOS)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG", optimize=False)
+    return buffered.getvalue()
+
+
+class ScaledObservationAgent:
+    def __init__(self, agent, grounding_agent, planner_scale: float = 0.5, planner_crop: tuple = None,
+                 grounding_scale: float = 1.0, on_stats=None):
+        self.agent = agent
+        self.grounding_agent = grounding_agent
+        self.planner_scale = planner_scale
+        self.planner_crop = tuple(planner_crop) if planner_crop else None
+        self.grounding_scale = grounding_scale
+        self.on_stats = on_stats
+        self.step = 0
+        self._full_obs = None
+        self._stats = None
+        self._patch_grounding(grounding_agent)
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def _patch_grounding(self, grounding_agent):
+        assign_screenshot = getattr(grounding_agent, 'assign_screenshot', None)
+        generate_coords = grounding_agent.generate_coords
+
+        def full_resolution_assign(obs, *args, **kwargs):
+            # The worker assigns the planner's (scaled) observation; ground on the full screenshot
+            if self._full_obs is not None:
+                obs = dict(obs, screenshot=self._full_obs['screenshot'])
+            return assign_screenshot(obs, *args, **kwargs)
+
+        def scaled_generate_coords(ref_expr, obs, *args, **kwargs):
+            start = time.time()
+            if self._full_obs is not None:
+                obs = dict(obs, screenshot=self._full_obs['screenshot'])
+            screenshot = obs['screenshot']
+            if self.grounding_scale < 1.0:
+                obs = dict(obs, screenshot=scale_screenshot(screenshot, self.grounding_scale))
+            coords = generate_coords(ref_expr, obs, *args, **kwargs)
+            if self.grounding_scale < 1.0:
+                coords = [round(coords[0] / self.grounding_scale), round(coords[1] / self.grounding_scale)]
+            if self._stats is not None:
+                self._stats['grounding_calls'] += 1
+                self._stats['grounding_bytes'] += len(obs['screenshot'])
+                self._stats['grounding_seconds'] += time.time() - start
+            return coords
+
+        if assign_screenshot is not None:
+            grounding_agent.assign_screenshot = full_resolution_assign
+        grounding_agent.generate_coords = scaled_generate_coords
+
+    def reset(self):
+        self.step = 0
+        return self.agent.reset()
+
+    def predict(self, instruction: str, observation: dict):
+        start = time.time()
+        full = observation['screenshot']
+        planner_screenshot = scale_screenshot(full, self.planner_scale, self.planner_crop)
+        encode_seconds = time.time() - start
+
+        self.step += 1
+        self._full_obs = observation
+        self._stats = {'obs_bytes': len(full), 'planner_bytes': len(planner_screenshot),
+                       'encode_seconds': encode_seconds, 'grounding_calls': 0, 'grounding_bytes': 0,
+                       'grounding_seconds': 0.0}
+        try:
+            result = self.agent.predict(instruction=instruction,
+                                        observation=dict(observation, screenshot=planner_screenshot))
+        finally:
+            stats, self._stats, self._full_obs = self._stats, None, None
+            stats['predict_seconds'] = time.time() - start
+            logger.debug("[ObsScaling] step %d: %s", self.step, stats)
+            if self.on_stats:
+                self.on_stats(self.step, stats)
+        return result
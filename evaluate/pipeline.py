@@ -0,0 +1,100 @@
+# pipeline.py
+"""
+Staged execution: agent stage -> bounded queue -> evaluation pool.
+
+The runner's agent loop submits one job per finished task (its result and
+final-state artifacts); `workers` evaluation threads run `evaluate(job)` (DOM
+checks, semantic judging) and then `on_result(job)` (result persistence),
+so a slow evaluation never blocks the next task's agent loop. `max_pending`
+bounds the queue: when evaluation falls that far behind, submit() blocks and
+applies back-pressure instead of piling up artifacts.
+
+Jobs submitted with live_state=True read the live shop (e.g. a dom_match on
+a navigated URL). The runner calls wait_live_state() before starting a task
+that mutates the shop, so those checks still see the state the agent left.
+"""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def needs_live_state(task: dict) -> bool:
+    """True if the task's evaluation re-reads the shop (dom_match on a navigated URL)."""
+    dom_conf = task.get('eval', {}).get('dom_match') or {}
+    return 'dom_match' in task.get('eval', {}).get('eval_type', []) and \
+        (dom_conf.get('url') or '').strip().lower() not in ('', 'current', 'last')
+
+
+class EvaluationPipeline:
+    def __init__(self, evaluate, on_result, workers: int = 2, max_pending: int = 4):
+        self.evaluate = evaluate
+        self.on_result = on_result
+        self.jobs = queue.Queue(maxsize=max(max_pending, 1))
+        self._result_lock = threading.Lock()      # persistence runs one job at a time
+        self._state = threading.Condition()
+        self._pending = 0
+        self._live_pending = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"eval-worker-{i + 1}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            job, live_state = item
+            try:
+                self.evaluate(job)
+            except Exception as e:
+                logger.error(f"[Pipeline] Evaluation failed: {e}")
+            try:
+                with self._result_lock:
+                    self.on_result(job)
+            except Exception as e:
+                logger.error(f"[Pipeline] Result handling failed: {e}")
+            finally:
+                with self._state:
+                    self._pending -= 1
+                    if live_state:
+                        self._live_pending -= 1
+                    self._state.notify_all()
+
+    def submit(self, job, live_state: bool = False):
+        """Queue a job for evaluation; blocks while max_pending jobs are already waiting."""
+        with self._state:
+            self._pending += 1
+            if live_state:
+                self._live_pending += 1
+        self.jobs.put((job, live_state))
+
+    def wait_live_state(self):
+        """Block until no submitted job still needs the live environment state."""
+        with self._state:
+            if self._live_pending:
+                logger.info(f"[Pipeline] Waiting for {self._live_pending} evaluation(s) that read the live shop")
+            self._state.wait_for(lambda: self._live_pending == 0)
+
+    def drain(self):
+        """Block until every submitted job has been evaluated and handled."""
+        with self._state:
+            self._state.wait_for(lambda: self._pending == 0)
+
+    def close(self):
+        self.drain()
+        for _ in self._threads:
+            self.jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
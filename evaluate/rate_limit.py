@@ -0,0 +1,194 @@
+# rate_limit.py
+"""
+Adaptive token-bucket rate limiter for agent LLM calls.
+
+One limiter is shared by every task/worker in the process (see
+`get_rate_limiter`), and optionally by every process on the machine through
+a small state file guarded by an exclusive file lock. Requests are admitted
+at `requests_per_minute` with up to `burst` back-to-back calls, instead of a
+fixed sleep before every call.
+
+Pacing and retries happen at the engine level: instrument() wraps
+`engine.generate` of every LMM agent (as evaluate/usage.py does) and takes
+one token per request, so a predict that fans out into planner, reflection
+and grounding requests is paced per request, and only the failed request is
+repeated. Retrying the whole predict would not be safe, because Agent-S
+appends planner and reflection turns to the agent's history before it sends
+the request.
+
+On 429/5xx responses the limiter backs off exponentially and halves its
+rate; successful calls restore the rate additively (AIMD), so the full quota
+is used without hammering a throttled provider.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process sharing is not available
+    fcntl = None
+
+from evaluate.usage import lmm_engines
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+
+def status_code_of(error) -> int:
+    """Best-effort HTTP status of an exception raised by an engine client."""
+    for candidate in (error, getattr(error, 'response', None)):
+        for attr in ('status_code', 'status', 'code'):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    text = str(error).lower()
+    if '429' in text or 'rate limit' in text or 'too many requests' in text:
+        return 429
+    return None
+
+
+def is_retryable(error) -> bool:
+    return status_code_of(error) in RETRYABLE_STATUS
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = 30, burst: int = 1, max_retries: int = 3,
+                 backoff_initial: float = 5.0, backoff_max: float = 120.0, state_file: str = None):
+        self.base_rate = requests_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.max_retries = max_retries
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.state_file = state_file if fcntl is not None else None
+        if state_file and fcntl is None:
+            logger.warning("[RateLimit] fcntl unavailable, limiter is shared within this process only")
+        self._lock = threading.Lock()
+        self._state = self._initial_state()
+
+    def _initial_state(self) -> dict:
+        return {'tokens': float(self.capacity), 'updated': time.time(), 'rate': self.base_rate,
+                'blocked_until': 0.0, 'backoff': 0.0}
+
+    # --- shared state -------------------------------------------------------
+    def _update(self, mutate):
+        """Apply mutate(state) -> result atomically (process-wide, and across processes if configured)."""
+        with self._lock:
+            if not self.state_file:
+                return mutate(self._state)
+            with open(self.state_file, 'a+', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw.strip() else self._initial_state()
+                    except ValueError:
+                        state = self._initial_state()
+                    result = mutate(state)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                    return result
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reserve(self, state) -> float:
+        """Take one token (possibly in the future); return how long to wait for it."""
+        now = time.time()
+        state['tokens'] = min(self.capacity, state['tokens'] + (now - state['updated']) * state['rate'])
+        state['updated'] = now
+        state['tokens'] -= 1
+        wait = -state['tokens'] / state['rate'] if state['tokens'] < 0 else 0.0
+        return max(wait, state['blocked_until'] - now)
+
+    # --- public API ---------------------------------------------------------
+    def acquire(self) -> float:
+        wait = self._update(self._reserve)
+        if wait > 0:
+            logger.info(f"[RateLimit] Waiting {wait:.1f}s before API call")
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self._update(self._reserve)
+        if wait > 0:
+            logger.info(f"[RateLimit] Waiting {wait:.1f}s before API call")
+            await asyncio.sleep(wait)
+        return wait
+
+    def report_success(self):
+        def mutate(state):
+            state['backoff'] = 0.0
+            state['rate'] = min(self.base_rate, state['rate'] + self.base_rate * 0.1)
+        self._update(mutate)
+
+    def report_error(self, status: int = None):
+        def mutate(state):
+            state['backoff'] = min(max(state['backoff'] * 2, self.backoff_initial), self.backoff_max)
+            state['blocked_until'] = time.time() + state['backoff']
+            state['rate'] = max(state['rate'] / 2, self.base_rate / 8)
+            return state['backoff']
+        backoff = self._update(mutate)
+        logger.warning(f"[RateLimit] Provider returned {status}, backing off {backoff:.1f}s")
+
+    def retry(self, fn, *args, **kwargs):
+        """fn paced by one token per attempt, with backoff and retries on 429/5xx.
+
+        Only for idempotent calls, e.g. one engine request.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()  # also waits out the backoff window after an error
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if attempt < self.max_retries and is_retryable(e):
+                    self.report_error(status_code_of(e))
+                    continue
+                raise
+            self.report_success()
+            return result
+
+    def instrument(self, root):
+        """Pace and retry the requests of every LMM engine reachable from root.
+
+        Idempotent; call again after agent.reset().
+        """
+        for _, engine in lmm_engines(root):
+            if getattr(engine, '_retry_wrapped', False):
+                continue
+
+            def retried_generate(*args, _generate=engine.generate, **kwargs):
+                return self.retry(_generate, *args, **kwargs)
+
+            engine.generate = retried_generate
+            engine._retry_wrapped = True
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter(config: dict):
+    """Process-wide limiter for RATE_LIMIT_CONFIG, or None when disabled."""
+    if not config or not config.get('enabled', False):
+        return None
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _shared_lock:
+        if key not in _shared:
+            state_file = config.get('shared_state_file')
+            _shared[key] = RateLimiter(
+                requests_per_minute=config.get('requests_per_minute', 30),
+                burst=config.get('burst', 1),
+                max_retries=config.get('max_retries', 3),
+                backoff_initial=config.get('backoff_initial', 5.0),
+                backoff_max=config.get('backoff_max', 120.0),
+                state_file=os.path.abspath(state_file) if state_file else None,
+            )
+        return _shared[key]
@@ -0,0 +1,119 @@
+# replay.py
+"""
+Record/replay wrappers for `agent.predict`.
+
+RecordingAgent wraps a live Agent-S agent and appends one JSON line per
+predict call: (observation hash, instruction) -> (info, code), tagged with a
+session id per RecordingAgent and the step number within the instruction.
+Several runs may append to the same file; ReplayAgent serves, for each
+instruction, the steps of the first session that recorded it, without any
+model calls:
+
+- an exact (observation hash, instruction) match is used when the screen is
+  byte-identical to the recorded one;
+- otherwise the next recorded step for the same instruction is served in
+  order, so a trajectory still replays deterministically when screenshots
+  differ slightly (cursor, animations, a local stand-in shop); past the last
+  step of that session the recording is exhausted.
+
+This makes it possible to replay full trajectories offline and measure the
+harness overhead (settle waits, screenshots, evaluation) on its own.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def observation_hash(obs: dict) -> str:
+    screenshot = (obs or {}).get('screenshot') or b''
+    if isinstance(screenshot, str):
+        screenshot = screenshot.encode('utf-8')
+    return hashlib.sha256(screenshot).hexdigest()[:32]
+
+
+class RecordingAgent:
+    """Pass-through agent that records every predict() call to a JSONL file."""
+
+    def __init__(self, agent, path: str):
+        self.agent = agent
+        self.path = path
+        self._lock = threading.Lock()
+        self._step = defaultdict(int)
+        self.session = uuid.uuid4().hex[:12]
+
+    def __getattr__(self, name):
+        return getattr(self.agent, name)
+
+    def reset(self):
+        self._step.clear()
+        return self.agent.reset()
+
+    def predict(self, instruction: str, observation: dict):
+        info, code = self.agent.predict(instruction=instruction, observation=observation)
+        entry = {
+            'session': self.session,
+            'obs_hash': observation_hash(observation),
+            'instruction': instruction,
+            'step': self._step[instruction],
+            'info': info,
+            'code': list(code),
+        }
+        self._step[instruction] += 1
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        return info, code
+
+
+class ReplayAgent:
+    """Offline agent serving recorded (info, code) responses."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recording found at {path}")
+        self.path = path
+        self.by_key = {}
+        self.by_instruction = defaultdict(dict)  # instruction -> {step: entry}
+        sessions = {}  # instruction -> first session that recorded it
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                instruction = entry['instruction']
+                # Recordings made before session ids existed count as one session
+                session = sessions.setdefault(instruction, entry.get('session'))
+                if entry.get('session') != session:
+                    continue
+                self.by_key.setdefault((entry['obs_hash'], instruction), entry)
+                self.by_instruction[instruction].setdefault(entry['step'], entry)
+        self._position = defaultdict(int)
+        self.exact_hits = 0
+        self.sequential_hits = 0
+        logger.info(f"[Replay] Loaded {sum(len(v) for v in self.by_instruction.values())} recorded steps from {path}")
+
+    def reset(self):
+        self._position.clear()
+
+    def predict(self, instruction: str, observation: dict):
+        entry = self.by_key.get((observation_hash(observation), instruction))
+        if entry is not None:
+            self.exact_hits += 1
+            self._position[instruction] = entry['step'] + 1
+        else:
+            steps = self.by_instruction.get(instruction, {})
+            position = self._position[instruction]
+            if position not in steps:
+                logger.warning(f"[Replay] Recording exhausted for instruction: {instruction[:60]}...")
+                return {}, ["FAIL"]
+            entry = steps[position]
+            self.sequential_hits += 1
+            self._position[instruction] = position + 1
+        return entry['info'], list(entry['code'])
@@ -0,0 +1,256 @@
+# reporting.py
+"""
+Incremental report generation for test_results_*.json runs.
+
+Each run file is hashed by content (results, start time, run name and the
+section templates); runs whose hash is unchanged since the last regeneration
+reuse their cached rendered sections, so only new or
+modified runs are re-rendered. All runs are then written into a single
+Markdown and HTML dashboard in one pass.
+"""
+
+import argparse
+import glob
+import hashlib
+import html
+import json
+import logging
+import os
+from datetime import datetime
+from string import Template
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = ".report_cache.json"
+
+RUN_MD_TEMPLATE = Template("""## Run: $run_name
+
+- **Started:** $start_time
+- **TSR (Task Success Rate):** $tsr% ($passed/$total tasks passed)
+- **SCR (Step Completion Rate):** $scr% ($total_steps_used/$total_max_steps steps used)
+
+| # | Task ID | Description | Agent Done | WebAppEval | Final | Steps |
+|---|---------|-------------|------------|------------|-------|-------|
+$rows
+""")
+
+RUN_MD_ROW = Template("| $index | $task_id | $description | $agent_done | $webappeval | $final | $steps |")
+
+RUN_HTML_TEMPLATE = Template("""<section>
+<h2>Run: $run_name</h2>
+<p>Started: $start_time &mdash; TSR $tsr% ($passed/$total) &mdash; SCR $scr% ($total_steps_used/$total_max_steps)</p>
+<table>
+<tr><th>#</th><th>Task ID</th><th>Description</th><th>Agent Done</th><th>WebAppEval</th><th>Final</th><th>Steps</th></tr>
+$rows
+</table>
+</section>""")
+
+RUN_HTML_ROW = Template("<tr><td>$index</td><td>$task_id</td><td>$description</td><td>$agent_done</td><td>$webappeval</td><td>$final</td><td>$steps</td></tr>")
+
+DASHBOARD_MD_TEMPLATE = Template("""# Agent-S Evaluation Dashboard
+
+**Generated:** $generated
+
+| Run | Tasks | TSR | SCR |
+|-----|-------|-----|-----|
+$overview
+
+$sections
+""")
+
+DASHBOARD_HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Agent-S Evaluation Dashboard</title></head>
+<body>
+<h1>Agent-S Evaluation Dashboard</h1>
+<p>Generated: $generated</p>
+<table>
+<tr><th>Run</th><th>Tasks</th><th>TSR</th><th>SCR</th></tr>
+$overview
+</table>
+$sections
+</body>
+</html>
+""")
+
+
+def compute_metrics(results: list) -> dict:
+    """Calculate TSR (Task Success Rate) and SCR (Step Completion Rate)."""
+    total_tasks = len(results)
+    passed_tasks = sum(1 for r in results if r.get('success'))
+
+    total_steps_used = sum(r.get('steps_used', 0) for r in results)
+    total_max_steps = sum(r.get('max_steps', 0) for r in results)
+
+    tsr = (passed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    scr = (total_steps_used / total_max_steps * 100) if total_max_steps > 0 else 0
+
+    return {
+        'tsr': tsr,
+        'scr': scr,
+        'passed': passed_tasks,
+        'total': total_tasks,
+        'total_steps_used': total_steps_used,
+        'total_max_steps': total_max_steps
+    }
+
+
+# Bump when the rendering code changes in a way the templates don't show
+RENDER_VERSION = 2
+TEMPLATES_HASH = hashlib.sha256("\0".join(
+    [str(RENDER_VERSION)] + [t.template for t in (RUN_MD_TEMPLATE, RUN_MD_ROW, RUN_HTML_TEMPLATE, RUN_HTML_ROW)]
+).encode('utf-8')).hexdigest()
+
+
+def hash_run(data: dict, run_name: str = '') -> str:
+    """Content hash of everything a run section shows (independent of key order and file formatting).
+
+    Covers the results, start_time, the run name and the section templates, so
+    a change to any of them re-renders the run.
+    """
+    canonical = json.dumps([data.get('results', []), data.get('start_time'), run_name, TEMPLATES_HASH],
+                           sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _md_cell(value) -> str:
+    """Text safe inside a Markdown table cell."""
+    return " ".join(str(value).split()).replace('|', '\\|')
+
+
+def _status_cells(result: dict) -> dict:
+    webappeval = result.get('webappeval_result')
+    description = result.get('description', '')
+    return {
+        'task_id': result.get('task_id', ''),
+        'description': description[:45] + "..." if len(description) > 45 else description,
+        'agent_done': "✅" if result.get('agent_done', False) else "❌",
+        'webappeval': "✅" if webappeval else "❌" if webappeval is False else "N/A",
+        'final': "✅ PASS" if result.get('success') else "❌ FAIL",
+        'steps': f"{result.get('steps_used', 0)}/{result.get('max_steps', 0)}",
+    }
+
+
+def render_run(run_name: str, data: dict) -> dict:
+    """Render the Markdown and HTML sections for a single run."""
+    results = data.get('results', [])
+    metrics = compute_metrics(results)
+
+    md_rows = []
+    html_rows = []
+    for i, result in enumerate(results, 1):
+        cells = _status_cells(result)
+        md_rows.append(RUN_MD_ROW.substitute(index=i, **{k: _md_cell(v) for k, v in cells.items()}))
+        html_rows.append(RUN_HTML_ROW.substitute(
+            index=i, **{k: html.escape(str(v)) for k, v in cells.items()}
+        ))
+
+    fields = {
+        'run_name': run_name,
+        'start_time': data.get('start_time', 'N/A'),
+        'tsr': f"{metrics['tsr']:.1f}",
+        'scr': f"{metrics['scr']:.1f}",
+        'passed': metrics['passed'],
+        'total': metrics['total'],
+        'total_steps_used': metrics['total_steps_used'],
+        'total_max_steps': metrics['total_max_steps'],
+    }
+    return {
+        'metrics': metrics,
+        'markdown': RUN_MD_TEMPLATE.substitute(rows="\n".join(md_rows), **fields),
+        'html': RUN_HTML_TEMPLATE.substitute(
+            rows="\n".join(html_rows), **{k: html.escape(str(v)) for k, v in fields.items()}
+        ),
+    }
+
+
+def load_cache(cache_path: str) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[reporting] Ignoring unreadable cache {cache_path}: {e}")
+        return {}
+
+
+def regenerate_reports(results_paths: list, output_dir: str = ".") -> dict:
+    """Regenerate the aggregated dashboards, re-rendering only changed runs.
+
+    Returns a dict with the list of rendered and skipped run files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE_FILENAME)
+    cache = load_cache(cache_path)
+    new_cache = {}
+    rendered, skipped = [], []
+
+    for path in sorted(results_paths):
+        key = os.path.abspath(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"[reporting] Cannot read {path}: {e}")
+            continue
+
+        run_name = os.path.splitext(os.path.basename(path))[0]
+        run_hash = hash_run(data, run_name)
+        cached = cache.get(key)
+        if cached and cached.get('hash') == run_hash:
+            new_cache[key] = cached
+            skipped.append(path)
+            continue
+
+        section = render_run(run_name, data)
+        section['hash'] = run_hash
+        section['run_name'] = run_name
+        new_cache[key] = section
+        rendered.append(path)
+
+    entries = [new_cache[k] for k in sorted(new_cache)]
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    md_overview = "\n".join(
+        f"| {e['run_name']} | {e['metrics']['total']} | {e['metrics']['tsr']:.1f}% | {e['metrics']['scr']:.1f}% |"
+        for e in entries
+    )
+    html_overview = "\n".join(
+        f"<tr><td>{html.escape(e['run_name'])}</td><td>{e['metrics']['total']}</td>"
+        f"<td>{e['metrics']['tsr']:.1f}%</td><td>{e['metrics']['scr']:.1f}%</td></tr>"
+        for e in entries
+    )
+
+    with open(os.path.join(output_dir, "dashboard.md"), 'w', encoding='utf-8') as f:
+        f.write(DASHBOARD_MD_TEMPLATE.substitute(
+            generated=generated, overview=md_overview,
+            sections="\n".join(e['markdown'] for e in entries)
+        ))
+    with open(os.path.join(output_dir, "dashboard.html"), 'w', encoding='utf-8') as f:
+        f.write(DASHBOARD_HTML_TEMPLATE.substitute(
+            generated=html.escape(generated), overview=html_overview,
+            sections="\n".join(e['html'] for e in entries)
+        ))
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump(new_cache, f, ensure_ascii=False)
+
+    logger.info(f"[reporting] Rendered {len(rendered)} run(s), reused {len(skipped)} unchanged run(s)")
+    return {'rendered': rendered, 'skipped': skipped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate evaluation dashboards from test_results_*.json files')
+    parser.add_argument('patterns', nargs='*', default=['result/**/test_results_*.json'],
+                        help='Glob patterns of run result files')
+    parser.add_argument('--output_dir', default='result', help='Directory for dashboard.md/dashboard.html')
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.patterns for p in glob.glob(pattern, recursive=True)})
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    stats = regenerate_reports(paths, args.output_dir)
+    print(f"Rendered: {len(stats['rendered'])}, unchanged: {len(stats['skipped'])}")
+
+
+if __name__ == '__main__':
+    main()
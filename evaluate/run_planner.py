@@ -0,0 +1,108 @@
+# run_planner.py
+"""
+Differential suite runs: only re-execute tasks that may have a new outcome.
+
+Each task is fingerprinted by a content hash of its spec (description,
+start_url, steps, eval block) and, separately, of the run configuration
+(engine/grounding parameters without API keys, automation mode). The last
+result per task is kept in a JSON cache. A task is scheduled when
+
+- it has no cached result ('new'),
+- its spec or the configuration changed ('spec_changed' / 'config_changed'),
+- its last result failed ('failed', unless rerun_failed=False),
+- it is flaky: listed in flaky_tasks, marked "flaky": true in the task file,
+  or its recent outcomes disagree ('flaky').
+
+Everything else reuses the cached result (marked `'cached': True`).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SPEC_FIELDS = ('task_description', 'start_url', 'steps', 'eval')
+SECRET_KEYS = ('api_key',)
+HISTORY_SIZE = 5
+
+
+def content_hash(data) -> str:
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def spec_hash(task: dict) -> str:
+    return content_hash({field: task.get(field) for field in SPEC_FIELDS})
+
+
+def config_hash(*configs) -> str:
+    cleaned = [{k: v for k, v in (config or {}).items() if k not in SECRET_KEYS} for config in configs]
+    return content_hash(cleaned)
+
+
+class RunPlanner:
+    def __init__(self, path: str = "run_cache.json", config: tuple = (), flaky_tasks=(), rerun_failed: bool = True):
+        self.path = path
+        self.config_hash = config_hash(*config)
+        self.flaky_tasks = {str(t) for t in flaky_tasks}
+        self.rerun_failed = rerun_failed
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('tasks', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Planner] Ignoring unreadable run cache {path}: {e}")
+
+    def reason(self, task: dict) -> str:
+        """Why the task must run, or 'cached' if its stored result can be reused."""
+        entry = self.entries.get(str(task['task_id']))
+        if entry is None:
+            return 'new'
+        if entry.get('spec_hash') != spec_hash(task):
+            return 'spec_changed'
+        if entry.get('config_hash') != self.config_hash:
+            return 'config_changed'
+        history = entry.get('history', [])
+        if str(task['task_id']) in self.flaky_tasks or task.get('flaky') or len(set(history)) > 1:
+            return 'flaky'
+        if self.rerun_failed and not entry.get('result', {}).get('success'):
+            return 'failed'
+        return 'cached'
+
+    def plan(self, tasks: list) -> dict:
+        """{task_id: reason} for every task, logging a one-line summary."""
+        plan = {task['task_id']: self.reason(task) for task in tasks}
+        summary = {}
+        for reason in plan.values():
+            summary[reason] = summary.get(reason, 0) + 1
+        logger.info(f"[Planner] {sum(r != 'cached' for r in plan.values())}/{len(plan)} tasks to run: {summary}")
+        return plan
+
+    def cached_result(self, task: dict) -> dict:
+        result = dict(self.entries[str(task['task_id'])]['result'])
+        result['cached'] = True
+        return result
+
+    def record(self, task: dict, result: dict):
+        task_id = str(task['task_id'])
+        previous = self.entries.get(task_id, {})
+        unchanged = (previous.get('spec_hash'), previous.get('config_hash')) == (spec_hash(task), self.config_hash)
+        history = previous.get('history', []) if unchanged else []
+        history = (history + [bool(result.get('success'))])[-HISTORY_SIZE:]
+        self.entries[task_id] = {
+            'spec_hash': spec_hash(task),
+            'config_hash': self.config_hash,
+            'result': result,
+            'history': history,
+            'recorded_at': time.time(),
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'tasks': self.entries}, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.path)
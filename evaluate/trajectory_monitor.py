@@ -0,0 +1,119 @@
+# trajectory_monitor.py
+"""
+Loop and stall detection for the agent step loop.
+
+The runner reports every step as (screen fingerprint, URL, action code).
+The monitor flags three patterns:
+
+- repeat:      the same action on an unchanged screen `repeat_threshold` times
+- oscillation: the screen alternates between two states for `oscillation_cycles`
+- stall:       no never-seen-before screen for `stall_steps` steps
+
+The first `max_hints` detections return a recovery hint for the agent's
+instruction; the next one tells the runner to terminate the task, and the
+reason is kept so it can be recorded in the results. Only a 'repeat' is
+about the current action (it would have no effect again), so that is the
+only verdict for which the runner skips the action.
+"""
+
+import hashlib
+import io
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Verdict = namedtuple('Verdict', ['action', 'kind', 'reason', 'hint'])
+
+HINTS = {
+    'repeat': "Your last actions had no visible effect. Do not repeat the same action; "
+              "try a different element or approach.",
+    'oscillation': "You are going back and forth between the same screens. Re-read the task "
+                   "and choose a different path.",
+    'stall': "There has been no progress in the last steps. If the task is already complete, "
+             "finish it; otherwise try a different approach.",
+}
+
+
+def screen_fingerprint(screenshot: bytes) -> str:
+    """Screen fingerprint that tolerates pixel noise but still sees typed text and small widget changes.
+
+    A 64x36 difference hash (each bit: is a thumbnail pixel brighter than its
+    right neighbour) when Pillow is available, otherwise the exact bytes. A
+    thumbnail pixel covers about 30x30 screen pixels, so a word typed into a
+    form field flips bits, where a coarse average hash would not see it.
+    """
+    try:
+        from PIL import Image
+        image = Image.open(io.BytesIO(screenshot)).convert('L').resize((65, 36), Image.BILINEAR)
+        pixels = image.tobytes()
+        bits = [pixels[row * 65 + col] > pixels[row * 65 + col + 1] for row in range(36) for col in range(64)]
+        return hashlib.sha1(bytes(bits)).hexdigest()
+    except Exception:
+        return hashlib.sha1(screenshot or b'').hexdigest()
+
+
+def _normalize_action(code: str) -> str:
+    return " ".join(str(code).split())
+
+
+class TrajectoryMonitor:
+    def __init__(self, repeat_threshold: int = 3, oscillation_cycles: int = 3, stall_steps: int = 6,
+                 max_hints: int = 1):
+        self.repeat_threshold = repeat_threshold
+        self.oscillation_cycles = oscillation_cycles
+        self.stall_steps = stall_steps
+        self.max_hints = max_hints
+        self.reset()
+
+    def reset(self):
+        self.history = []          # [(state, action)]
+        self.seen_states = set()
+        self.steps_since_new = 0
+        self.hints_given = 0
+        self.reason = None
+
+    def _detect(self):
+        history = self.history
+        n = self.repeat_threshold
+        if n and len(history) >= n and len(set(history[-n:])) == 1:
+            return 'repeat', f"same action repeated {n} times on an unchanged screen: {history[-1][1][:80]}"
+
+        window = 2 * self.oscillation_cycles
+        if self.oscillation_cycles and len(history) >= window:
+            states = [state for state, _ in history[-window:]]
+            if states[0] != states[1] and all(s == states[i % 2] for i, s in enumerate(states)):
+                return 'oscillation', f"screen alternated between two states for {self.oscillation_cycles} cycles"
+
+        if self.stall_steps and self.steps_since_new >= self.stall_steps:
+            return 'stall', f"no new screen in the last {self.steps_since_new} steps"
+        return None
+
+    def observe(self, screen_key: str, url: str, action: str):
+        """Record one step. Returns a Verdict, or None if the trajectory looks fine."""
+        state = (screen_key, url)
+        if state in self.seen_states:
+            self.steps_since_new += 1
+        else:
+            self.seen_states.add(state)
+            self.steps_since_new = 0
+        self.history.append((state, _normalize_action(action)))
+
+        detected = self._detect()
+        if not detected:
+            return None
+        kind, reason = detected
+        if self.hints_given < self.max_hints:
+            self.hints_given += 1
+            # Give the agent a fresh window to recover
+            self.history.clear()
+            self.steps_since_new = 0
+            logger.info(f"[Monitor] {reason}; injecting recovery hint")
+            return Verdict('hint', kind, reason, HINTS[kind])
+        self.reason = reason
+        logger.info(f"[Monitor] {reason}; terminating task")
+        return Verdict('terminate', kind, reason, None)
+
+
+def with_hint(instruction: str, hint: str) -> str:
+    return f"{instruction}\n\nNote: {hint}" if hint else instruction
@@ -0,0 +1,185 @@
+# trajectory_store.py
+"""
+Append-only archive of agent trajectories (screenshots, actions, agent info).
+
+One container per run, `<name>.traj`, holds length-prefixed records after
+a 4-byte magic:
+
+    kind (1 byte: F = frame PNG, S = step JSON) | length (4 bytes, BE) | payload
+
+Frames are deduplicated by SHA-1, so an unchanged screen after a no-op
+action costs one index line instead of another PNG. `<name>.traj.idx` is a
+JSONL index with one line per step:
+
+    {"task_id", "step", "time", "record": [offset, length], "frame": [offset, length], "sha1"}
+
+Both files are only ever appended to and flushed after every step, so a
+crashed run keeps everything written up to its last step. Each append holds
+an flock on the container, takes record offsets from its size (os.fstat) and
+first reads index lines added by other writers, so several processes may
+share one container and still deduplicate frames against each other.
+TrajectoryArchive memory-maps the container for random access by a viewer or
+replay tool:
+
+    python -m evaluate.trajectory_store trajectories_<run>.traj              # list steps
+    python -m evaluate.trajectory_store trajectories_<run>.traj --task 7 --extract out/
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writer process per container
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TRJ1'
+HEADER = struct.Struct('>cI')
+FRAME, STEP = b'F', b'S'
+
+
+class TrajectoryWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self._lock = threading.Lock()
+        self._frames = {}  # sha1 -> [offset, length] of frames already in the container
+        self._file = open(path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        self._index_reader = open(self.index_path, 'r', encoding='utf-8')
+        self._end = 0
+        self.steps = 0
+        self.bytes_written = 0
+        self.frames_deduplicated = 0
+        with self._lock, self._exclusive():
+            if self._end == 0:
+                self._file.write(MAGIC)
+                self._file.flush()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the container against other writers; on entry, sync the frame table and the end offset."""
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            for line in iter(self._index_reader.readline, ''):
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get('frame'):
+                        self._frames.setdefault(entry['sha1'], entry['frame'])
+            self._end = os.fstat(self._file.fileno()).st_size
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _write_record(self, kind: bytes, payload: bytes) -> list:
+        offset = self._end + HEADER.size
+        self._file.write(HEADER.pack(kind, len(payload)))
+        self._file.write(payload)
+        self._end = offset + len(payload)
+        self.bytes_written += HEADER.size + len(payload)
+        return [offset, len(payload)]
+
+    def append(self, task_id, step: int, screenshot: bytes = None, action: str = None, info=None, **timings):
+        """Archive one step; `timings` (e.g. predict_duration) are stored with the step record."""
+        digest = hashlib.sha1(screenshot).hexdigest() if screenshot else None
+        record = json.dumps({'task_id': task_id, 'step': step, 'action': action, 'info': info,
+                             'frame_sha1': digest, **timings}, ensure_ascii=False, default=str).encode('utf-8')
+        with self._lock, self._exclusive():
+            frame = None
+            if digest:
+                frame = self._frames.get(digest)
+                if frame is None:
+                    frame = self._frames[digest] = self._write_record(FRAME, screenshot)
+                else:
+                    self.frames_deduplicated += 1
+            location = self._write_record(STEP, record)
+            self._file.flush()
+            self._index.write(json.dumps({'task_id': task_id, 'step': step, 'time': round(time.time(), 3),
+                                          'record': location, 'frame': frame, 'sha1': digest}) + '\n')
+            self._index.flush()
+            self.steps += 1
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            self._index.close()
+            self._index_reader.close()
+        logger.info(f"[Trajectory] {self.steps} steps archived to {self.path} "
+                    f"({self.bytes_written / 1e6:.1f} MB written, {self.frames_deduplicated} duplicate frames skipped)")
+
+
+class TrajectoryArchive:
+    """Read-only, memory-mapped view of a container and its index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(f"{path}.idx", 'r', encoding='utf-8') as f:
+            self.index = [json.loads(line) for line in f if line.strip()]
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a trajectory archive")
+
+    def steps(self, task_id=None) -> list:
+        return [e for e in self.index if task_id is None or str(e['task_id']) == str(task_id)]
+
+    def frame(self, entry: dict) -> bytes:
+        """PNG bytes of a step's screenshot, or None."""
+        if not entry.get('frame'):
+            return None
+        offset, length = entry['frame']
+        return self._map[offset:offset + length]
+
+    def step(self, entry: dict) -> dict:
+        offset, length = entry['record']
+        return json.loads(self._map[offset:offset + length].decode('utf-8'))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or extract an archived trajectory")
+    parser.add_argument('path', help='trajectories_<run>.traj')
+    parser.add_argument('--task', help='Only this task id')
+    parser.add_argument('--extract', help='Write step_<task>_<n>.png/.json files into this directory')
+    args = parser.parse_args()
+
+    with TrajectoryArchive(args.path) as archive:
+        for entry in archive.steps(args.task):
+            step = archive.step(entry)
+            print(f"task {entry['task_id']} step {entry['step']}: {str(step.get('action'))[:100]}")
+            if args.extract:
+                os.makedirs(args.extract, exist_ok=True)
+                name = os.path.join(args.extract, f"step_{entry['task_id']}_{entry['step']:03d}")
+                frame = archive.frame(entry)
+                if frame is not None:
+                    with open(f"{name}.png", 'wb') as f:
+                        f.write(frame)
+                with open(f"{name}.json", 'w', encoding='utf-8') as f:
+                    json.dump(step, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# trials.py
+"""
+Sequential multi-trial evaluation: pass-rate intervals instead of one coin flip.
+
+Each task is run in rounds of up to `concurrency` trials. After every round
+the Wilson score interval of the pass rate is computed at `confidence`;
+trials stop as soon as the whole interval lies above `threshold` ('pass')
+or below it ('fail'), once `min_trials` have run. Tasks that stay ambiguous
+stop at `max_trials` ('undecided'). Clearly passing or failing tasks
+therefore cost a few runs, and the trial budget goes to the borderline ones.
+"""
+
+import logging
+import math
+from statistics import NormalDist
+
+logger = logging.getLogger(__name__)
+
+
+def wilson_interval(passes: int, trials: int, confidence: float = 0.9) -> tuple:
+    """Wilson score interval for a binomial pass rate."""
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    rate = passes / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(center - margin, 0.0), min(center + margin, 1.0)
+
+
+class SequentialTrials:
+    def __init__(self, threshold: float = 0.5, confidence: float = 0.9, min_trials: int = 3,
+                 max_trials: int = 10, concurrency: int = 1):
+        self.threshold = threshold
+        self.confidence = confidence
+        self.min_trials = max(min_trials, 1)
+        self.max_trials = max(max_trials, self.min_trials)
+        self.concurrency = max(concurrency, 1)
+
+    def decision(self, outcomes: list):
+        """'pass' / 'fail' once the interval clears the threshold, 'undecided' at max_trials, else None."""
+        trials = len(outcomes)
+        if trials >= self.min_trials:
+            low, high = wilson_interval(sum(outcomes), trials, self.confidence)
+            if low > self.threshold:
+                return 'pass'
+            if high < self.threshold:
+                return 'fail'
+        if trials >= self.max_trials:
+            return 'undecided'
+        return None
+
+    def next_batch(self, done: int) -> int:
+        """Trials to launch in the next round."""
+        return min(self.concurrency, self.max_trials - done)
+
+    def summarize(self, outcomes: list) -> dict:
+        passes, trials = sum(outcomes), len(outcomes)
+        low, high = wilson_interval(passes, trials, self.confidence)
+        return {
+            'trials': trials,
+            'passes': passes,
+            'pass_rate': passes / trials if trials else 0.0,
+            'interval': [round(low, 3), round(high, 3)],
+            'decision': self.decision(outcomes) or 'undecided',
+        }
@@ -0,0 +1,303 @@
+# usage.py
+"""
+Token and payload accounting for model calls.
+
+Agent-S engines return only the generated text, so UsageMeter.instrument()
+wraps `engine.generate` on every LMM agent reachable from the Agent-S agent
+(planner, reflection, grounding, ...) and the `create` method of the engine's
+provider client once it exists, to read the provider-reported usage
+(OpenAI / Anthropic / Gemini response shapes). Calls whose usage cannot be
+read are estimated from the request (text/4, image tokens from the PNG size)
+and counted as `estimated_calls`. `semantic` judging reports through
+record_response() to the active meter.
+
+Usage is attributed with contextvars: the runner wraps predict() in
+meter.scope(task_id) per step and evaluation in meter.scope(task_id), which also
+holds across asyncio.to_thread and deadline threads. Calls that complete after
+their scope has closed (a predict abandoned by a deadline) go to `abandoned`
+instead of a task. Totals are kept per step (returned by the
+scope), per task (pop_task) and per run (summarize_usage over results);
+flag_cost_anomalies marks tasks whose cost per successful step is far above
+the run's median.
+"""
+
+import base64
+import contextlib
+import contextvars
+import logging
+import statistics
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('calls', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'payload_bytes', 'images',
+            'estimated_calls')
+CLIENT_CREATE_PATHS = (('chat', 'completions'), ('messages',), ('responses',))
+DEFAULT_IMAGE_TOKENS = 1500
+
+_scope = contextvars.ContextVar('usage_scope', default=None)
+_response_usage = contextvars.ContextVar('usage_response', default=None)
+_active_meter = None
+
+
+def new_totals() -> dict:
+    totals = {name: 0 for name in COUNTERS}
+    totals['cost'] = 0.0
+    totals['by_source'] = {}
+    return totals
+
+
+def add_totals(totals: dict, other: dict):
+    for name in COUNTERS:
+        totals[name] += other.get(name, 0)
+    totals['cost'] += other.get('cost', 0.0)
+    for source, counts in other.get('by_source', {}).items():
+        bucket = totals['by_source'].setdefault(source, {'calls': 0, 'total_tokens': 0})
+        bucket['calls'] += counts.get('calls', 0)
+        bucket['total_tokens'] += counts.get('total_tokens', 0)
+
+
+def usage_of(response):
+    """(prompt_tokens, completion_tokens) reported by a provider response, or None."""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        prompt = getattr(usage, 'prompt_tokens', None)
+        if prompt is None:
+            prompt = getattr(usage, 'input_tokens', None)
+        completion = getattr(usage, 'completion_tokens', None)
+        if completion is None:
+            completion = getattr(usage, 'output_tokens', None)
+        if prompt is not None:
+            return int(prompt), int(completion or 0)
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is not None and getattr(metadata, 'prompt_token_count', None) is not None:
+        return int(metadata.prompt_token_count), int(getattr(metadata, 'candidates_token_count', 0) or 0)
+    return None
+
+
+def image_tokens(data: str) -> int:
+    """Rough token cost of a base64 PNG (width*height/750), read from its IHDR header."""
+    try:
+        header = base64.b64decode(data.split(',', 1)[-1][:32])
+        if header[:8] == b'\x89PNG\r\n\x1a\n':
+            width, height = struct.unpack('>II', header[16:24])
+            return max(width * height // 750, 1)
+    except (ValueError, struct.error):
+        pass
+    return DEFAULT_IMAGE_TOKENS
+
+
+def message_payload(messages) -> tuple:
+    """(payload_bytes, images, estimated_prompt_tokens) of chat messages in OpenAI/Anthropic format."""
+    payload_bytes, images, tokens = 0, 0, 0
+    for message in messages or ():
+        content = message.get('content') if isinstance(message, dict) else message
+        parts = content if isinstance(content, list) else [content]
+        for part in parts:
+            if isinstance(part, str):
+                payload_bytes += len(part)
+                tokens += len(part) // 4
+                continue
+            if not isinstance(part, dict):
+                continue
+            if part.get('type') == 'text':
+                payload_bytes += len(part.get('text', ''))
+                tokens += len(part.get('text', '')) // 4
+            elif part.get('type') in ('image_url', 'image'):
+                data = (part.get('image_url') or {}).get('url') or (part.get('source') or {}).get('data') or ''
+                payload_bytes += len(data)
+                images += 1
+                tokens += image_tokens(data)
+    return payload_bytes, images, tokens
+
+
+class UsageMeter:
+    def __init__(self, prices: dict = None):
+        self.prices = prices or {}  # {model: {"prompt": per 1M tokens, "completion": per 1M tokens}}
+        self._lock = threading.Lock()
+        self.tasks = {}
+        self.abandoned = new_totals()  # calls that finished after a deadline gave up on them
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = self.prices.get(model) or self.prices.get('default') or {}
+        return (prompt_tokens * price.get('prompt', 0.0) + completion_tokens * price.get('completion', 0.0)) / 1e6
+
+    @contextlib.contextmanager
+    def scope(self, task_id):
+        """Attribute calls made inside the block to task_id; yields the block's own totals."""
+        totals = new_totals()
+        state = {'open': True}
+        token = _scope.set((task_id, totals, state))
+        try:
+            yield totals
+        finally:
+            state['open'] = False
+            _scope.reset(token)
+
+    def record(self, source: str, model: str = None, prompt_tokens: int = 0, completion_tokens: int = 0,
+               payload_bytes: int = 0, images: int = 0, estimated: bool = False):
+        call = {'calls': 1, 'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens, 'payload_bytes': payload_bytes,
+                'images': images, 'estimated_calls': int(estimated),
+                'cost': self.cost(model, prompt_tokens, completion_tokens),
+                'by_source': {source: {'calls': 1, 'total_tokens': prompt_tokens + completion_tokens}}}
+        scope = _scope.get()
+        task_id = scope[0] if scope else None
+        with self._lock:
+            if scope and not scope[2]['open']:
+                # A call abandoned by a deadline returned after its step ended: keep it off every task
+                add_totals(self.abandoned, call)
+                logger.info(f"[Usage] Late {source} call of an abandoned step of task {task_id}: "
+                            f"{call['total_tokens']} tokens, not attributed to any task")
+                return
+            if scope:
+                add_totals(scope[1], call)
+            add_totals(self.tasks.setdefault(task_id, new_totals()), call)
+        logger.debug("[Usage] %s %s: %d+%d tokens, %d bytes%s", source, model, prompt_tokens, completion_tokens,
+                     payload_bytes, " (estimated)" if estimated else "")
+
+    def pop_task(self, task_id) -> dict:
+        """Totals recorded for task_id so far (reset, so a re-run starts from zero)."""
+        with self._lock:
+            return self.tasks.pop(task_id, None) or new_totals()
+
+    # --- instrumentation ----------------------------------------------------
+    def instrument(self, root, max_depth: int = 4):
+        """Wrap the engines of every LMM agent reachable from root. Idempotent; call again after agent.reset()."""
+        for path, engine in lmm_engines(root, max_depth):
+            self._wrap_engine(engine, source_of(path))
+
+    def _wrap_engine(self, engine, source: str):
+        if getattr(engine, '_usage_wrapped', False):
+            return
+        generate = engine.generate
+        model = getattr(engine, 'model', None)
+
+        def metered_generate(messages, *args, **kwargs):
+            self._wrap_client(getattr(engine, 'llm_client', None))
+            token = _response_usage.set(None)
+            try:
+                response = generate(messages, *args, **kwargs)
+                reported = _response_usage.get()
+            finally:
+                _response_usage.reset(token)
+            payload_bytes, images, estimated_prompt = message_payload(messages)
+            if reported:
+                prompt_tokens, completion_tokens = reported
+            else:
+                prompt_tokens, completion_tokens = estimated_prompt, len(str(response or '')) // 4
+            self.record(source, model, prompt_tokens, completion_tokens, payload_bytes, images,
+                        estimated=reported is None)
+            return response
+
+        engine.generate = metered_generate
+        engine._usage_wrapped = True
+
+    @staticmethod
+    def _wrap_client(client):
+        """Capture usage from the provider client's create() (the client is created lazily by the engine)."""
+        if client is None or getattr(client, '_usage_wrapped', False):
+            return
+        for path in CLIENT_CREATE_PATHS:
+            resource = client
+            for name in path:
+                resource = getattr(resource, name, None)
+            create = getattr(resource, 'create', None)
+            if create is None:
+                continue
+
+            def metered_create(*args, _create=create, **kwargs):
+                response = _create(*args, **kwargs)
+                _response_usage.set(usage_of(response))
+                return response
+
+            resource.create = metered_create
+        try:
+            client._usage_wrapped = True
+        except AttributeError:
+            pass
+
+
+def lmm_engines(root, max_depth: int = 4) -> list:
+    """[(attribute path, engine)] for every LMM agent reachable from root (planner, reflection, grounding, ...)."""
+    found = []
+    seen = set()
+
+    def walk(obj, path, depth):
+        if id(obj) in seen or depth > max_depth:
+            return
+        seen.add(id(obj))
+        engine = getattr(obj, 'engine', None)
+        if engine is not None and callable(getattr(engine, 'generate', None)):
+            found.append((path, engine))
+        for name, value in list(vars(obj).items()) if hasattr(obj, '__dict__') else ():
+            if name.startswith('__') or name == 'engine' or isinstance(value, (str, bytes, int, float, dict, list)):
+                continue
+            if hasattr(value, '__dict__') and not callable(value):
+                walk(value, f"{path}.{name}" if path else name, depth + 1)
+
+    walk(root, '', 0)
+    return found
+
+
+def source_of(path: str) -> str:
+    path = path.lower()
+    if 'ground' in path or 'text_span' in path:
+        return 'grounding'
+    if 'reflect' in path:
+        return 'reflection'
+    if 'code' in path:
+        return 'code'
+    return 'planner'
+
+
+def set_active_meter(meter):
+    """Meter that record_response() reports to (e.g. from evaluate.matchers.semantic)."""
+    global _active_meter
+    _active_meter = meter
+
+
+def record_response(source: str, model: str, response, prompt: str = ''):
+    """Record one direct provider call (outside Agent-S engines) on the active meter, if any."""
+    if _active_meter is None:
+        return
+    reported = usage_of(response)
+    if reported:
+        prompt_tokens, completion_tokens = reported
+    else:
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(getattr(response, 'text', '') or '') // 4
+    _active_meter.record(source, model, prompt_tokens, completion_tokens, len(prompt), 0, estimated=reported is None)
+
+
+def cost_per_ok_step(result: dict):
+    """Cost (or tokens, if no prices) per step whose action ran without error; None without usage."""
+    usage = result.get('usage')
+    if not usage or not usage.get('calls'):
+        return None
+    spent = usage['cost'] if usage.get('cost') else usage['total_tokens']
+    return spent / result['steps_ok'] if result.get('steps_ok') else float('inf')
+
+
+def summarize_usage(results: list) -> dict:
+    """Run totals over the results that actually ran (cached results are excluded)."""
+    totals = new_totals()
+    for result in results:
+        if result.get('usage') and not result.get('cached'):
+            add_totals(totals, result['usage'])
+    totals['cost'] = round(totals['cost'], 6)
+    return totals
+
+
+def flag_cost_anomalies(results: list, factor: float = 3.0, min_tasks: int = 3) -> list:
+    """[(task_id, cost_per_ok_step, run median)] for tasks far above the median, or with no successful step."""
+    costs = {r['task_id']: cost_per_ok_step(r) for r in results if not r.get('cached')}
+    finite = [c for c in costs.values() if c is not None and c != float('inf')]
+    median = statistics.median(finite) if finite else None
+    flagged = []
+    for task_id, cost in costs.items():
+        if cost is None:
+            continue
+        if cost == float('inf') or (median and len(finite) >= min_tasks and cost > factor * median):
+            flagged.append((task_id, cost, median))
+    return flagged
@@ -0,0 +1,381 @@
+# work_queue.py
+"""
+Durable task queue for running one suite across many worker processes/hosts.
+
+A coordinator enqueues task IDs for a run; workers lease one task at a time,
+heartbeat while running it, and push the result back. A lease that is not
+renewed within `lease_seconds` (crashed or hung worker) expires and the task
+is handed to another worker, up to `max_attempts` leases per task.
+
+Backends:
+
+- WorkQueue:   SQLite file (WAL). Enough for any number of processes on one
+               host, or hosts sharing a filesystem with working locks.
+- QueueServer: exposes a WorkQueue over a small JSON/HTTP API. It listens on
+               127.0.0.1 by default; binding any other interface requires a
+               shared token, which clients send in the X-Queue-Token header.
+- RemoteQueue: client for QueueServer with the same methods, for workers on
+               other hosts.
+
+`open_queue("work_queue.db")` or `open_queue("http://coordinator:8765")`
+returns the matching backend.
+
+CLI:
+    python -m evaluate.work_queue serve --db work_queue.db --port 8765
+    WORK_QUEUE_TOKEN=... python -m evaluate.work_queue serve --host 0.0.0.0
+    python -m evaluate.work_queue status --queue work_queue.db --run RUN_ID
+"""
+
+import argparse
+import hmac
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Queue-Token'
+TOKEN_ENV = 'WORK_QUEUE_TOKEN'  # default token for QueueServer and RemoteQueue
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    updated_at REAL,
+    PRIMARY KEY (run_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(run_id, status, position);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path: str = "work_queue.db", lease_seconds: float = 600, max_attempts: int = 2):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        """Run fn(conn) in one IMMEDIATE transaction (serialized across processes)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- coordinator --------------------------------------------------------
+    def enqueue(self, run_id: str, task_ids) -> int:
+        """Add tasks to a run (already-enqueued tasks are left untouched). Returns the number added."""
+        now = time.time()
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, task_id, position, updated_at) VALUES (?, ?, ?, ?)",
+                [(run_id, str(task_id), i, now) for i, task_id in enumerate(task_ids)],
+            )
+            return conn.total_changes - before
+        return self._write(insert)
+
+    def counts(self, run_id: str) -> dict:
+        """Job counts by status; expired leases are reported as 'pending'."""
+        rows = self._conn().execute(
+            "SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'pending' ELSE status END, COUNT(*) "
+            "FROM jobs WHERE run_id = ? GROUP BY 1", (time.time(), run_id),
+        ).fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def results(self, run_id: str) -> list:
+        rows = self._conn().execute(
+            "SELECT result FROM jobs WHERE run_id = ? AND result IS NOT NULL ORDER BY position", (run_id,),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def finished(self, run_id: str) -> bool:
+        self._write(lambda conn: self._reap(conn, run_id, time.time()))
+        counts = self.counts(run_id)
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def _reap(self, conn, run_id: str, now: float):
+        """Give up on expired leases that used up their attempts (worker crashed on every try)."""
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', worker = NULL, updated_at = ?, "
+            "result = json_object('task_id', task_id, 'success', json('false'), 'error', 'lease expired') "
+            "WHERE run_id = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, run_id, now, self.max_attempts),
+        )
+
+    # --- worker -------------------------------------------------------------
+    def lease(self, run_id: str, worker: str):
+        """Lease the next runnable task. Returns task_id, or None if nothing is runnable right now."""
+        def take(conn):
+            now = time.time()
+            self._reap(conn, run_id, now)
+            row = conn.execute(
+                "SELECT task_id FROM jobs WHERE run_id = ? AND "
+                "(status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY position LIMIT 1", (run_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE run_id = ? AND task_id = ?",
+                (worker, now + self.lease_seconds, now, run_id, row[0]),
+            )
+            return row[0]
+        return self._write(take)
+
+    def heartbeat(self, run_id: str, task_id: str, worker: str) -> bool:
+        """Extend the lease. False if the worker no longer owns it (expired and re-leased)."""
+        def extend(conn):
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND worker = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, run_id, str(task_id), worker),
+            )
+            return cursor.rowcount == 1
+        return self._write(extend)
+
+    def complete(self, run_id: str, task_id: str, worker: str, result: dict) -> bool:
+        """Store the result. A late result from a worker whose lease was taken over is dropped."""
+        def finish(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), run_id, str(task_id), worker),
+            )
+            return cursor.rowcount == 1
+        accepted = self._write(finish)
+        if not accepted:
+            logger.warning(f"[Queue] Dropped result for task {task_id} from {worker}: lease no longer held")
+        return accepted
+
+    def release(self, run_id: str, task_id: str, worker: str) -> bool:
+        """Give a leased task back without a result (e.g. worker shutting down)."""
+        def give_back(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'pending', worker = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND worker = ? AND status = 'leased'",
+                (time.time(), run_id, str(task_id), worker),
+            )
+            return cursor.rowcount == 1
+        return self._write(give_back)
+
+
+class Heartbeat:
+    """Background thread renewing a lease every `interval` seconds while a task runs."""
+
+    def __init__(self, queue, run_id: str, task_id: str, worker: str, interval: float = 30):
+        self.queue = queue
+        self.run_id = run_id
+        self.task_id = task_id
+        self.worker = worker
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{task_id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.run_id, self.task_id, self.worker):
+                    self.lost = True
+                    logger.warning(f"[Queue] Lease on task {self.task_id} was lost")
+                    return
+            except Exception as e:  # coordinator briefly unreachable; the lease may still be valid
+                logger.warning(f"[Queue] Heartbeat failed for task {self.task_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+# --- HTTP front end -----------------------------------------------------------
+
+def make_handler(queue: WorkQueue, token: str = None):
+    methods = {'enqueue', 'counts', 'results', 'finished', 'lease', 'heartbeat', 'complete', 'release'}
+
+    class QueueRequestHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug("[QueueServer] " + format, *args)
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                return self._send(401, {'error': 'missing or wrong queue token'})
+            name = self.path.strip('/')
+            if name not in methods:
+                return self._send(404, {'error': f"unknown method {name}"})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                params = json.loads(self.rfile.read(length) or b'{}')
+                self._send(200, {'result': getattr(queue, name)(**params)})
+            except Exception as e:
+                logger.exception(f"[QueueServer] {name} failed")
+                self._send(500, {'error': str(e)})
+
+    return QueueRequestHandler
+
+
+class QueueServer:
+    def __init__(self, queue: WorkQueue, host: str = '127.0.0.1', port: int = 8765, token: str = None):
+        token = token or os.environ.get(TOKEN_ENV)
+        if host not in LOOPBACK_HOSTS and not token:
+            raise ValueError(f"QueueServer on {host} needs a token (token= or ${TOKEN_ENV})")
+        self.queue = queue
+        self.server = ThreadingHTTPServer((host, port), make_handler(queue, token))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='queue-server', daemon=True)
+        self._thread.start()
+        logger.info(f"[QueueServer] Serving {self.queue.path} on {self.url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RemoteQueue:
+    """WorkQueue API over HTTP (see QueueServer)."""
+
+    def __init__(self, url: str, timeout: float = 30, token: str = None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.token = token or os.environ.get(TOKEN_ENV)
+
+    def _call(self, name, **params):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        request = urllib.request.Request(
+            f"{self.url}/{name}", data=json.dumps(params, default=str).encode('utf-8'),
+            headers=headers, method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())['result']
+
+    def enqueue(self, run_id, task_ids):
+        return self._call('enqueue', run_id=run_id, task_ids=list(task_ids))
+
+    def counts(self, run_id):
+        return self._call('counts', run_id=run_id)
+
+    def results(self, run_id):
+        return self._call('results', run_id=run_id)
+
+    def finished(self, run_id):
+        return self._call('finished', run_id=run_id)
+
+    def lease(self, run_id, worker):
+        return self._call('lease', run_id=run_id, worker=worker)
+
+    def heartbeat(self, run_id, task_id, worker):
+        return self._call('heartbeat', run_id=run_id, task_id=task_id, worker=worker)
+
+    def complete(self, run_id, task_id, worker, result):
+        return self._call('complete', run_id=run_id, task_id=task_id, worker=worker, result=result)
+
+    def release(self, run_id, task_id, worker):
+        return self._call('release', run_id=run_id, task_id=task_id, worker=worker)
+
+
+def open_queue(spec: str, lease_seconds: float = 600, max_attempts: int = 2, token: str = None):
+    if spec.startswith(('http://', 'https://')):
+        return RemoteQueue(spec, token=token)
+    return WorkQueue(spec, lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Work queue for distributed test runs")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help='Expose a SQLite queue over HTTP for remote workers')
+    serve.add_argument('--db', default='work_queue.db')
+    serve.add_argument('--host', default='127.0.0.1', help=f'Other interfaces need --token or ${TOKEN_ENV}')
+    serve.add_argument('--token', help='Shared token remote workers must send')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--lease-seconds', type=float, default=600)
+    serve.add_argument('--max-attempts', type=int, default=2)
+
+    status = sub.add_parser('status', help='Show job counts of a run')
+    status.add_argument('--queue', default='work_queue.db')
+    status.add_argument('--run', required=True)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'serve':
+        queue = WorkQueue(args.db, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+        try:
+            server = QueueServer(queue, args.host, args.port, token=args.token)
+        except ValueError as e:
+            parser.error(str(e))
+        logger.info(f"[QueueServer] Serving {args.db} on {server.url}")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server.server_close()
+    elif args.command == 'status':
+        print(json.dumps(open_queue(args.queue).counts(args.run), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -26,24 +26,20 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "Agent-S"))
 from gui_agents.s3.agents.grounding import OSWorldACI
 from gui_agents.s3.agents.agent_s import AgentS3
 
+from evaluate.log_utils import setup_logging
+from evaluate.rate_limit import get_rate_limiter
+
 # Import config
 try:
     from config import ENGINE_CONFIG, GROUNDING_CONFIG, TEST_CONFIG, RATE_LIMIT_CONFIG
     USE_CONFIG_FILE = True
 except ImportError:
     USE_CONFIG_FILE = False
-    RATE_LIMIT_CONFIG = {"enabled": False, "delay_between_requests": 0}
+    RATE_LIMIT_CONFIG = {"enabled": False}
 
-# Setup logging with file handler
+# Setup logging with file handler (console/file writes happen on a background listener thread)
 log_filename = f"test_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Console output
-        logging.FileHandler(log_filename, mode='a', encoding='utf-8')  # File output (append)
-    ]
-)
+setup_logging(log_filename, level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.info(f"Log file created: {log_filename}")
 
@@ -61,6 +57,9 @@ class PrestaShopTester:
         self.results = []
         self.results_file = f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         self.log_filename = log_filename
+        
+        # Token-bucket limiter shared by all tasks in this process (None when disabled)
+        self.rate_limiter = get_rate_limiter(RATE_LIMIT_CONFIG)
     
     def save_incremental_result(self, result: dict):
         """Save result to JSON file after each task completes."""
@@ -99,6 +98,14 @@ class PrestaShopTester:
         except Exception as e:
             logger.error(f"Error saving result: {e}")
     
+    def predict(self, agent, instruction: str, obs: dict):
+        """agent.predict; the rate limiter paces each engine request inside it (see setup_agent)."""
+        return agent.predict(instruction=instruction, observation=obs)
+    
+    async def predict_async(self, agent, instruction: str, obs: dict):
+        """Async variant: the rate-limit waits run on a worker thread instead of the event loop."""
+        return await asyncio.to_thread(agent.predict, instruction=instruction, observation=obs)
+    
     def resolve_url(self, url: str) -> str:
         """Resolve placeholder URLs to actual URLs."""
         for placeholder, config in self.env_config.items():
@@ -129,6 +136,9 @@ class PrestaShopTester:
             enable_reflection=True
         )
         
+        if self.rate_limiter:
+            self.rate_limiter.instrument(agent)  # paces and retries individual engine requests
+        
         return agent
     
     async def run_task_with_playwright(self, task: dict, agent) -> dict:
@@ -167,14 +177,8 @@ class PrestaShopTester:
                 for step in range(max_steps):
                     logger.info(f"Step {step + 1}/{max_steps}")
                     
-                    # Rate limiting
-                    if RATE_LIMIT_CONFIG.get('enabled', False):
-                        delay = RATE_LIMIT_CONFIG.get('delay_between_requests', 13)
-                        logger.info(f"Rate limit: waiting {delay}s before API call...")
-                        await asyncio.sleep(delay)
-                    
-                    # Get action from agent
-                    info, code = agent.predict(instruction=description, observation=obs)
+                    # Get action from agent (rate limited)
+                    info, code = await self.predict_async(agent, description, obs)
                     
                     if "done" in code[0].lower() or "fail" in code[0].lower():
                         logger.info(f"Agent completed task: {code[0]}")
@@ -266,12 +270,6 @@ class PrestaShopTester:
                 result['steps_used'] = step + 1
                 logger.info(f"Step {step + 1}/{max_steps}")
                 
-                # Rate limiting
-                if RATE_LIMIT_CONFIG.get('enabled', False):
-                    delay = RATE_LIMIT_CONFIG.get('delay_between_requests', 13)
-                    logger.info(f"Rate limit: waiting {delay}s before API call...")
-                    time.sleep(delay)
-                
                 # Take screenshot
                 screenshot = pyautogui.screenshot()
                 screenshot = screenshot.resize((1920, 1080), Image.LANCZOS)
@@ -282,8 +280,8 @@ class PrestaShopTester:
                 
                 obs = {"screenshot": screenshot_bytes}
                 
-                # Get action from agent
-                info, code = agent.predict(instruction=description, observation=obs)
+                # Get action from agent (rate limited)
+                info, code = self.predict(agent, description, obs)
                 
                 if "done" in code[0].lower():
                     logger.info("Agent completed task successfully")
@@ -317,6 +315,8 @@ class PrestaShopTester:
         for task in self.tasks:
             # Reset agent state before each task to clear trajectory memory
             agent.reset()
+            if self.rate_limiter:
+                self.rate_limiter.instrument(agent)  # reset() may rebuild the planner's engines
             
             if mode == 'playwright':
                 result = asyncio.run(self.run_task_with_playwright(task, agent))
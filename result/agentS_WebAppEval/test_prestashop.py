@@ -6,21 +6,27 @@ using the tasks defined in prestashop_tasks.json
 
 import argparse
 import asyncio
+import contextlib
 import io
 import json
 import logging
 import os
 import platform
-import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-import pyautogui
 from PIL import Image
 from playwright.async_api import async_playwright
 
+try:
+    import pyautogui
+except Exception:  # no display (e.g. headless CI); only the pyautogui mode needs it
+    pyautogui = None
+
 # Add the parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "Agent-S"))
 
@@ -29,31 +35,73 @@ from gui_agents.s3.agents.agent_s import AgentS3
 
 # Import WebAppEval Evaluator
 from evaluate.evaluator import Evaluator
+from evaluate.reporting import compute_metrics
+from evaluate.log_index import EventLog
+from evaluate.log_utils import setup_logging
+from evaluate.answer_extraction import extract_answer
+from evaluate.actions import PlaywrightActionExecutor, run_compiled
+from evaluate.eval_context import new_eval_page, load_for_eval, poll_dom_match
+from evaluate.dom_query import HTTPClient
+from evaluate.handlers import extractor_js, dom_match_http, dom_match_http_capable
+from evaluate.grounding_cache import GroundingCache
+from evaluate.replay import RecordingAgent, ReplayAgent
+from evaluate.rate_limit import get_rate_limiter
+from evaluate.work_queue import Heartbeat, QueueServer, default_worker_id, open_queue
+from evaluate.run_planner import RunPlanner
+from evaluate.observation_scaling import ScaledObservationAgent
+from evaluate.pipeline import EvaluationPipeline, needs_live_state
+from evaluate.deadlines import Deadline, TaskTimeout
+from evaluate.usage import UsageMeter, flag_cost_anomalies, set_active_meter, summarize_usage
+from evaluate.trials import SequentialTrials
+from evaluate.trajectory_store import TrajectoryWriter
+from evaluate.trajectory_monitor import TrajectoryMonitor, screen_fingerprint, with_hint
+from environments.pool import EnvironmentPool, load_shards
+from environments.reset import get_reset_backend
+from environments.warmup import warm_up
+from environments.virtual_display import DisplayBrowser, spawn_display_workers, stop_display_workers
 
 # Import config
 try:
-    from config import ENGINE_CONFIG, GROUNDING_CONFIG, TEST_CONFIG, RATE_LIMIT_CONFIG
+    from config import (ENGINE_CONFIG, GROUNDING_CONFIG, TEST_CONFIG, RATE_LIMIT_CONFIG, RESET_CONFIG,
+                        GROUNDING_CACHE_CONFIG, REPLAY_CONFIG, LOOP_DETECTION_CONFIG, DOM_HTTP_CONFIG,
+                        QUEUE_CONFIG, DIFF_RUN_CONFIG, DISPLAY_WORKERS_CONFIG, OBSERVATION_CONFIG,
+                        PIPELINE_CONFIG, USAGE_CONFIG, ENV_POOL_CONFIG, TIMEOUT_CONFIG, TRIALS_CONFIG,
+                        TRAJECTORY_CONFIG, WARMUP_CONFIG)
     USE_CONFIG_FILE = True
 except ImportError:
     USE_CONFIG_FILE = False
-    RATE_LIMIT_CONFIG = {"enabled": False, "delay_between_requests": 0}
+    RATE_LIMIT_CONFIG = {"enabled": False}
+    RESET_CONFIG = {"backend": "none"}
+    GROUNDING_CACHE_CONFIG = {"enabled": False}
+    REPLAY_CONFIG = {"mode": "off"}
+    LOOP_DETECTION_CONFIG = {"enabled": False}
+    DOM_HTTP_CONFIG = {"enabled": True}
+    QUEUE_CONFIG = {"role": "off"}
+    DIFF_RUN_CONFIG = {"enabled": False}
+    DISPLAY_WORKERS_CONFIG = {"workers": 0}
+    OBSERVATION_CONFIG = {"enabled": False}
+    PIPELINE_CONFIG = {"enabled": False}
+    USAGE_CONFIG = {"enabled": True}
+    ENV_POOL_CONFIG = {"lock_dir": None, "lease_timeout": None}
+    TRIALS_CONFIG = {"enabled": False}
+    TRAJECTORY_CONFIG = {"enabled": True}
+    WARMUP_CONFIG = {"enabled": True}
+    TIMEOUT_CONFIG = {"task": 900, "navigation": 60, "predict": 180, "action": 30, "settle": 30, "evaluation": 120,
+                      "abandoned_call_grace": 900}
+
+# Per-process file names carry the pid: display/queue workers start in the same directory within
+# the same second as their coordinator
+RUN_STAMP = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
 
-# Setup logging with file handler
-log_filename = f"test_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Console output
-        logging.FileHandler(log_filename, mode='a', encoding='utf-8')  # File output (append)
-    ]
-)
+# Setup logging with file handler (console/file writes happen on a background listener thread)
+log_filename = f"test_log_{RUN_STAMP}.txt"
+setup_logging(log_filename, level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.info(f"Log file created: {log_filename}")
 
 
 class PrestaShopTester:
-    def __init__(self, env_config_path: str, tasks_path: str):
+    def __init__(self, env_config_path: str, tasks_path: str, headless: bool = False):
         """Initialize the PrestaShop tester."""
         with open(env_config_path, 'r') as f:
             self.env_config = json.load(f)
@@ -63,62 +111,216 @@ class PrestaShopTester:
         
         self.current_platform = platform.system().lower()
         self.results = []
-        self.results_file = f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        self.agent_screen_size = None
+        self.headless = headless
+        self.grounding_cache = None
+        self.grounding_size = (1920, 1080)
+        self.run_planner = None
+        self._plan = None
+        self.display_browser = None  # pyautogui display workers open the browser themselves
+        self.current_task_id = None
+        self.pipeline = None
+        # Token/payload accounting for engine, grounding and semantic calls (see evaluate/usage.py)
+        self.usage_meter = UsageMeter(USAGE_CONFIG.get('prices')) if USAGE_CONFIG.get('enabled', True) else None
+        set_active_meter(self.usage_meter)
+        self.results_file = f"test_results_{RUN_STAMP}.json"
+        self._results_lock = threading.Lock()  # results file is also written from evaluation workers
         self.log_filename = log_filename
+        self.queue_role = 'off'  # queue workers leave the results file and report to their coordinator
+        
+        # Structured JSONL events alongside the text log (see evaluate/log_index.py)
+        self.event_log = EventLog(f"test_events_{RUN_STAMP}.jsonl")
+        
+        # Every step's screenshot, action and agent info in one append-only file (see evaluate/trajectory_store.py)
+        self.trajectory = None
+        if TRAJECTORY_CONFIG.get('enabled', True):
+            self.trajectory = TrajectoryWriter(os.path.join(TRAJECTORY_CONFIG.get('dir') or '.',
+                                                            f"trajectories_{RUN_STAMP}.traj"))
         
         # Initialize WebAppEval Evaluator
         self.evaluator = Evaluator(self.tasks)
         logger.info("WebAppEval Evaluator initialized")
+        
+        # Token-bucket limiter shared by all tasks in this process (None when disabled)
+        self.rate_limiter = get_rate_limiter(RATE_LIMIT_CONFIG)
+        
+        # Snapshot/restore hooks for state-mutating tasks (see environments/reset.py)
+        self.env_reset = get_reset_backend(RESET_CONFIG)
+        
+        # Shop instances/accounts leased to tasks; placeholders are resolved here once per shard
+        # (see environments/pool.py)
+        self.env_pool = EnvironmentPool(load_shards(self.env_config), lock_dir=ENV_POOL_CONFIG.get('lock_dir'),
+                                        reset=self.env_reset)
+        self.env_pool.resolve_tasks(self.tasks)
+        self.shard_leases = {}  # (task_id, trial) -> ShardLease, held until the task's result is recorded
+        self.trial_agents = []  # extra agents for concurrent trials (see run_task_trials)
+        self.busy_agents = {}  # id(agent) -> thread still running a predict abandoned by a deadline
+        self.warmup_report = None
+        
+        # Keep-alive HTTP pool for browserless declarative dom_match checks (see evaluate/dom_query.py)
+        self.http_client = None
+        if DOM_HTTP_CONFIG.get('enabled', True):
+            self.http_client = HTTPClient(
+                max_connections_per_host=DOM_HTTP_CONFIG.get('max_connections_per_host', 8),
+                timeout=DOM_HTTP_CONFIG.get('timeout', 10),
+                cookies=DOM_HTTP_CONFIG.get('cookies'),
+            )
     
     def save_incremental_result(self, result: dict):
         """Save result to JSON file after each task completes."""
-        try:
-            # Load existing results if file exists
-            if os.path.exists(self.results_file):
-                with open(self.results_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            else:
-                data = {
-                    'start_time': datetime.now().isoformat(),
-                    'results': [],
-                    'summary': {}
-                }
-            
-            # Append new result
-            result_copy = result.copy()
-            result_copy['timestamp'] = datetime.now().isoformat()
-            data['results'].append(result_copy)
-            
-            # Update summary
-            total = len(data['results'])
-            passed = sum(1 for r in data['results'] if r['success'])
-            data['summary'] = {
-                'total_tasks': total,
-                'passed': passed,
-                'failed': total - passed,
-                'pass_rate': f"{(passed/total*100):.1f}%" if total > 0 else "0%"
-            }
+        if self.queue_role == 'worker':
+            return  # the coordinator writes the collected results (see save_results)
+        with self._results_lock:
+            try:
+                # Load existing results if file exists
+                if os.path.exists(self.results_file):
+                    with open(self.results_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                else:
+                    data = {
+                        'start_time': datetime.now().isoformat(),
+                        'results': [],
+                        'summary': {}
+                    }
             
-            # Save to file
-            with open(self.results_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+                # Append new result
+                result_copy = result.copy()
+                result_copy['timestamp'] = datetime.now().isoformat()
+                data['results'].append(result_copy)
+                self._write_results(data)
             
-            logger.info(f"Result saved to {self.results_file}")
-        except Exception as e:
-            logger.error(f"Error saving result: {e}")
+                logger.info(f"Result saved to {self.results_file}")
+            except Exception as e:
+                logger.error(f"Error saving result: {e}")
+    
+    def save_results(self, results: list):
+        """Write a whole run's results at once (the coordinator, after collecting them from the queue)."""
+        with self._results_lock:
+            try:
+                data = {'start_time': datetime.now().isoformat(), 'results': [dict(r) for r in results], 'summary': {}}
+                self._write_results(data)
+                logger.info(f"{len(results)} results saved to {self.results_file}")
+            except Exception as e:
+                logger.error(f"Error saving results: {e}")
+    
+    def _write_results(self, data: dict):
+        if self.usage_meter:
+            data['usage'] = summarize_usage(data['results'])
+        
+        # Update summary
+        total = len(data['results'])
+        passed = sum(1 for r in data['results'] if r['success'])
+        data['summary'] = {
+            'total_tasks': total,
+            'passed': passed,
+            'failed': total - passed,
+            'pass_rate': f"{(passed/total*100):.1f}%" if total > 0 else "0%"
+        }
+        
+        # Save to file
+        with open(self.results_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
     
-    def resolve_url(self, url: str) -> str:
-        """Resolve placeholder URLs to actual URLs."""
-        for placeholder, config in self.env_config.items():
-            if url.startswith(placeholder):
-                return url.replace(placeholder, config['url'])
-        return url
+    def call_model(self, agent, instruction: str, obs: dict):
+        """agent.predict; each engine request inside it is paced by the rate limiter (see instrument_agent)."""
+        return agent.predict(instruction=instruction, observation=obs)
+    
+    def predict(self, agent, instruction: str, obs: dict, step: int = None, deadline: Deadline = None):
+        """call_model bounded by the predict deadline; a timed-out call fences the agent (see wait_for_agent)."""
+        with self.usage_scope(self.current_task_id) as usage:
+            try:
+                prediction = (deadline or Deadline()).call('predict', self.call_model, agent, instruction, obs)
+            except TaskTimeout as e:
+                self.abandon_agent(agent, e.pending)
+                raise
+        self.emit_step_usage(step, usage)
+        return prediction
+    
+    async def predict_async(self, agent, instruction: str, obs: dict, step: int = None, deadline: Deadline = None):
+        """Async variant: the model call runs on a deadline thread, so the event loop is never blocked."""
+        with self.usage_scope(self.current_task_id) as usage:
+            try:
+                prediction = await (deadline or Deadline()).run_call('predict', self.call_model, agent, instruction, obs)
+            except TaskTimeout as e:
+                self.abandon_agent(agent, e.pending)
+                raise
+        self.emit_step_usage(step, usage)
+        return prediction
+    
+    def abandon_agent(self, agent, call: threading.Thread):
+        """Remember a predict the deadline gave up on; it keeps running and mutating the agent."""
+        if call is not None and call.is_alive():
+            self.busy_agents[id(agent)] = call
+    
+    def wait_for_agent(self, agent) -> bool:
+        """Fence before reusing an agent: wait for its abandoned predict (if any) to return.
+        
+        Returns False if the call is still running after TIMEOUT_CONFIG['abandoned_call_grace'].
+        """
+        call = self.busy_agents.get(id(agent))
+        if call is None:
+            return True
+        grace = TIMEOUT_CONFIG.get('abandoned_call_grace')
+        logger.warning(f"[Deadline] Waiting for the agent's timed-out predict to return"
+                       f"{f' (up to {grace:g}s)' if grace else ''} before reusing it")
+        call.join(grace)
+        if call.is_alive():
+            return False
+        del self.busy_agents[id(agent)]
+        return True
+    
+    def instrument_agent(self, agent):
+        """Usage metering and per-request pacing/retries on the agent's engines (again after agent.reset())."""
+        if self.usage_meter:
+            self.usage_meter.instrument(agent)
+        if self.rate_limiter:
+            self.rate_limiter.instrument(agent)
+    
+    def new_deadline(self, include_task: bool = True) -> Deadline:
+        """Deadline for one task from TIMEOUT_CONFIG (evaluation alone gets only its phase limit)."""
+        return Deadline(TIMEOUT_CONFIG.get('task') if include_task else None, TIMEOUT_CONFIG)
+    
+    def record_timeout(self, result: dict, timeout: TaskTimeout):
+        """Mark a result as timed out: a distinct outcome, never a pass."""
+        result['timeout'] = timeout.phase
+        result['error'] = str(timeout)
+        result['stopped_reason'] = f"timeout: {timeout}"
+        result['success'] = False
+    
+    def usage_scope(self, task_id):
+        """Attribute model calls in the block to task_id; yields the block's usage (None when disabled)."""
+        return self.usage_meter.scope(task_id) if self.usage_meter else contextlib.nullcontext()
+    
+    def emit_step_usage(self, step: int, usage: dict):
+        if usage and usage['calls']:
+            self.event_log.emit('usage', self.current_task_id, step, **usage)
+    
+    def new_trajectory_monitor(self):
+        """Fresh loop/stall detector for one task, or None when disabled."""
+        if not LOOP_DETECTION_CONFIG.get('enabled', False):
+            return None
+        return TrajectoryMonitor(
+            repeat_threshold=LOOP_DETECTION_CONFIG.get('repeat_threshold', 3),
+            oscillation_cycles=LOOP_DETECTION_CONFIG.get('oscillation_cycles', 3),
+            stall_steps=LOOP_DETECTION_CONFIG.get('stall_steps', 6),
+            max_hints=LOOP_DETECTION_CONFIG.get('max_hints', 1),
+        )
     
     def setup_agent(self, engine_params: dict, grounding_params: dict, env=None):
         """Setup Agent-S with the given parameters."""
-        # --- Get real screen size ---
-        screen_width, screen_height = pyautogui.size()
-        logger.info(f"[AgentS] Detected screen size: {screen_width}x{screen_height}")
+        self.grounding_size = (
+            grounding_params.get('grounding_width', 1920),
+            grounding_params.get('grounding_height', 1080),
+        )
+        if self.headless or pyautogui is None:
+            # Headless pages are created at the grounding resolution, so coordinates map 1:1
+            screen_width, screen_height = self.grounding_size
+            logger.info(f"[AgentS] Headless mode, using grounding resolution: {screen_width}x{screen_height}")
+        else:
+            # --- Get real screen size ---
+            screen_width, screen_height = pyautogui.size()
+            logger.info(f"[AgentS] Detected screen size: {screen_width}x{screen_height}")
+        self.agent_screen_size = (screen_width, screen_height)
         
         grounding_agent = OSWorldACI(
             env=env,  # Environment object (can be None for basic usage)
@@ -137,35 +339,56 @@ class PrestaShopTester:
             enable_reflection=True
         )
         
+        # Downscaled observations for the planner, full resolution for grounding
+        if OBSERVATION_CONFIG.get('enabled', False):
+            agent = ScaledObservationAgent(
+                agent, grounding_agent,
+                planner_scale=OBSERVATION_CONFIG.get('planner_scale', 0.5),
+                planner_crop=OBSERVATION_CONFIG.get('planner_crop'),
+                grounding_scale=OBSERVATION_CONFIG.get('grounding_scale', 1.0),
+                on_stats=lambda step, stats: self.event_log.emit(
+                    'observation', self.current_task_id, step, duration=stats.pop('predict_seconds'), **stats),
+            )
+            logger.info(f"[AgentS] Observation scaling enabled (planner x{agent.planner_scale}, "
+                        f"grounding x{agent.grounding_scale})")
+        
+        # Wrapped last so the cache sees full-resolution screenshots and unscaled grounding coordinates
+        if GROUNDING_CACHE_CONFIG.get('enabled', False) and self.grounding_cache is None:
+            self.grounding_cache = GroundingCache(
+                max_entries=GROUNDING_CACHE_CONFIG.get('max_entries', 512),
+                region_size=tuple(GROUNDING_CACHE_CONFIG.get('region_size', (160, 64))),
+                max_distance=GROUNDING_CACHE_CONFIG.get('max_distance', 6),
+                grounding_size=self.grounding_size,
+                path=GROUNDING_CACHE_CONFIG.get('path'),
+            )
+            logger.info("[AgentS] Grounding cache enabled")
+        if self.grounding_cache:
+            self.grounding_cache.wrap(grounding_agent)  # one cache shared by every agent of the run
+        
+        self.instrument_agent(agent)
+        
         return agent
     
+    async def new_browser_page(self, p):
+        """Launch Chromium and open a page whose viewport matches the grounding resolution.
+        
+        With device_scale_factor=1 screenshots come out at exactly grounding_width x
+        grounding_height, so no resampling is needed before sending them to the agent.
+        """
+        browser = await p.chromium.launch(headless=self.headless)
+        width, height = self.grounding_size
+        context = await browser.new_context(viewport={'width': width, 'height': height}, device_scale_factor=1)
+        page = await context.new_page()
+        return browser, page
+    
     def extract_agent_answer(self, agent_info: dict) -> str:
         """Extract the agent's answer from its reasoning output.
         
-        For lookup tasks, the agent typically mentions the answer in its plan/analysis.
-        We try to extract it from the reasoning text.
+        See evaluate/answer_extraction.py for the rules (structured field,
+        agent.done argument, patterns over the final plan text, fallback).
         """
-        if not agent_info:
-            return ""
-        
-        # agent_info is typically a dict with 'plan' or reasoning
-        reasoning = str(agent_info)
-        
-        # Common patterns for agent answers
-        patterns = [
-            r'the (?:first |cheapest |most expensive )?(?:product|item) (?:is|displayed)[:\s]*["\']?([^"\'.\n]+)',
-            r'name of the (?:first |cheapest )?product[:\s]*["\']?([^"\'.\n]+)',
-            r'answer is[:\s]*["\']?([^"\'.\n]+)',
-            r'result is[:\s]*["\']?([^"\'.\n]+)',
-            r'total (?:number of )?products[:\s]*(\d+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, reasoning, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        
-        return reasoning
+        answer, _ = extract_answer(agent_info)
+        return answer
     
     async def evaluate_with_webappeval(self, task: dict, agent_answer: str = None) -> bool:
         """Evaluate task result using WebAppEval Evaluator with Playwright.
@@ -193,12 +416,9 @@ class PrestaShopTester:
         # Since we use pyautogui, we'll prompt user to stay on the final page
         # and use Playwright to connect and verify
         async with async_playwright() as p:
+            browser = None
             try:
-                # Launch browser to verify result
-                # Note: For pyautogui mode, the browser state is in user's browser
-                # We'll use CDP to connect to Chrome if possible, or ask user
-                browser = await p.chromium.launch(headless=False)
-                page = await browser.new_page()
+                width, height = self.grounding_size
                 
                 # Check each eval type
                 for eval_type in eval_types:
@@ -206,12 +426,25 @@ class PrestaShopTester:
                         dom_conf = eval_block['dom_match']
                         url = dom_conf.get('url', 'last')
                         
+                        # Declarative checks on server-rendered pages: fetch the HTML, no browser
+                        if self.http_client and dom_match_http_capable(dom_conf):
+                            logger.info(f"[WebAppEval] HTTP dom_match on: {url}")
+                            result = await asyncio.to_thread(dom_match_http, dom_conf, self.http_client, url)
+                            logger.info(f"[WebAppEval] dom_match result: {result}")
+                            if not result:
+                                return False
+                            continue
+                        
                         # If URL is specified (not 'last'), navigate to it
                         if url not in ('', 'current', 'last', None):
-                            resolved_url = self.resolve_url(url)
-                            logger.info(f"[WebAppEval] Navigating to: {resolved_url}")
-                            await page.goto(resolved_url)
-                            await page.wait_for_load_state('networkidle')
+                            if browser is None:
+                                # Evaluation only reads the DOM: headless browser, no images/media/fonts/analytics,
+                                # no animations (see evaluate/eval_context.py)
+                                browser = await p.chromium.launch(headless=True)
+                            logger.info(f"[WebAppEval] Navigating to: {url}")
+                            _, page = await new_eval_page(browser, viewport={'width': width, 'height': height},
+                                                          allow_resources=dom_conf.get('allow_resources', ()))
+                            await load_for_eval(page, url, dom_conf)
                         else:
                             # For 'last', ask user to confirm we're on correct page
                             logger.info("[WebAppEval] Using current browser state for dom_match")
@@ -219,14 +452,10 @@ class PrestaShopTester:
                             logger.warning("[WebAppEval] Cannot verify DOM in pyautogui mode without page access")
                             continue
                         
-                        # Execute DOM check
-                        result = await self.evaluator.evaluate_with_playwright(
-                            task_id=task_id,
-                            agent_result=agent_answer,
-                            browser=page
-                        )
+                        # Execute DOM check on the loaded page (polls until match or timeout)
+                        result = await poll_dom_match(page, dom_conf)
+                        logger.info(f"[WebAppEval] dom_match result: {result}")
                         if not result:
-                            await browser.close()
                             return False
                     
                     elif eval_type == 'url_match' and 'url_match' in eval_block:
@@ -243,22 +472,25 @@ class PrestaShopTester:
                             task=task['task_description']
                         )
                         if not result:
-                            await browser.close()
                             return False
                 
-                await browser.close()
                 return True
                 
             except Exception as e:
                 logger.error(f"[WebAppEval] Evaluation error: {e}")
                 return False
+            
+            finally:
+                if browser:
+                    await browser.close()
     
     
-    async def run_task_with_playwright(self, task: dict, agent) -> dict:
+    async def run_task_with_playwright(self, task: dict, agent, deadline: Deadline = None) -> dict:
         """Run a single task using Playwright for browser automation."""
+        deadline = deadline or self.new_deadline()
         task_id = task['task_id']
         description = task['task_description']
-        start_url = self.resolve_url(task['start_url'])
+        start_url = task['start_url']
         
         logger.info(f"Running task {task_id}: {description}")
         logger.info(f"Start URL: {start_url}")
@@ -267,20 +499,36 @@ class PrestaShopTester:
             'task_id': task_id,
             'description': description,
             'success': False,
-            'error': None
+            'error': None,
+            'steps_ok': 0,
+            'stopped_reason': None,
+            'timeout': None
         }
+        monitor = self.new_trajectory_monitor()
+        instruction = description
         
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            page = await browser.new_page()
+            # Leaving async_playwright() kills the driver and any browser it launched
+            try:
+                browser, page = await deadline.run('navigation', self.new_browser_page(p))
+            except TaskTimeout as e:
+                self.record_timeout(result, e)
+                return result
+            
+            # Translate agent actions to page.mouse/page.keyboard (agent coordinates are in screen space)
+            viewport = page.viewport_size or {'width': 1280, 'height': 720}
+            agent_width, agent_height = self.agent_screen_size or (viewport['width'], viewport['height'])
+            executor = PlaywrightActionExecutor(
+                page, scale=(viewport['width'] / agent_width, viewport['height'] / agent_height)
+            )
             
             try:
                 # Navigate to start URL
-                await page.goto(start_url)
-                await page.wait_for_load_state('networkidle')
+                await deadline.run('navigation', page.goto(start_url))
+                await deadline.run('navigation', page.wait_for_load_state('networkidle'))
                 
                 # Take screenshot for agent
-                screenshot_bytes = await page.screenshot()
+                screenshot_bytes = await deadline.run('settle', page.screenshot())
                 
                 obs = {"screenshot": screenshot_bytes}
                 
@@ -289,47 +537,68 @@ class PrestaShopTester:
                 max_steps = len(steps_value) if isinstance(steps_value, list) else int(steps_value)
                 for step in range(max_steps):
                     logger.info(f"Step {step + 1}/{max_steps}")
+                    step_start = time.time()
+                    deadline.check('predict')
                     
-                    # Rate limiting
-                    if RATE_LIMIT_CONFIG.get('enabled', False):
-                        delay = RATE_LIMIT_CONFIG.get('delay_between_requests', 13)
-                        logger.info(f"Rate limit: waiting {delay}s before API call...")
-                        await asyncio.sleep(delay)
-                    
-                    # Get action from agent
-                    info, code = agent.predict(instruction=description, observation=obs)
+                    # Get action from agent (rate limited)
+                    predict_start = time.time()
+                    info, code = await self.predict_async(agent, instruction, obs, step=step + 1, deadline=deadline)
+                    if self.trajectory:
+                        self.trajectory.append(task_id, step + 1, screenshot_bytes, code[0], info, url=page.url,
+                                               instruction=instruction, predict_duration=time.time() - predict_start)
                     
                     if "done" in code[0].lower() or "fail" in code[0].lower():
                         logger.info(f"Agent completed task: {code[0]}")
+                        if "done" in code[0].lower():
+                            result['steps_ok'] += 1
+                        self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], code[0])
                         break
                     
                     if "next" in code[0].lower():
+                        self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'next')
                         continue
                     
-                    # Execute the action code
+                    # Loop/stall detection: hint the agent or cut the task; only a repeated no-op action is skipped
+                    verdict = monitor.observe(screen_fingerprint(screenshot_bytes), page.url, code[0]) if monitor else None
+                    if verdict is not None:
+                        self.event_log.emit('monitor', task_id, step + 1, action=code[0], outcome=verdict.action,
+                                            kind=verdict.kind, reason=verdict.reason)
+                        if verdict.action == 'terminate':
+                            result['stopped_reason'] = verdict.reason
+                            break
+                        instruction = with_hint(description, verdict.hint)
+                        if verdict.kind == 'repeat':
+                            self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'skipped')
+                            continue
+                    
+                    # Execute the action natively on the page (exec fallback for untranslatable code)
                     try:
-                        exec(code[0])
+                        await deadline.run('action', executor.run_code(code[0]))
+                        result['steps_ok'] += 1
+                    except TaskTimeout:
+                        raise
                     except Exception as e:
                         logger.error(f"Error executing action: {e}")
                     
                     # Wait for page to update
                     await asyncio.sleep(1)
-                    await page.wait_for_load_state('networkidle')
+                    await deadline.run('settle', page.wait_for_load_state('networkidle'))
                     
                     # Take new screenshot
-                    screenshot_bytes = await page.screenshot()
+                    screenshot_bytes = await deadline.run('settle', page.screenshot())
                     obs = {"screenshot": screenshot_bytes}
+                    self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0])
                 
                 # Evaluate the result
                 eval_block = task['eval']
                 for eval_type in eval_block['eval_type']:
                     if eval_type == 'dom_match':
                         dom_conf = eval_block['dom_match']
-                        extractor = dom_conf['dom_extractor']
+                        extractor = extractor_js(dom_conf)
                         expected = dom_conf['match_value']
                         match_type = dom_conf['match_type']
                         
-                        actual = await page.evaluate(extractor)
+                        actual = await deadline.run('evaluation', page.evaluate(extractor))
                         
                         if match_type == 'contains':
                             result['success'] = expected in str(actual)
@@ -348,23 +617,38 @@ class PrestaShopTester:
                         elif match_type == 'exact':
                             result['success'] = expected == current_url
                 
+            except TaskTimeout as e:
+                self.record_timeout(result, e)
+            
             except Exception as e:
                 result['error'] = str(e)
                 logger.error(f"Error running task: {e}")
             
             finally:
-                await browser.close()
+                try:
+                    await asyncio.wait_for(browser.close(), 10)
+                except Exception as e:
+                    logger.warning(f"Browser did not close cleanly: {e}")
         
         return result
     
     def run_task_with_pyautogui(self, task: dict, agent) -> dict:
         """Run a single task using PyAutoGUI for screen automation with WebAppEval evaluation."""
+        result, last_agent_info = self.run_agent_with_pyautogui(task, agent)
+        if result['error'] is None:
+            self.evaluate_pyautogui_result(task, result, last_agent_info)
+        return result
+    
+    def run_agent_with_pyautogui(self, task: dict, agent, deadline: Deadline = None):
+        """Agent stage of the PyAutoGUI mode. Returns (result, last agent info) for evaluation."""
+        deadline = deadline or self.new_deadline()
         task_id = task['task_id']
         description = task['task_description']
-        start_url = self.resolve_url(task['start_url'])
+        start_url = task['start_url']
         
         logger.info(f"Running task {task_id}: {description}")
-        logger.info(f"Please manually navigate to: {start_url}")
+        if not self.display_browser:
+            logger.info(f"Please manually navigate to: {start_url}")
         
         result = {
             'task_id': task_id,
@@ -373,36 +657,44 @@ class PrestaShopTester:
             'agent_done': False,
             'webappeval_result': None,
             'agent_answer': None,
+            'answer_rule': None,
             'error': None,
             'steps_used': 0,
-            'max_steps': 0
+            'steps_ok': 0,
+            'max_steps': 0,
+            'stopped_reason': None,
+            'timeout': None
         }
-        
-        # Wait for user to open browser
-        input("Press Enter when browser is open and navigated to the start URL...")
-        print("[INFO] Waiting 3 seconds for you to switch to the browser window...")
-        time.sleep(3)
+        monitor = self.new_trajectory_monitor()
+        instruction = description
         
         last_agent_info = None
         
         try:
+            if self.display_browser:
+                # Worker on its own virtual display: open a fresh browser window at the start URL
+                deadline.call('navigation', self.display_browser.open, start_url)
+            else:
+                # Wait for user to open browser
+                input("Press Enter when browser is open and navigated to the start URL...")
+                print("[INFO] Waiting 3 seconds for you to switch to the browser window...")
+                time.sleep(3)
+                deadline = self.new_deadline()  # the manual setup doesn't count towards the task
+            
             steps_value = task.get('steps', 10)
             max_steps = len(steps_value) if isinstance(steps_value, list) else int(steps_value)
             result['max_steps'] = max_steps
             
             for step in range(max_steps):
+                deadline.check('predict')
                 result['steps_used'] = step + 1
                 logger.info(f"Step {step + 1}/{max_steps}")
-                
-                # Rate limiting
-                if RATE_LIMIT_CONFIG.get('enabled', False):
-                    delay = RATE_LIMIT_CONFIG.get('delay_between_requests', 13)
-                    logger.info(f"Rate limit: waiting {delay}s before API call...")
-                    time.sleep(delay)
+                step_start = time.time()
                 
                 # Take screenshot
                 screenshot = pyautogui.screenshot()
-                screenshot = screenshot.resize((1920, 1080), Image.LANCZOS)
+                if screenshot.size != self.grounding_size:
+                    screenshot = screenshot.resize(self.grounding_size, Image.LANCZOS)
                 
                 buffered = io.BytesIO()
                 screenshot.save(buffered, format="PNG")
@@ -411,38 +703,90 @@ class PrestaShopTester:
                 obs = {"screenshot": screenshot_bytes}
                 
                 # Get action from agent
-                info, code = agent.predict(instruction=description, observation=obs)
+                predict_start = time.time()
+                info, code = self.predict(agent, instruction, obs, step=step + 1, deadline=deadline)
+                predict_duration = time.time() - predict_start
                 last_agent_info = info  # Save for extraction
+                if self.trajectory:
+                    self.trajectory.append(task_id, step + 1, screenshot_bytes, code[0], info,
+                                           instruction=instruction, predict_duration=predict_duration)
                 
                 if "done" in code[0].lower():
                     logger.info("Agent reported task as done")
                     result['agent_done'] = True
+                    result['steps_ok'] += 1
+                    self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'done',
+                                        predict_duration=predict_duration)
                     break
                 
                 if "fail" in code[0].lower():
                     logger.info("Agent reported task as failed")
                     result['agent_done'] = False
+                    self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'fail',
+                                        predict_duration=predict_duration)
                     break
                 
                 if "next" in code[0].lower():
+                    self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'next',
+                                        predict_duration=predict_duration)
                     continue
                 
+                # Loop/stall detection: hint the agent or cut the task; only a repeated no-op action is skipped
+                verdict = monitor.observe(screen_fingerprint(screenshot_bytes), None, code[0]) if monitor else None
+                if verdict is not None:
+                    self.event_log.emit('monitor', task_id, step + 1, action=code[0], outcome=verdict.action,
+                                        kind=verdict.kind, reason=verdict.reason)
+                    if verdict.action == 'terminate':
+                        result['stopped_reason'] = verdict.reason
+                        break
+                    instruction = with_hint(description, verdict.hint)
+                    if verdict.kind == 'repeat':
+                        self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], 'skipped',
+                                            predict_duration=predict_duration)
+                        continue
+                
                 # Execute the action
+                action_error = None
                 try:
                     logger.info(f"Executing: {code[0][:100]}...")
-                    exec(code[0])
+                    run_compiled(code[0])
+                    result['steps_ok'] += 1
                 except Exception as e:
+                    action_error = str(e)
                     logger.error(f"Error executing action: {e}")
                 
                 time.sleep(1)
-            
+                self.event_log.emit('step', task_id, step + 1, time.time() - step_start, code[0], action_error,
+                                    predict_duration=predict_duration)
+        
+        except TaskTimeout as e:
+            self.record_timeout(result, e)
+        
+        except Exception as e:
+            result['error'] = str(e)
+            logger.error(f"Error running task: {e}")
+        
+        finally:
+            if self.display_browser:
+                self.display_browser.close()
+        
+        return result, last_agent_info
+    
+    def evaluate_pyautogui_result(self, task: dict, result: dict, last_agent_info: dict, deadline: Deadline = None):
+        """Evaluation stage of the PyAutoGUI mode: answer extraction and WebAppEval checks (updates result)."""
+        deadline = deadline or self.new_deadline(include_task=False)
+        task_id = task['task_id']
+        description = task['task_description']
+        try:
             # --- WebAppEval Evaluation ---
             logger.info("[WebAppEval] Starting automatic evaluation...")
+            eval_start = time.time()
             
             # Extract agent's answer from its reasoning
-            agent_answer = self.extract_agent_answer(last_agent_info)
+            agent_answer, answer_rule = extract_answer(last_agent_info)
             result['agent_answer'] = agent_answer
-            logger.info(f"[WebAppEval] Extracted agent answer: {agent_answer[:100] if agent_answer else 'None'}...")
+            result['answer_rule'] = answer_rule
+            logger.info(f"[WebAppEval] Extracted agent answer ({answer_rule}): {agent_answer[:100] if agent_answer else 'None'}")
             
             # Run WebAppEval evaluation
             eval_block = task.get('eval', {})
@@ -451,7 +795,8 @@ class PrestaShopTester:
             if 'string_match' in eval_types:
                 # For string_match tasks, use the handler directly
                 from evaluate.handlers import string_match
-                webappeval_success = string_match(
+                webappeval_success = deadline.call(
+                    'evaluation', string_match,
                     target_conf=eval_block.get('string_match', {}),
                     agent_result=agent_answer,
                     task=description
@@ -463,7 +808,7 @@ class PrestaShopTester:
                 # For DOM/URL match, we need browser access
                 # Run async evaluation
                 webappeval_success = asyncio.run(
-                    self.evaluate_with_webappeval(task, agent_answer)
+                    deadline.run('evaluation', self.evaluate_with_webappeval(task, agent_answer))
                 )
                 result['webappeval_result'] = webappeval_success
                 logger.info(f"[WebAppEval] DOM/URL evaluation: {'PASS' if webappeval_success else 'FAIL'}")
@@ -475,34 +820,364 @@ class PrestaShopTester:
             
             # Final success = WebAppEval result (not just agent's claim)
             result['success'] = result['webappeval_result'] if result['webappeval_result'] is not None else result['agent_done']
+            self.event_log.emit('eval', task_id, duration=time.time() - eval_start,
+                                outcome='PASS' if result['webappeval_result'] else 'FAIL', eval_types=eval_types)
             
             logger.info(f"[WebAppEval] Final result - Agent done: {result['agent_done']}, WebAppEval: {result['webappeval_result']}, Success: {result['success']}")
         
+        except TaskTimeout as e:
+            result['webappeval_result'] = False
+            self.record_timeout(result, e)
+        
         except Exception as e:
             result['error'] = str(e)
-            logger.error(f"Error running task: {e}")
+            logger.error(f"Error evaluating task: {e}")
         
         return result
     
+    def run_agent_stage(self, task: dict, agent, mode='pyautogui', trial: int = None):
+        """Reset agent and shop state and run the agent on one task.
+        
+        Returns (result, evaluate, task_start); `evaluate` is a callable that completes
+        result in place, or None when the mode already evaluated on the live page.
+        Operation tasks hold an exclusive environment shard until finish_task().
+        """
+        lease_key = (task['task_id'], trial)
+        # A timed-out predict of the previous task may still be writing to this agent's history
+        if not self.wait_for_agent(agent):
+            error = "agent still busy with a timed-out predict"
+            logger.error(f"[Deadline] Task {task['task_id']} not started: {error}")
+            return {'task_id': task['task_id'], 'description': task['task_description'], 'success': False,
+                    'error': error}, None, time.time()
+        self.current_task_id = task['task_id']
+        # Reset agent state before each task to clear trajectory memory
+        agent.reset()
+        self.instrument_agent(agent)  # reset() may rebuild the planner's engines
+        
+        # Deferred evaluations that read the shop must finish before this task changes it
+        if self.pipeline and self.env_reset.needs_reset(task):
+            self.pipeline.wait_live_state()
+        
+        # Operation tasks get a shard (and, when it is reset, its whole instance) to themselves,
+        # read-only tasks share one
+        env_reset = self.env_reset
+        if self.env_reset.needs_reset(task):
+            try:
+                lease = self.env_pool.lease(task['task_id'], timeout=ENV_POOL_CONFIG.get('lease_timeout'), reset=True)
+            except TimeoutError as e:
+                logger.error(f"[EnvPool] {e}")
+                return {'task_id': task['task_id'], 'description': task['task_description'], 'success': False,
+                        'error': str(e)}, None, time.time()
+            try:
+                env_reset = self.env_pool.reset_backend(lease.shard)
+            except ValueError as e:
+                lease.release()
+                logger.error(f"[EnvPool] Task {task['task_id']} not started: {e}")
+                return {'task_id': task['task_id'], 'description': task['task_description'], 'success': False,
+                        'error': str(e)}, None, time.time()
+            self.shard_leases[lease_key] = lease
+            shard = lease.shard
+        else:
+            shard = self.env_pool.shared()
+        task = self.env_pool.task_for(shard, task)
+        
+        try:
+            # Restore shop state before operation tasks
+            reset_seconds = env_reset.reset_for_task(task)
+        except BaseException:
+            self.release_shard(lease_key)
+            raise
+        if reset_seconds:
+            self.event_log.emit('reset', task['task_id'], duration=reset_seconds, action=env_reset.name)
+        self.event_log.emit('task_start', task['task_id'], eval_types=task.get('eval', {}).get('eval_type', []),
+                            shard=shard.index)
+        task_start = time.time()
+        deadline = self.new_deadline()
+        
+        try:
+            if mode == 'playwright':
+                # Playwright mode evaluates on the live page inside the agent stage
+                return asyncio.run(self.run_task_with_playwright(task, agent, deadline)), None, task_start
+            result, last_agent_info = self.run_agent_with_pyautogui(task, agent, deadline)
+        except BaseException:
+            self.release_shard(lease_key)
+            raise
+        if result['error'] is not None:
+            return result, None, task_start
+        
+        def evaluate():
+            # Runs on an evaluation worker when pipelined; semantic judging counts towards this task
+            with self.usage_scope(task['task_id']):
+                self.evaluate_pyautogui_result(task, result, last_agent_info)
+        
+        return result, evaluate, task_start
+    
+    def release_shard(self, lease_key):
+        lease = self.shard_leases.pop(lease_key, None)
+        if lease:
+            lease.release()
+    
+    def snapshot_environments(self):
+        self.env_pool.snapshot()  # includes the global reset backend when it applies
+    
+    def finish_task(self, task: dict, result: dict, task_start: float):
+        """Record an evaluated result (incremental file, events, run planner) and free its shard."""
+        self.release_shard((result['task_id'], result.get('trial')))
+        if self.usage_meter:
+            result['usage'] = self.usage_meter.pop_task(result['task_id'])
+        self.results.append(result)
+        
+        # Save result incrementally to file
+        self.save_incremental_result(result)
+        
+        status = "⏱ TIMEOUT" if result.get('timeout') else "✅ PASS" if result['success'] else "❌ FAIL"
+        logger.info(f"Task {result['task_id']}: {status}")
+        self.event_log.emit('task_end', result['task_id'], duration=time.time() - task_start,
+                            outcome='TIMEOUT' if result.get('timeout') else 'PASS' if result['success'] else 'FAIL',
+                            steps_used=result.get('steps_used', 0), error=result.get('error'),
+                            stopped_reason=result.get('stopped_reason'),
+                            total_tokens=result.get('usage', {}).get('total_tokens'))
+        if self.run_planner:
+            self.run_planner.record(task, result)
+            self.run_planner.save()
+    
+    def run_one_task(self, task: dict, agent, mode='pyautogui') -> dict:
+        """Run and evaluate one task inline and record its result."""
+        result, evaluate, task_start = self.run_agent_stage(task, agent, mode)
+        if evaluate:
+            evaluate()
+        self.finish_task(task, result, task_start)
+        return result
+    
+    def warm_up_environments(self) -> dict:
+        """Wait for every shop instance to be fully ready and warm the suite's URLs (see environments/warmup.py)."""
+        start = time.time()
+        environments = {}
+        for shard in self.env_pool.shards:
+            # Account shards on the same instance share one warm-up
+            urls = tuple(sorted(conf.get('url', '') for conf in shard.env.values()))
+            if urls not in environments:
+                environments[urls] = (shard.name, shard.env, [self.env_pool.task_for(shard, t) for t in self.tasks])
+        self.warmup_report = warm_up(
+            list(environments.values()),
+            maildev_url=WARMUP_CONFIG.get('maildev_url'),
+            ready_timeout=WARMUP_CONFIG.get('ready_timeout', 300),
+            passes=WARMUP_CONFIG.get('passes', 2),
+            max_workers=WARMUP_CONFIG.get('max_workers', 16),
+        )
+        for name, summary in self.warmup_report.items():
+            self.event_log.emit('warmup', duration=summary['seconds'], outcome='FAIL' if summary['failed'] else 'OK',
+                                environment=name, urls=summary['urls'], ready=summary['ready'],
+                                cold=summary['cold'], warm=summary['warm'], failed=summary['failed'])
+        logger.info(f"[Warmup] Environments ready and warm in {time.time() - start:.1f}s")
+        return self.warmup_report
+    
+    def environments_ready(self) -> bool:
+        """Readiness + warm-up once per run (WARMUP_CONFIG); False if the suite should not start."""
+        if not WARMUP_CONFIG.get('enabled', True) or self.warmup_report is not None:
+            return True
+        try:
+            self.warm_up_environments()
+        except TimeoutError as e:
+            logger.error(f"[Warmup] {e}")
+            return not WARMUP_CONFIG.get('abort_if_not_ready', True)
+        return True
+    
+    def run_trial(self, task: dict, agent, mode: str, trial: int) -> dict:
+        """One isolated trial of a task: own agent, own browser, own shard for operation tasks."""
+        result, evaluate, _ = self.run_agent_stage(task, agent, mode, trial=trial)
+        try:
+            if evaluate:
+                evaluate()
+        finally:
+            self.release_shard((task['task_id'], trial))
+        result['trial'] = trial
+        return result
+    
+    def run_task_trials(self, task: dict, agents: list, mode='pyautogui') -> dict:
+        """Repeat a task until its pass rate is clearly above/below the threshold (see evaluate/trials.py)."""
+        concurrency = len(agents) if mode == 'playwright' else 1  # pyautogui drives the one real screen
+        policy = SequentialTrials(
+            threshold=TRIALS_CONFIG.get('threshold', 0.5),
+            confidence=TRIALS_CONFIG.get('confidence', 0.9),
+            min_trials=TRIALS_CONFIG.get('min_trials', 3),
+            max_trials=TRIALS_CONFIG.get('max_trials', 10),
+            concurrency=concurrency,
+        )
+        task_start = time.time()
+        trial_results = []
+        outcomes = []
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='trial') as pool:
+            while policy.decision(outcomes) is None:
+                batch = policy.next_batch(len(outcomes))
+                futures = [pool.submit(self.run_trial, task, agents[i], mode, len(outcomes) + i + 1)
+                           for i in range(batch)]
+                for future in futures:
+                    trial_result = future.result()
+                    trial_results.append(trial_result)
+                    outcomes.append(bool(trial_result['success']))
+                logger.info(f"[Trials] Task {task['task_id']}: {sum(outcomes)}/{len(outcomes)} passed")
+        
+        summary = policy.summarize(outcomes)
+        logger.info(f"[Trials] Task {task['task_id']}: {summary['decision']} after {summary['trials']} trials, "
+                    f"pass rate {summary['pass_rate']:.2f} {summary['interval']}")
+        result = {
+            'task_id': task['task_id'],
+            'description': task['task_description'],
+            'success': summary['decision'] == 'pass' or (summary['decision'] == 'undecided'
+                                                          and summary['pass_rate'] >= policy.threshold),
+            'agent_done': any(r.get('agent_done') for r in trial_results),
+            'webappeval_result': None,
+            'error': None,
+            'steps_used': sum(r.get('steps_used', 0) for r in trial_results),
+            'steps_ok': sum(r.get('steps_ok', 0) for r in trial_results),
+            'max_steps': sum(r.get('max_steps', 0) for r in trial_results),
+            'stopped_reason': None,
+            **summary,
+            'trial_results': [{k: r.get(k) for k in ('trial', 'success', 'steps_used', 'error', 'timeout')}
+                              for r in trial_results],
+        }
+        self.finish_task(task, result, task_start)
+        return result
+    
+    def run_plan(self) -> dict:
+        """{task_id: reason} from the run planner, computed once per run ({} without a planner)."""
+        if self._plan is None:
+            self._plan = self.run_planner.plan(self.tasks) if self.run_planner else {}
+        return self._plan
+    
+    def scheduled_tasks(self) -> list:
+        """Tasks that must run; the others reuse their cached result."""
+        plan = self.run_plan()
+        return [t for t in self.tasks if plan.get(t['task_id']) != 'cached']
+    
     def run_all_tasks(self, agent, mode='pyautogui'):
         """Run all tasks and collect results."""
-        for task in self.tasks:
-            # Reset agent state before each task to clear trajectory memory
-            agent.reset()
-            
-            if mode == 'playwright':
-                result = asyncio.run(self.run_task_with_playwright(task, agent))
-            else:
-                result = self.run_task_with_pyautogui(task, agent)
-            
-            self.results.append(result)
+        self.snapshot_environments()
+        
+        # Differential run: reuse cached results of unchanged, passing tasks (see evaluate/run_planner.py)
+        plan = self.run_plan()
+        
+        # Staged mode: evaluation runs on its own pool while the agent moves on (see evaluate/pipeline.py)
+        if PIPELINE_CONFIG.get('enabled', False):
+            self.pipeline = EvaluationPipeline(
+                evaluate=lambda job: job[2] and job[2](),
+                on_result=lambda job: self.finish_task(job[0], job[1], job[3]),
+                workers=PIPELINE_CONFIG.get('eval_workers', 2),
+                max_pending=PIPELINE_CONFIG.get('max_pending', 4),
+            )
+        
+        try:
+            for task in self.tasks:
+                if plan.get(task['task_id']) == 'cached':
+                    result = self.run_planner.cached_result(task)
+                    self.results.append(result)
+                    self.save_incremental_result(result)
+                    self.event_log.emit('task_end', task['task_id'], outcome='PASS' if result['success'] else 'FAIL',
+                                        cached=True)
+                    continue
+                if TRIALS_CONFIG.get('enabled', False):
+                    self.run_task_trials(task, [agent] + self.trial_agents, mode)
+                    continue
+                if self.pipeline is None:
+                    self.run_one_task(task, agent, mode)
+                    continue
+                result, evaluate, task_start = self.run_agent_stage(task, agent, mode)
+                reads_live_shop = evaluate is not None and needs_live_state(task)
+                self.pipeline.submit((task, result, evaluate, task_start), live_state=reads_live_shop)
+        finally:
+            if self.pipeline:
+                self.pipeline.close()
+                self.pipeline = None
+                # Evaluations complete out of order; report in task order
+                order = {t['task_id']: i for i, t in enumerate(self.tasks)}
+                self.results.sort(key=lambda r: order.get(r['task_id'], len(order)))
+        
+        if self.grounding_cache:
+            self.grounding_cache.save()
+        
+        return self.results
+    
+    def run_coordinator(self, queue, run_id: str, wait: bool = True, poll_interval: float = 10):
+        """Enqueue the scheduled tasks; optionally wait for workers and collect their results.
+        
+        With a run planner, only tasks that must run are enqueued; collected results
+        are recorded to the planner here (workers never touch its cache) and merged
+        with the cached ones in task order.
+        """
+        scheduled = self.scheduled_tasks()
+        added = queue.enqueue(run_id, [t['task_id'] for t in scheduled])
+        logger.info(f"[Queue] Enqueued {added} new tasks for run {run_id} ({len(scheduled)} scheduled, "
+                    f"{len(self.tasks)} in run)")
+        if not wait:
+            return []
+        
+        last_counts = None
+        while not queue.finished(run_id):
+            counts = queue.counts(run_id)
+            if counts != last_counts:
+                logger.info(f"[Queue] Run {run_id}: {counts}")
+                last_counts = counts
+            time.sleep(poll_interval)
+        
+        # Tasks given up on after expired leases only carry task_id/success/error
+        tasks_by_id = {str(t['task_id']): t for t in self.tasks}
+        collected = queue.results(run_id)
+        for result in collected:
+            task = tasks_by_id.get(str(result['task_id']))
+            result.setdefault('description', task['task_description'] if task else '')
+            if self.run_planner and task:
+                self.run_planner.record(task, result)
+        if self.run_planner:
+            self.run_planner.save()
+        
+        scheduled_ids = {str(t['task_id']) for t in scheduled}
+        cached = [self.run_planner.cached_result(t) for t in self.tasks if str(t['task_id']) not in scheduled_ids]
+        order = {task_id: i for i, task_id in enumerate(tasks_by_id)}
+        self.results = sorted(cached + collected, key=lambda r: order.get(str(r['task_id']), len(order)))
+        logger.info(f"[Queue] Run {run_id} finished: {queue.counts(run_id)}")
+        return self.results
+    
+    def run_worker(self, agent, queue, run_id: str, mode='pyautogui', worker_id: str = None,
+                   heartbeat_interval: float = 30, idle_timeout: float = 60):
+        """Lease tasks of a run until the queue is drained (or idle for idle_timeout seconds)."""
+        worker_id = worker_id or default_worker_id()
+        tasks_by_id = {t['task_id']: t for t in self.tasks}
+        self.snapshot_environments()
+        logger.info(f"[Queue] Worker {worker_id} joined run {run_id}")
+        
+        idle_since = None
+        while True:
+            task_id = queue.lease(run_id, worker_id)
+            if task_id is None:
+                if queue.finished(run_id):
+                    break
+                # Other workers hold the remaining leases; wait in case one expires
+                idle_since = idle_since or time.time()
+                if time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(min(heartbeat_interval, 5))
+                continue
+            idle_since = None
             
-            # Save result incrementally to file
-            self.save_incremental_result(result)
+            task = tasks_by_id.get(task_id)
+            if task is None:
+                logger.error(f"[Queue] Task {task_id} is not in this worker's task file")
+                queue.complete(run_id, task_id, worker_id,
+                               {'task_id': task_id, 'success': False, 'error': 'task not found on worker'})
+                continue
             
-            status = "✅ PASS" if result['success'] else "❌ FAIL"
-            logger.info(f"Task {result['task_id']}: {status}")
+            try:
+                with Heartbeat(queue, run_id, task_id, worker_id, interval=heartbeat_interval):
+                    result = self.run_one_task(task, agent, mode)
+            except BaseException:
+                queue.release(run_id, task_id, worker_id)
+                raise
+            queue.complete(run_id, task_id, worker_id, result)
         
+        if self.grounding_cache:
+            self.grounding_cache.save()
+        logger.info(f"[Queue] Worker {worker_id} done: ran {len(self.results)} tasks")
         return self.results
     
     def print_summary(self):
@@ -515,34 +1190,23 @@ class PrestaShopTester:
         total = len(self.results)
         
         for result in self.results:
-            status = "✅ PASS" if result['success'] else "❌ FAIL"
+            status = "⏱ TIMEOUT" if result.get('timeout') else "✅ PASS" if result['success'] else "❌ FAIL"
             print(f"{status} | {result['task_id']}: {result['description'][:50]}...")
             if result['error']:
                 print(f"       Error: {result['error']}")
         
         print("=" * 60)
         print(f"Total: {passed}/{total} tasks passed ({100*passed/total:.1f}%)")
+        if self.usage_meter:
+            usage = summarize_usage(self.results)
+            print(f"Tokens: {usage['total_tokens']} ({usage['prompt_tokens']} prompt + "
+                  f"{usage['completion_tokens']} completion) in {usage['calls']} calls, "
+                  f"{usage['payload_bytes'] / 1e6:.1f} MB sent, cost {usage['cost']:.4f}")
         print("=" * 60)
     
     def calculate_metrics(self):
         """Calculate TSR (Task Success Rate) and SCR (Step Completion Rate)."""
-        total_tasks = len(self.results)
-        passed_tasks = sum(1 for r in self.results if r['success'])
-        
-        total_steps_used = sum(r.get('steps_used', 0) for r in self.results)
-        total_max_steps = sum(r.get('max_steps', 0) for r in self.results)
-        
-        tsr = (passed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        scr = (total_steps_used / total_max_steps * 100) if total_max_steps > 0 else 0
-        
-        return {
-            'tsr': tsr,
-            'scr': scr,
-            'passed': passed_tasks,
-            'total': total_tasks,
-            'total_steps_used': total_steps_used,
-            'total_max_steps': total_max_steps
-        }
+        return compute_metrics(self.results)
     
     def generate_report(self, engine_params: dict, grounding_params: dict, output_path: str = "evaluation_report.md"):
         """Generate markdown evaluation report."""
@@ -569,6 +1233,20 @@ class PrestaShopTester:
         report.append(f"- **Resolution:** {grounding_params.get('grounding_width', 1920)}x{grounding_params.get('grounding_height', 1080)}")
         report.append("")
         
+        # Readiness and warm-up before the suite (see environments/warmup.py)
+        if self.warmup_report:
+            report.append("## Environment Warm-up")
+            report.append("")
+            report.append("| Environment | Ready after | URLs | Cold median/max | Warm median/max | Failed |")
+            report.append("|-------------|-------------|------|-----------------|-----------------|--------|")
+            for name, summary in self.warmup_report.items():
+                ready = ", ".join(f"{service} {seconds:.1f}s" for service, seconds in summary['ready'].items())
+                cold, warm = summary['cold'], summary['warm']
+                report.append(f"| {name} | {ready} | {summary['urls']} | "
+                              f"{cold.get('median', 0):.2f}s / {cold.get('max', 0):.2f}s | "
+                              f"{warm.get('median', 0):.2f}s / {warm.get('max', 0):.2f}s | {len(summary['failed'])} |")
+            report.append("")
+        
         # Metrics section
         report.append("## Evaluation Metrics")
         report.append("")
@@ -576,6 +1254,10 @@ class PrestaShopTester:
         report.append("|--------|-------|-------------|")
         report.append(f"| **TSR (Task Success Rate)** | {metrics['tsr']:.1f}% | {metrics['passed']}/{metrics['total']} tasks passed |")
         report.append(f"| **SCR (Step Completion Rate)** | {metrics['scr']:.1f}% | {metrics['total_steps_used']}/{metrics['total_max_steps']} steps used |")
+        timeouts = [r for r in self.results if r.get('timeout')]
+        if timeouts:
+            phases = ", ".join(sorted({r['timeout'] for r in timeouts}))
+            report.append(f"| **Timeouts** | {len(timeouts)} | tasks stopped by a deadline ({phases}) |")
         report.append("")
         
         # Results table
@@ -589,13 +1271,68 @@ class PrestaShopTester:
         for i, result in enumerate(self.results, 1):
             agent_done = "✅" if result.get('agent_done', False) else "❌"
             webappeval = "✅" if result.get('webappeval_result') else "❌" if result.get('webappeval_result') is False else "N/A"
-            final_status = "✅ PASS" if result['success'] else "❌ FAIL"
+            final_status = "⏱ TIMEOUT" if result.get('timeout') else "✅ PASS" if result['success'] else "❌ FAIL"
             desc = result['description'][:45] + "..." if len(result['description']) > 45 else result['description']
             steps = f"{result.get('steps_used', 0)}/{result.get('max_steps', 0)}"
             report.append(f"| {i} | {result['task_id']} | {desc} | {agent_done} | {webappeval} | {final_status} | {steps} |")
         
         report.append("")
         
+        # Pass-rate estimates from repeated trials (see evaluate/trials.py)
+        trial_tasks = [r for r in self.results if r.get('trials')]
+        if trial_tasks:
+            total_trials = sum(r['trials'] for r in trial_tasks)
+            report.append("## Pass-Rate Estimates")
+            report.append("")
+            report.append(f"{total_trials} trials in total ({total_trials / len(trial_tasks):.1f} per task, at most "
+                          f"{TRIALS_CONFIG.get('max_trials', 10)}); intervals are Wilson "
+                          f"{TRIALS_CONFIG.get('confidence', 0.9):.0%} bounds against a pass threshold of "
+                          f"{TRIALS_CONFIG.get('threshold', 0.5):.0%}.")
+            report.append("")
+            report.append("| Task ID | Trials | Passes | Pass Rate | Interval | Decision |")
+            report.append("|---------|--------|--------|-----------|----------|----------|")
+            for result in trial_tasks:
+                low, high = result['interval']
+                report.append(f"| {result['task_id']} | {result['trials']} | {result['passes']} | "
+                              f"{result['pass_rate']:.0%} | {low:.0%}-{high:.0%} | {result['decision']} |")
+            report.append("")
+        
+        # Token usage and cost per task (see evaluate/usage.py)
+        if any(r.get('usage') for r in self.results):
+            usage = summarize_usage(self.results)
+            report.append("## Token Usage")
+            report.append("")
+            report.append(f"- **Calls:** {usage['calls']} ({usage['estimated_calls']} estimated)")
+            report.append(f"- **Tokens:** {usage['total_tokens']} ({usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion)")
+            report.append(f"- **Payload:** {usage['payload_bytes'] / 1e6:.1f} MB, {usage['images']} images")
+            report.append(f"- **Cost:** {usage['cost']:.4f}")
+            report.append(f"- **By source:** " + ", ".join(
+                f"{source} {counts['total_tokens']} tokens/{counts['calls']} calls"
+                for source, counts in sorted(usage['by_source'].items())))
+            report.append("")
+            report.append("| Task ID | Calls | Tokens | Images | Payload (MB) | Cost | Successful Steps |")
+            report.append("|---------|-------|--------|--------|--------------|------|------------------|")
+            for result in self.results:
+                task_usage = result.get('usage')
+                if not task_usage:
+                    continue
+                cached = " (cached)" if result.get('cached') else ""
+                report.append(f"| {result['task_id']}{cached} | {task_usage['calls']} | {task_usage['total_tokens']} | "
+                              f"{task_usage['images']} | {task_usage['payload_bytes'] / 1e6:.2f} | "
+                              f"{task_usage['cost']:.4f} | {result.get('steps_ok', 0)}/{result.get('steps_used', 0)} |")
+            report.append("")
+            
+            anomalies = flag_cost_anomalies(self.results, factor=USAGE_CONFIG.get('anomaly_factor', 3.0))
+            if anomalies:
+                report.append("### Cost Anomalies")
+                report.append("")
+                for task_id, cost, median in anomalies:
+                    if cost == float('inf'):
+                        report.append(f"- **Task {task_id}:** spent tokens without a single successful step")
+                    else:
+                        report.append(f"- **Task {task_id}:** {cost:.1f} per successful step (run median {median:.1f})")
+                report.append("")
+        
         # Failed tasks details
         failed_tasks = [r for r in self.results if not r['success']]
         if failed_tasks:
@@ -606,6 +1343,8 @@ class PrestaShopTester:
                 report.append(f"- **Agent Done:** {'Yes' if result.get('agent_done') else 'No'}")
                 report.append(f"- **WebAppEval Result:** {'Pass' if result.get('webappeval_result') else 'Fail' if result.get('webappeval_result') is False else 'N/A'}")
                 report.append(f"- **Steps used:** {result.get('steps_used', 0)}/{result.get('max_steps', 0)}")
+                if result.get('stopped_reason'):
+                    report.append(f"- **Stopped early:** {result['stopped_reason']}")
                 if result.get('agent_answer'):
                     answer_preview = str(result.get('agent_answer'))[:100]
                     report.append(f"- **Agent Answer:** {answer_preview}...")
@@ -632,6 +1371,8 @@ def main():
         tasks_file = TEST_CONFIG.get('tasks_file', 'dataset/prestashop_tasks.json')
         mode = TEST_CONFIG.get('mode', 'pyautogui')
         task_id = TEST_CONFIG.get('task_id')
+        headless = TEST_CONFIG.get('headless', False)
+        queue_config = QUEUE_CONFIG
     else:
         parser = argparse.ArgumentParser(description='Test PrestaShop with Agent-S')
         
@@ -653,6 +1394,18 @@ def main():
         parser.add_argument('--mode', choices=['pyautogui', 'playwright'], default='pyautogui',
                            help='Automation mode')
         parser.add_argument('--task_id', help='Run specific task ID only')
+        parser.add_argument('--headless', action='store_true',
+                           help='Headless browser with viewport matched to the grounding resolution (playwright mode)')
+        
+        # Distributed runs (see evaluate/work_queue.py)
+        parser.add_argument('--queue_role', choices=['off', 'coordinator', 'worker'], default='off',
+                           help='Enqueue tasks (coordinator) or lease and run them (worker)')
+        parser.add_argument('--queue', default='work_queue.db', help='Queue SQLite path or http://host:port')
+        parser.add_argument('--run_id', default='default', help='Run shared by the coordinator and its workers')
+        parser.add_argument('--serve_port', type=int, help='Coordinator: serve the queue over HTTP on this port')
+        parser.add_argument('--serve_host', default='127.0.0.1',
+                           help='Coordinator: interface to serve on (other than loopback needs --queue_token)')
+        parser.add_argument('--queue_token', help='Shared token of the HTTP queue (default: $WORK_QUEUE_TOKEN)')
         
         # Config paths
         parser.add_argument('--env_config', default='env_config.json', help='Environment config path')
@@ -679,9 +1432,15 @@ def main():
         tasks_file = args.tasks
         mode = args.mode
         task_id = args.task_id
+        headless = args.headless
+        queue_config = {"role": args.queue_role, "queue": args.queue, "run_id": args.run_id,
+                        "serve_port": args.serve_port, "serve_host": args.serve_host, "token": args.queue_token}
+    
+    if headless and mode == 'pyautogui':
+        logger.warning("Headless mode only applies to playwright mode and evaluation browsers")
     
     # Initialize tester
-    tester = PrestaShopTester(env_config, tasks_file)
+    tester = PrestaShopTester(env_config, tasks_file, headless=headless)
     
     # Filter tasks if specific ID provided
     if task_id:
@@ -698,17 +1457,125 @@ def main():
     
     logger.info(f"Running {len(tester.tasks)} tasks with WebAppEval automatic evaluation")
     
-    # Setup agent
-    agent = tester.setup_agent(engine_params, grounding_params)
+    # Display workers spawned below inherit their role/queue through the environment
+    if os.environ.get('AGENT_QUEUE_ROLE'):
+        queue_config = dict(queue_config, role=os.environ['AGENT_QUEUE_ROLE'],
+                            queue=os.environ.get('AGENT_QUEUE', queue_config.get('queue', 'work_queue.db')),
+                            run_id=os.environ.get('AGENT_RUN_ID', queue_config.get('run_id')))
+    
+    # Differential runs: the coordinator (or single process) plans and owns run_cache.json;
+    # workers only run the tasks they lease
+    if DIFF_RUN_CONFIG.get('enabled', False) and queue_config.get('role', 'off') != 'worker':
+        tester.run_planner = RunPlanner(
+            DIFF_RUN_CONFIG.get('cache', 'run_cache.json'),
+            config=(engine_params, grounding_params, {'mode': mode}),
+            flaky_tasks=DIFF_RUN_CONFIG.get('flaky_tasks', ()),
+            rerun_failed=DIFF_RUN_CONFIG.get('rerun_failed', True),
+        )
+        if all(tester.run_planner.reason(t) == 'cached' for t in tester.tasks):
+            logger.info("[Planner] Nothing changed since the last run; reusing all cached results")
+            tester.results = [tester.run_planner.cached_result(t) for t in tester.tasks]
+            tester.print_summary()
+            tester.generate_report(engine_params, grounding_params)
+            return
+    
+    # Parallel pyautogui mode: one Xvfb display + browser per worker process, fed from a local queue
+    display_workers = DISPLAY_WORKERS_CONFIG.get('workers', 0) if mode == 'pyautogui' else 0
+    spawned_workers = []
+    if display_workers and queue_config.get('role', 'off') == 'off':
+        if not tester.environments_ready():
+            return
+        run_id = f"display_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        queue_config = dict(queue_config, role='coordinator', run_id=run_id, serve_port=None, wait=True,
+                            queue=DISPLAY_WORKERS_CONFIG.get('queue', 'work_queue.db'))
+        # Enqueue before the workers start so they find work immediately
+        open_queue(queue_config['queue']).enqueue(run_id, [t['task_id'] for t in tester.scheduled_tasks()])
+        spawned_workers = spawn_display_workers(
+            display_workers,
+            env={'AGENT_QUEUE_ROLE': 'worker', 'AGENT_QUEUE': os.path.abspath(queue_config['queue']),
+                 'AGENT_RUN_ID': run_id, 'AGENT_DISPLAY_WORKER': '1'},
+            first_display=DISPLAY_WORKERS_CONFIG.get('first_display', 99),
+            size=(grounding_params.get('grounding_width', 1920), grounding_params.get('grounding_height', 1080)),
+        )
+    if os.environ.get('AGENT_DISPLAY_WORKER'):
+        tester.display_browser = DisplayBrowser(
+            size=(grounding_params.get('grounding_width', 1920), grounding_params.get('grounding_height', 1080)),
+            executable=DISPLAY_WORKERS_CONFIG.get('browser'),
+            settle=DISPLAY_WORKERS_CONFIG.get('browser_settle', 2.0),
+        )
+    
+    # Distributed runs: the coordinator only enqueues and collects, workers lease tasks
+    queue_role = queue_config.get('role', 'off')
+    if queue_role != 'off':
+        queue = open_queue(queue_config.get('queue', 'work_queue.db'),
+                           lease_seconds=queue_config.get('lease_seconds', 600),
+                           max_attempts=queue_config.get('max_attempts', 2),
+                           token=queue_config.get('token'))
+        run_id = queue_config.get('run_id') or 'default'
+    tester.queue_role = queue_role
+    
+    if queue_role == 'coordinator':
+        if not tester.environments_ready():
+            stop_display_workers(spawned_workers)
+            return
+        server = None
+        if queue_config.get('serve_port'):
+            server = QueueServer(queue, host=queue_config.get('serve_host', '127.0.0.1'),
+                                 port=queue_config['serve_port'], token=queue_config.get('token')).start()
+        try:
+            tester.run_coordinator(queue, run_id, wait=queue_config.get('wait', True))
+        finally:
+            if server:
+                server.stop()
+            stop_display_workers(spawned_workers)
+        if tester.results:
+            tester.save_results(tester.results)
+            tester.print_summary()
+            tester.generate_report(engine_params, grounding_params)
+        return
+    
+    # Workers rely on their coordinator's warm-up; a fully cached run needs no environment
+    if queue_role == 'off' and not tester.environments_ready():
+        return
+    
+    # Setup agent (replay mode serves recorded responses and needs no model access)
+    replay_mode = REPLAY_CONFIG.get('mode', 'off')
+    replay_path = REPLAY_CONFIG.get('path', 'agent_recording.jsonl')
+    if replay_mode == 'replay':
+        tester.grounding_size = (
+            grounding_params.get('grounding_width', 1920),
+            grounding_params.get('grounding_height', 1080),
+        )
+        tester.agent_screen_size = tester.grounding_size
+        agent = ReplayAgent(replay_path)
+        logger.info(f"Replaying agent responses from {replay_path}")
+    else:
+        agent = tester.setup_agent(engine_params, grounding_params)
+        if replay_mode == 'record':
+            agent = RecordingAgent(agent, replay_path)
+            logger.info(f"Recording agent responses to {replay_path}")
+        elif TRIALS_CONFIG.get('enabled', False) and mode == 'playwright':
+            # Concurrent trials each need their own (stateful) agent
+            tester.trial_agents = [tester.setup_agent(engine_params, grounding_params)
+                                   for _ in range(TRIALS_CONFIG.get('concurrency', 2) - 1)]
     
     # Run tests
-    tester.run_all_tasks(agent, mode=mode)
+    if queue_role == 'worker':
+        tester.run_worker(agent, queue, run_id, mode=mode,
+                          heartbeat_interval=queue_config.get('heartbeat_interval', 30),
+                          idle_timeout=queue_config.get('idle_timeout', 60))
+    else:
+        tester.run_all_tasks(agent, mode=mode)
+    
+    if tester.trajectory:
+        tester.trajectory.close()
     
     # Print summary
     tester.print_summary()
     
-    # Generate evaluation report
-    tester.generate_report(engine_params, grounding_params)
+    # Generate evaluation report (a worker's results are reported by its coordinator)
+    if queue_role != 'worker':
+        tester.generate_report(engine_params, grounding_params)
 
 
 if __name__ == '__main__':
@@ -28,6 +28,7 @@ GROUNDING_CONFIG = {
 # =============================================================================
 TEST_CONFIG = {
     "mode": "pyautogui",  # Options: 'pyautogui', 'playwright'
+    "headless": False,    # Playwright: headless browser, viewport = grounding resolution (no per-step resize)
     "task_id": None,      # Set to specific task ID (e.g., "PS-1") or None for all tasks
     "max_tasks": 20,       # Test with 2 tasks only
     "env_config": "env_config.json",
@@ -39,6 +40,184 @@ TEST_CONFIG = {
 # =============================================================================
 RATE_LIMIT_CONFIG = {
     "enabled": False,               # Tắt rate limiting vì dùng OpenRouter (không giới hạn như Gemini API trực tiếp)
-    "requests_per_minute": 30,      # OpenRouter thường cho phép nhiều request hơn
-    "delay_between_requests": 2,    # Giảm xuống 2 giây
+    "requests_per_minute": 30,      # Engine requests (one predict sends several); OpenRouter thường cho phép nhiều request hơn
+    "burst": 1,                     # Calls allowed back-to-back before the rate applies
+    "max_retries": 3,               # Retries of one engine request on 429/5xx, with adaptive backoff
+    "backoff_initial": 5,           # Seconds; doubles on each consecutive 429/5xx
+    "backoff_max": 120,
+    "shared_state_file": None,      # e.g. "/tmp/agent_rate_limit.json" to share the quota across processes
+}
+
+# =============================================================================
+# ENVIRONMENT RESET (restore shop state before state-mutating tasks)
+# =============================================================================
+RESET_CONFIG = {
+    "backend": "none",              # Options: 'none', 'fake' (local stand-in), 'mysql' (docker-compose stack)
+                                    # Single-shard env_config only; with shards, give each one a "reset" block
+    "url": None,                    # 'fake' backend: stand-in URL, e.g. "http://127.0.0.1:8011"
+    "container": "prestashop_mysql",  # 'mysql' backend: container from environments/prestashop/docker-compose.yml
+    "database": "prestashop",
+    "user": "root",
+    "password": "prestashop",
+    "prefix": "ps_",
+}
+
+# =============================================================================
+# GROUNDING CACHE (reuse grounding results for the same element on the same layout)
+# =============================================================================
+GROUNDING_CACHE_CONFIG = {
+    "enabled": False,
+    "max_entries": 512,             # LRU eviction beyond this many element descriptions
+    "region_size": (160, 64),       # Screenshot region around the element used for validation
+    "max_distance": 6,              # Max dHash bit difference for the region to count as unchanged
+    "path": "grounding_cache.json", # Persisted across tasks and runs (None = in-memory only)
+}
+
+# =============================================================================
+# RECORD / REPLAY (agent.predict responses)
+# =============================================================================
+REPLAY_CONFIG = {
+    "mode": "off",                      # Options: 'off', 'record', 'replay' (offline, no model calls)
+    "path": "agent_recording.jsonl",    # Recording file; the first recording of an instruction wins on replay
+}
+
+# =============================================================================
+# LOOP / STALL DETECTION (cut wasted agent steps)
+# =============================================================================
+LOOP_DETECTION_CONFIG = {
+    "enabled": False,               # Off until its verdicts have been checked against a full suite run
+    "repeat_threshold": 3,          # Same action on an unchanged screen this many times in a row
+    "oscillation_cycles": 3,        # A-B-A-B... screen alternation cycles
+    "stall_steps": 6,               # Steps without any never-seen-before screen
+    "max_hints": 1,                 # Recovery hints appended to the instruction before terminating (0 = terminate at once)
+}
+
+# =============================================================================
+# BROWSERLESS DOM CHECKS (declarative dom_query blocks on server-rendered pages)
+# =============================================================================
+DOM_HTTP_CONFIG = {
+    "enabled": True,
+    "max_connections_per_host": 8,  # Keep-alive connections pooled per host
+    "timeout": 10,                  # Seconds per request
+    "cookies": {},                  # Session cookies for logged-in pages, e.g. {"PrestaShop-<hash>": "..."} for every host,
+                                    # or {"localhost": {"PrestaShop-<hash>": "..."}} for one host
+}
+
+# =============================================================================
+# DISTRIBUTED RUNS (work queue shared by a coordinator and any number of workers)
+# =============================================================================
+QUEUE_CONFIG = {
+    "role": "off",                  # Options: 'off', 'coordinator' (enqueue + collect), 'worker' (lease + run)
+    "queue": "work_queue.db",       # SQLite path, or "http://<coordinator>:8765" for workers on other hosts
+    "run_id": "default",            # Shared by the coordinator and its workers
+    "serve_port": None,             # Coordinator: also serve the queue over HTTP on this port
+    "serve_host": "127.0.0.1",      # Use "0.0.0.0" for workers on other hosts (requires "token")
+    "token": None,                  # Shared secret for the HTTP queue (or $WORK_QUEUE_TOKEN), sent by workers too
+    "wait": True,                   # Coordinator: wait for all tasks, then print summary and report
+    "lease_seconds": 600,           # A task whose worker stops heartbeating is re-leased after this
+    "heartbeat_interval": 30,
+    "max_attempts": 2,              # Leases per task before it is marked failed
+    "idle_timeout": 60,             # Worker: give up after this long with only foreign leases left
+}
+
+# =============================================================================
+# DIFFERENTIAL RUNS (only re-execute tasks whose spec/config changed or that failed)
+# =============================================================================
+DIFF_RUN_CONFIG = {
+    "enabled": False,
+    "cache": "run_cache.json",      # Last result + content hashes per task
+    "rerun_failed": True,           # Re-run tasks whose last result failed
+    "flaky_tasks": [],              # Always re-run these task IDs (tasks can also set "flaky": true)
+}
+
+# =============================================================================
+# PARALLEL PYAUTOGUI MODE (one Xvfb display + browser per worker process, Linux)
+# =============================================================================
+DISPLAY_WORKERS_CONFIG = {
+    "workers": 0,                   # > 0: run pyautogui tasks on this many virtual displays in parallel
+    "first_display": 99,            # Workers use :99, :100, ...
+    "browser": None,                # Chromium/Chrome executable (None = first found on PATH)
+    "browser_settle": 2.0,          # Seconds to let the start page load before the first screenshot
+    "queue": "work_queue.db",       # Local queue shared by the coordinator and its display workers
+}
+
+# =============================================================================
+# OBSERVATION SCALING (smaller screenshots for the planner, full resolution for grounding)
+# =============================================================================
+OBSERVATION_CONFIG = {
+    "enabled": False,
+    "planner_scale": 0.5,           # Planner screenshot scale (1920x1080 -> 960x540)
+    "planner_crop": None,           # (left, top, right, bottom) screen fractions, e.g. (0, 0.08, 1, 1) drops browser chrome
+    "grounding_scale": 1.0,         # < 1 sends a smaller image to grounding; coordinates are scaled back
+}
+
+# =============================================================================
+# STAGED PIPELINE (agent stage and evaluation pool run concurrently)
+# =============================================================================
+PIPELINE_CONFIG = {
+    "enabled": False,
+    "eval_workers": 2,              # Evaluation threads (DOM checks, semantic judging, persistence)
+    "max_pending": 4,               # Finished tasks allowed to wait for evaluation before the agent stage blocks
+}
+
+# =============================================================================
+# TOKEN / COST ACCOUNTING (per step, task and run; see evaluate/usage.py)
+# =============================================================================
+USAGE_CONFIG = {
+    "enabled": True,
+    "prices": {},                   # {model or "default": {"prompt": USD per 1M tokens, "completion": USD per 1M tokens}}
+    "anomaly_factor": 3.0,          # Flag tasks above this multiple of the run's median cost per successful step
+}
+
+# =============================================================================
+# ENVIRONMENT POOL (shards are listed in env_config.json; see environments/pool.py)
+# =============================================================================
+ENV_POOL_CONFIG = {
+    "lock_dir": None,               # Shared lease directory (None = system temp dir)
+    "lease_timeout": None,          # Seconds an operation task waits for a free shard (None = wait indefinitely)
+}
+
+# =============================================================================
+# DEADLINES (wall-clock seconds; None disables a limit; see evaluate/deadlines.py)
+# =============================================================================
+TIMEOUT_CONFIG = {
+    "task": 900,                    # Whole agent stage of one task (every phase below is capped by what is left)
+    "navigation": 60,               # Browser launch, page.goto and the initial load wait
+    "predict": 180,                 # One agent.predict call (planner + grounding requests)
+    "action": 30,                   # Executing one action on the page
+    "settle": 30,                   # networkidle wait and screenshot after an action
+    "evaluation": 120,              # Each WebAppEval check (runs outside the task deadline when pipelined)
+    "abandoned_call_grace": 900,    # Wait this long for a timed-out predict to return before reusing its agent
+}
+
+# =============================================================================
+# MULTI-TRIAL MODE (repeat tasks until the pass rate is clear; see evaluate/trials.py)
+# =============================================================================
+TRIALS_CONFIG = {
+    "enabled": False,
+    "threshold": 0.5,               # A task passes if its pass rate is confidently above this
+    "confidence": 0.9,              # Confidence of the Wilson interval used to stop early
+    "min_trials": 3,                # Trials before the first stopping decision
+    "max_trials": 10,               # Give up as 'undecided' after this many
+    "concurrency": 2,               # Trials run at once (playwright mode; pyautogui runs them one by one)
+}
+
+# =============================================================================
+# TRAJECTORY ARCHIVE (screenshots/actions per step; see evaluate/trajectory_store.py)
+# =============================================================================
+TRAJECTORY_CONFIG = {
+    "enabled": True,
+    "dir": None,                    # Directory for trajectories_<run>.traj (+ .idx); None = working directory
+}
+
+# =============================================================================
+# READINESS AND WARM-UP (before the suite starts; see environments/warmup.py)
+# =============================================================================
+WARMUP_CONFIG = {
+    "enabled": True,
+    "maildev_url": None,            # maildev API to wait for, e.g. "http://localhost:1081/email" (None skips the check)
+    "ready_timeout": 300,           # Seconds to wait for storefront/admin/maildev readiness
+    "abort_if_not_ready": True,     # Don't start the suite against an environment that never became ready
+    "passes": 2,                    # Fetches per referenced URL (first = cold, last = warm timing)
+    "max_workers": 16,              # Parallel warm-up requests
 }
@@ -0,0 +1,40 @@
+"""Regression table: phrasings the baseline runner's answer patterns extracted."""
+
+import pytest
+
+from evaluate.answer_extraction import extract_answer
+
+BASELINE_PHRASINGS = [
+    ("The name of the first product: Hummingbird printed t-shirt", "Hummingbird printed t-shirt", 'product_name'),
+    ("The name of the cheapest product is Mug Today is a good day.", "Mug Today is a good day", 'product_name'),
+    ("The first product displayed: Mountain fox notebook", "Mountain fox notebook", 'product_is'),
+    ("The first product displayed is 'Brown bear cushion'.", "Brown bear cushion", 'product_is'),
+    ("The cheapest item is: Mug The best is yet to come", "Mug The best is yet to come", 'product_is'),
+    ("The most expensive product is \"Customizable mug\"", "Customizable mug", 'product_is'),
+    ("So the answer is 42 euros.", "42 euros", 'answer_is'),
+    ("The search result is: Mountain fox cushion", "Mountain fox cushion", 'result_is'),
+    ("Total number of products: 19", "19", 'total_products'),
+    ("The total products is 7", "7", 'total_products'),
+]
+
+
+@pytest.mark.parametrize("plan, answer, rule", BASELINE_PHRASINGS)
+def test_baseline_phrasings(plan, answer, rule):
+    assert extract_answer({'plan': plan}) == (answer, rule)
+
+
+DONE_CALLS = [
+    ('agent.done("Hummingbird printed t-shirt")', "Hummingbird printed t-shirt"),
+    ('agent.done(return_value="$25.00")', "$25.00"),
+    ("```python\nagent.done(return_value='19')\n```", "19"),
+    ('agent.done(return_value=19)', "19"),
+]
+
+
+@pytest.mark.parametrize("plan_code, answer", DONE_CALLS)
+def test_done_argument(plan_code, answer):
+    assert extract_answer({'plan': 'Done.', 'plan_code': plan_code}) == (answer, 'done_arg')
+
+
+def test_done_without_value_falls_through():
+    assert extract_answer({'plan': 'The answer is 7.', 'plan_code': 'agent.done()'}) == ("7", 'answer_is')
@@ -0,0 +1,63 @@
+"""Deadlines must bound the caller's wall clock even when the guarded call hangs."""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from evaluate.deadlines import Deadline, TaskTimeout
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def hung_call(release: threading.Event):
+    release.wait(10)
+    return 'late'
+
+
+def test_run_call_bounds_asyncio_run():
+    release = threading.Event()
+    abandoned = []
+
+    async def task():
+        with pytest.raises(TaskTimeout) as excinfo:
+            await Deadline(phase_seconds={'predict': 0.2}).run_call('predict', hung_call, release)
+        abandoned.append(excinfo.value.pending)
+
+    start = time.monotonic()
+    asyncio.run(task())
+    elapsed = time.monotonic() - start
+    try:
+        # asyncio.run() must not wait for the hung call at loop shutdown
+        assert elapsed < 1.0
+        assert abandoned[0].is_alive()
+    finally:
+        release.set()
+    abandoned[0].join(2)
+    assert not abandoned[0].is_alive()  # finishing after the loop closed is harmless
+
+
+def test_call_bounds_and_reports_pending_thread():
+    release = threading.Event()
+    start = time.monotonic()
+    with pytest.raises(TaskTimeout) as excinfo:
+        Deadline(task_seconds=0.2).call('predict', hung_call, release)
+    elapsed = time.monotonic() - start
+    release.set()
+    assert elapsed < 1.0
+    assert excinfo.value.task_deadline
+    excinfo.value.pending.join(2)
+    assert not excinfo.value.pending.is_alive()
+
+
+def test_calls_return_values_errors_and_caller_context():
+    deadline = Deadline(phase_seconds={'predict': 5})
+    request_id.set('step-1')
+    assert deadline.call('predict', request_id.get) == 'step-1'
+    assert asyncio.run(deadline.run_call('predict', request_id.get)) == 'step-1'
+    with pytest.raises(ValueError):
+        deadline.call('predict', int, 'not a number')
+    with pytest.raises(ValueError):
+        asyncio.run(deadline.run_call('predict', int, 'not a number'))
@@ -0,0 +1,65 @@
+"""Shard leases must be exclusive across pools (processes) built from the same env_config."""
+
+import pytest
+
+from environments.pool import EnvironmentPool, load_shards
+from environments.reset import get_reset_backend
+
+FAKE_RESET = {'backend': 'fake', 'url': 'http://127.0.0.1:1'}
+
+
+def shop(port, **extra):
+    return {'__PRESTASHOP__': dict({'url': f'http://localhost:{port}', 'username': 'u', 'password': 'p'}, **extra)}
+
+
+def accounts_config(reset=None):
+    entry = shop(8001, accounts=[{'username': 'a'}, {'username': 'b'}])
+    if reset:
+        entry['reset'] = reset
+    return {'shards': [entry]}
+
+
+def test_two_pools_cannot_hold_the_same_shard(tmp_path):
+    config = shop(8001)
+    first = EnvironmentPool(load_shards(config), lock_dir=str(tmp_path))
+    second = EnvironmentPool(load_shards(config), lock_dir=str(tmp_path))
+
+    lease = first.lease('task-1')
+    with pytest.raises(TimeoutError):
+        second.lease('task-2', timeout=0.2)
+    lease.release()
+    second.lease('task-2', timeout=0.2).release()
+
+
+def test_account_shards_share_an_instance_without_reset(tmp_path):
+    first = EnvironmentPool(load_shards(accounts_config()), lock_dir=str(tmp_path))
+    second = EnvironmentPool(load_shards(accounts_config()), lock_dir=str(tmp_path))
+
+    with first.lease('task-1', reset=True), second.lease('task-2', timeout=0.2, reset=True) as other:
+        assert not other.exclusive
+
+
+def test_reset_lease_holds_the_whole_instance(tmp_path):
+    first = EnvironmentPool(load_shards(accounts_config(FAKE_RESET)), lock_dir=str(tmp_path))
+    second = EnvironmentPool(load_shards(accounts_config(FAKE_RESET)), lock_dir=str(tmp_path))
+
+    lease = first.lease('task-1', reset=True)
+    assert lease.exclusive
+    with pytest.raises(TimeoutError):
+        second.lease('task-2', timeout=0.2)
+    with pytest.raises(TimeoutError):
+        first.lease('task-3', timeout=0.2, reset=True)
+    lease.release()
+    second.lease('task-2', timeout=0.2, reset=True).release()
+
+
+def test_global_reset_only_applies_to_a_single_shard(tmp_path):
+    backend = get_reset_backend(FAKE_RESET)
+    single = EnvironmentPool(load_shards(shop(8001)), lock_dir=str(tmp_path), reset=backend)
+    assert single.reset_backend(single.shards[0]) is backend
+
+    sharded = EnvironmentPool(load_shards({'shards': [shop(8001), dict(shop(8002), reset=FAKE_RESET)]}),
+                              lock_dir=str(tmp_path), reset=backend)
+    with pytest.raises(ValueError):
+        sharded.reset_backend(sharded.shards[0])
+    assert sharded.reset_backend(sharded.shards[1]).name == 'fake'
@@ -0,0 +1,43 @@
+"""Steps written by TrajectoryWriter read back unchanged through the memory-mapped TrajectoryArchive."""
+
+from evaluate.trajectory_store import TrajectoryArchive, TrajectoryWriter
+
+FRAME_A = b'\x89PNG frame a'
+FRAME_B = b'\x89PNG frame b' * 100
+
+
+def test_round_trip_with_deduplicated_frames(tmp_path):
+    path = str(tmp_path / 'run.traj')
+    writer = TrajectoryWriter(path)
+    writer.append('7', 0, FRAME_A, action='click(1, 2)', info={'plan': 'open'}, predict_duration=1.5)
+    writer.append('7', 1, FRAME_A, action='noop')
+    writer.append('8', 0, FRAME_B, action='type("x")')
+    writer.append('8', 1, None, action='done')
+    writer.close()
+    assert writer.frames_deduplicated == 1
+
+    with TrajectoryArchive(path) as archive:
+        entries = archive.steps()
+        assert [(e['task_id'], e['step']) for e in entries] == [('7', 0), ('7', 1), ('8', 0), ('8', 1)]
+        assert [archive.frame(e) for e in entries] == [FRAME_A, FRAME_A, FRAME_B, None]
+        assert entries[0]['frame'] == entries[1]['frame']
+        first = archive.step(entries[0])
+        assert (first['action'], first['info'], first['predict_duration']) == ('click(1, 2)', {'plan': 'open'}, 1.5)
+        assert [archive.step(e)['action'] for e in archive.steps('8')] == ['type("x")', 'done']
+
+
+def test_writers_sharing_a_container(tmp_path):
+    path = str(tmp_path / 'run.traj')
+    first, second = TrajectoryWriter(path), TrajectoryWriter(path)
+    first.append('1', 0, FRAME_A, action='a')
+    second.append('2', 0, FRAME_B, action='b')
+    second.append('2', 1, FRAME_A, action='c')
+    first.append('1', 1, FRAME_B, action='d')
+    first.close()
+    second.close()
+    assert first.frames_deduplicated == second.frames_deduplicated == 1
+
+    with TrajectoryArchive(path) as archive:
+        entries = archive.steps()
+        assert [archive.step(e)['action'] for e in entries] == ['a', 'b', 'c', 'd']
+        assert [archive.frame(e) for e in entries] == [FRAME_A, FRAME_B, FRAME_A, FRAME_B]
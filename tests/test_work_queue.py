@@ -0,0 +1,78 @@
+"""Lease bookkeeping of the SQLite work queue and the token check of its HTTP front end."""
+
+import time
+import urllib.error
+
+import pytest
+
+from evaluate.work_queue import QueueServer, RemoteQueue, WorkQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    return WorkQueue(str(tmp_path / 'queue.db'), **kwargs)
+
+
+def test_lease_hands_out_tasks_in_order_once(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue('run', ['1', '2']) == 2
+    assert queue.enqueue('run', ['1', '2']) == 0
+
+    assert queue.lease('run', 'a') == '1'
+    assert queue.lease('run', 'b') == '2'
+    assert queue.lease('run', 'c') is None
+    assert queue.counts('run')['leased'] == 2
+
+
+def test_expired_lease_is_handed_to_another_worker(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05, max_attempts=3)
+    queue.enqueue('run', ['1'])
+    assert queue.lease('run', 'a') == '1'
+    assert queue.lease('run', 'b') is None
+
+    time.sleep(0.1)
+    assert queue.counts('run')['pending'] == 1
+    assert queue.lease('run', 'b') == '1'
+    assert not queue.heartbeat('run', '1', 'a')
+    assert queue.heartbeat('run', '1', 'b')
+
+
+def test_reap_fails_task_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05, max_attempts=1)
+    queue.enqueue('run', ['1'])
+    assert queue.lease('run', 'a') == '1'
+
+    time.sleep(0.1)
+    assert queue.finished('run')
+    assert queue.counts('run')['failed'] == 1
+    assert queue.results('run') == [{'task_id': '1', 'success': False, 'error': 'lease expired'}]
+
+
+def test_late_complete_from_superseded_worker_is_dropped(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.05, max_attempts=3)
+    queue.enqueue('run', ['1'])
+    queue.lease('run', 'a')
+    time.sleep(0.1)
+    queue.lease('run', 'b')
+
+    assert not queue.complete('run', '1', 'a', {'task_id': '1', 'worker': 'a'})
+    assert queue.complete('run', '1', 'b', {'task_id': '1', 'worker': 'b'})
+    assert queue.results('run') == [{'task_id': '1', 'worker': 'b'}]
+    assert queue.finished('run')
+
+
+def test_server_requires_token_off_loopback(tmp_path, monkeypatch):
+    monkeypatch.delenv('WORK_QUEUE_TOKEN', raising=False)
+    with pytest.raises(ValueError):
+        QueueServer(make_queue(tmp_path), host='0.0.0.0', port=0)
+
+
+def test_server_rejects_wrong_token(tmp_path, monkeypatch):
+    monkeypatch.delenv('WORK_QUEUE_TOKEN', raising=False)
+    server = QueueServer(make_queue(tmp_path), port=0, token='secret').start()
+    try:
+        assert RemoteQueue(server.url, token='secret').enqueue('run', ['1']) == 1
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            RemoteQueue(server.url, token='wrong').lease('run', 'a')
+        assert excinfo.value.code == 401
+    finally:
+        server.stop()